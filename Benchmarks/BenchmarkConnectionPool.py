@@ -0,0 +1,59 @@
+import sys
+import os
+import time
+import statistics
+import psycopg2
+
+# Add the parent directory to the path so we can import Solution
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Business.Customer import Customer
+
+'''
+    Per-call latency of Solution.get_customer with a fresh psycopg2 connection per call
+    (what DBConnector used to do) versus the pooled DBConnector.
+    Run from the repository root: python Benchmarks/BenchmarkConnectionPool.py
+'''
+
+CALLS = 500
+
+
+def unpooled_get_customer(params: dict, customer_id: int) -> None:
+    connection = psycopg2.connect(**params)
+    connection.autocommit = False
+    cursor = connection.cursor()
+    cursor.execute("SELECT * FROM Customers WHERE cust_id=%s", (customer_id,))
+    cursor.fetchall()
+    connection.commit()
+    cursor.close()
+    connection.close()
+
+
+def measure(call) -> list:
+    latencies = []
+    for i in range(CALLS):
+        start = time.perf_counter()
+        call(i % 100 + 1)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: list) -> None:
+    latencies = sorted(latencies)
+    print(f"{name:<10} mean={statistics.mean(latencies):.3f}ms  p50={latencies[len(latencies) // 2]:.3f}ms  "
+          f"p99={latencies[int(len(latencies) * 0.99)]:.3f}ms")
+
+
+if __name__ == '__main__':
+    Solution.drop_tables()
+    Solution.create_tables()
+    for cust_id in range(1, 101):
+        Solution.add_customer(Customer(cust_id, 'Customer', 30, "0123456789"))
+
+    params = Connector.DBConnector.get_pool().params
+    report('unpooled', measure(lambda cust_id: unpooled_get_customer(params, cust_id)))
+    report('pooled', measure(Solution.get_customer))
+
+    Solution.drop_tables()
+    Connector.DBConnector.close_pool()
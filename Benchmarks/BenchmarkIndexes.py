@@ -0,0 +1,155 @@
+import sys
+import os
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+# Add the parent directory to the path so we can import Solution
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility import BulkLoader
+from Utility.QueryObserver import QueryObserver
+
+'''
+    Plans and run times of the Solution queries with and without the secondary indexes of create_tables,
+    on a generated history of ORDER_DISH_ROWS OrderDish rows (1M by default).
+    Each API function is called REPEAT times with the indexes in place, then again in a transaction that
+    drops them and is rolled back afterwards. The best time is kept, and where a statement's plan changes
+    the scans of both plans are printed.
+    Run from the repository root: python Benchmarks/BenchmarkIndexes.py [order_dish_rows]
+'''
+
+ORDER_DISH_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+DISHES_PER_ORDER = 4
+ORDERS = ORDER_DISH_ROWS // DISHES_PER_ORDER
+CUSTOMERS = max(ORDERS // 5, 10)
+DISHES = 1000
+RATINGS = 20000
+FIRST_DAY = datetime(2020, 1, 1)
+
+INDEXES = ['orderdish_dish_price_idx', 'ratings_dish_rating_idx', 'ordercustomer_cust_order_idx',
+           'orders_date_idx', 'dishes_active_idx']
+
+CALLS = [
+    ('get_order_total_price', lambda s: Solution.get_order_total_price(ORDERS // 2, session=s)),
+    ('get_all_order_items', lambda s: Solution.get_all_order_items(ORDERS // 2, session=s)),
+    ('get_customer_that_placed_order', lambda s: Solution.get_customer_that_placed_order(ORDERS // 2, session=s)),
+    ('get_most_ordered_dish_in_period',
+     lambda s: Solution.get_most_ordered_dish_in_period(datetime(2021, 3, 1), datetime(2021, 3, 8), session=s)),
+    ('did_customer_order_top_rated_dishes',
+     lambda s: Solution.did_customer_order_top_rated_dishes(CUSTOMERS // 2, session=s)),
+    ('get_customers_rated_but_not_ordered', lambda s: Solution.get_customers_rated_but_not_ordered(session=s)),
+    ('get_non_worth_price_increase', lambda s: Solution.get_non_worth_price_increase(session=s)),
+    ('get_customers_spent_max_avg_amount_money',
+     lambda s: Solution.get_customers_spent_max_avg_amount_money(session=s)),
+    ('get_cumulative_profit_per_month', lambda s: Solution.get_cumulative_profit_per_month(2021, session=s)),
+    ('get_potential_dish_recommendations',
+     lambda s: Solution.get_potential_dish_recommendations(CUSTOMERS // 2, session=s)),
+]
+REPEAT = 3
+
+
+class Rollback(Exception):
+    pass
+
+
+# remembers the statements a call ran
+class Recorder(QueryObserver):
+    def __init__(self) -> None:
+        self.events = []
+
+    def after(self, event) -> None:
+        self.events.append(event)
+
+
+def generate() -> dict:
+    rand = random.Random(0)
+    orders_dishes = ((order_id, dish_id, float(rand.randint(5, 60)), rand.randint(1, 5))
+                     for order_id in range(1, ORDERS + 1)
+                     for dish_id in rand.sample(range(1, DISHES + 1), DISHES_PER_ORDER))
+    ratings = {(rand.randint(1, CUSTOMERS), rand.randint(1, DISHES)) for _ in range(RATINGS)}
+    return {
+        'Customers': ((i, 'Customer', 18 + i % 80, '0123456789') for i in range(1, CUSTOMERS + 1)),
+        'Orders': ((i, FIRST_DAY + timedelta(minutes=7 * i), 5.0, 'Address') for i in range(1, ORDERS + 1)),
+        'Dishes': ((i, 'Dish ' + str(i), float(10 + i % 50), i % 10 != 0) for i in range(1, DISHES + 1)),
+        'OrderCustomer': ((i, rand.randint(1, CUSTOMERS)) for i in range(1, ORDERS + 1)),
+        'OrderDish': orders_dishes,
+        'Ratings': ((cust_id, dish_id, rand.randint(1, 5)) for cust_id, dish_id in sorted(ratings)),
+    }
+
+
+# Node Type (and index or table) of every scan in the plan
+def scans(node: dict) -> list:
+    found = []
+    if 'Scan' in node['Node Type']:
+        found.append(node['Node Type'] + ' ' + node.get('Index Name', node.get('Relation Name', '')))
+    for child in node.get('Plans', []):
+        found.extend(scans(child))
+    return found
+
+
+def plan(conn: Connector.DBConnector, event) -> dict:
+    cursor = conn.connection.cursor()
+    cursor.execute("PREPARE benchmark_query AS " + event.query)
+    try:
+        cursor.execute("EXPLAIN (FORMAT JSON) EXECUTE benchmark_query ("
+                       + ", ".join(["%s"] * len(event.params)) + ")" if event.params else
+                       "EXPLAIN (FORMAT JSON) EXECUTE benchmark_query", tuple(event.params or ()))
+        result = cursor.fetchone()[0]
+    finally:
+        cursor.execute("DEALLOCATE benchmark_query")
+    return (result if isinstance(result, list) else json.loads(result))[0]['Plan']
+
+
+# run every call on conn, returns name -> (best time in ms, scans of every statement it ran)
+def measure(conn: Connector.DBConnector, recorder: Recorder) -> dict:
+    results = {}
+    for name, call in CALLS:
+        timings = []
+        for _ in range(REPEAT):
+            recorder.events.clear()
+            start = time.perf_counter()
+            call(conn)
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = (min(timings), [scans(plan(conn, event)) for event in recorder.events])
+    return results
+
+
+if __name__ == '__main__':
+    Solution.drop_tables()
+    Solution.create_tables()
+    start = time.perf_counter()
+    BulkLoader.load(generate(), defer_constraints=True)
+    print(f"loaded {ORDER_DISH_ROWS} OrderDish rows in {time.perf_counter() - start:.1f}s")
+
+    recorder = Recorder()
+    Connector.DBConnector.add_observer(recorder)
+    conn = Connector.DBConnector()
+    try:
+        with_indexes = measure(conn, recorder)
+        try:
+            with conn.transaction():
+                for index in INDEXES:
+                    conn.execute("DROP INDEX " + index)
+                without_indexes = measure(conn, recorder)
+                raise Rollback()
+        except Rollback:
+            pass
+    finally:
+        conn.close()
+        Connector.DBConnector.remove_observer(recorder)
+
+    for name, _ in CALLS:
+        indexed_ms, indexed_scans = with_indexes[name]
+        plain_ms, plain_scans = without_indexes[name]
+        print(f"{name}: without indexes {plain_ms:.2f}ms, with indexes {indexed_ms:.2f}ms "
+              f"({plain_ms / indexed_ms:.1f}x)")
+        for before, after in zip(plain_scans, indexed_scans):
+            if before != after:
+                print(f"    without: {', '.join(before)}")
+                print(f"    with:    {', '.join(after)}")
+
+    Solution.drop_tables()
+    Connector.DBConnector.close_pool()
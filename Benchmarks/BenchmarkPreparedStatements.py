@@ -0,0 +1,76 @@
+import sys
+import os
+import json
+import time
+import statistics
+
+# Add the parent directory to the path so we can import Solution
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Solution as Solution
+import Utility.DBConnector as Connector
+from psycopg2 import sql
+from Business.Customer import Customer
+from Business.Order import Order
+from Business.Dish import Dish
+from datetime import datetime
+
+'''
+    Per-call latency of a few hot Solution queries sent as literal SQL text (planned on every call)
+    versus the cached server-side prepared statements Solution now uses, and the planning time
+    EXPLAIN reports for each query.
+    Run from the repository root: python Benchmarks/BenchmarkPreparedStatements.py
+'''
+
+CALLS = 2000
+
+QUERIES = {
+    'get_customer': ("SELECT * FROM Customers WHERE cust_id=$1", lambda i: (i % 100 + 1,)),
+    'get_order_total_price': ("SELECT subtotal FROM OrdersPrices WHERE order_id=$1", lambda i: (i % 100 + 1,)),
+    'get_all_order_items': ("SELECT dish_id, amount, current_price FROM OrderDish WHERE order_id=$1"
+                            " ORDER BY dish_id ASC", lambda i: (i % 100 + 1,)),
+}
+
+
+def literal(query: str, params: tuple) -> sql.Composed:
+    for position in range(len(params), 0, -1):
+        query = query.replace('$' + str(position), '{p' + str(position) + '}')
+    return sql.SQL(query).format(**{'p' + str(p + 1): sql.Literal(value) for p, value in enumerate(params)})
+
+
+def measure(call) -> list:
+    latencies = []
+    for i in range(CALLS):
+        start = time.perf_counter()
+        call(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def planning_time(conn: Connector.DBConnector, query: str, params: tuple) -> float:
+    _, result = conn.execute(sql.SQL("EXPLAIN (ANALYZE, FORMAT JSON) ") + literal(query, params))
+    plan = result[0]['QUERY PLAN']
+    return (plan if isinstance(plan, list) else json.loads(plan))[0]['Planning Time']
+
+
+if __name__ == '__main__':
+    Solution.drop_tables()
+    Solution.create_tables()
+    Solution.add_customers([Customer(i, 'Customer', 30, "0123456789") for i in range(1, 101)])
+    Solution.add_dishes([Dish(i, 'Dish', 10.0, True) for i in range(1, 11)])
+    Solution.add_orders([Order(i, datetime(2024, 1, 1), 5.0, 'Address') for i in range(1, 101)])
+    for order_id in range(1, 101):
+        for dish_id in range(1, 4):
+            Solution.order_contains_dish(order_id, dish_id, 2)
+
+    conn = Connector.DBConnector()
+    try:
+        for name, (query, params) in QUERIES.items():
+            literal_ms = statistics.mean(measure(lambda i: conn.execute(literal(query, params(i)))))
+            prepared_ms = statistics.mean(measure(lambda i: conn.execute_prepared(query, params(i))))
+            print(f"{name:<22} literal={literal_ms:.3f}ms  prepared={prepared_ms:.3f}ms  "
+                  f"planning={planning_time(conn, query, params(0)):.3f}ms")
+    finally:
+        conn.close()
+
+    Solution.drop_tables()
+    Connector.DBConnector.close_pool()
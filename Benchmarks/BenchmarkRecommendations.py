@@ -0,0 +1,93 @@
+import sys
+import os
+import random
+import time
+
+# Add the parent directory to the path so we can import Solution
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility import BulkLoader
+from Utility.RecommendationEngine import RecommendationEngine
+
+'''
+    get_potential_dish_recommendations on the stored customer components versus the recursive CTE it used
+    to run, on RATINGS ratings of CUSTOMERS customers over DISHES dishes (popular dishes make the CTE's
+    intermediate result grow quadratically). Also times the batch rebuild of all components, and the
+    recommendations of every customer from the batch function (in one and in PROCESSES processes) against
+    a loop over the single-customer function, and the in-memory RecommendationEngine (snapshot load and
+    per-call time).
+    Run from the repository root: python Benchmarks/BenchmarkRecommendations.py [ratings]
+'''
+
+RATINGS = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+CUSTOMERS = RATINGS // 10
+DISHES = 200
+CALLS = 20
+PROCESSES = 4
+
+RECURSIVE_RECOMMENDATIONS = """
+    WITH RECURSIVE similar_customers AS (
+        SELECT R2.cust_id as cust_id
+        FROM Ratings as R1 JOIN Ratings as R2 ON R1.dish_id = R2.dish_id
+        WHERE R1.cust_id=$1 AND R1.rating >= 4 AND R2.rating >= 4
+        UNION
+        SELECT R4.cust_id as cust_id
+        FROM Ratings as R3 INNER JOIN similar_customers as S ON R3.cust_id = S.cust_id
+            JOIN Ratings as R4 ON R3.dish_id = R4.dish_id
+        WHERE R3.rating >= 4 AND R4.rating >= 4
+    ) SELECT DISTINCT R5.dish_id as dish_id FROM similar_customers as S2
+    INNER JOIN Ratings as R5 ON S2.cust_id = R5.cust_id
+    WHERE S2.cust_id <> $1 AND R5.dish_id NOT IN (
+        SELECT dish_id FROM OrderDish as OD LEFT JOIN OrderCustomer as OC ON OD.order_id = OC.order_id
+        WHERE OC.cust_id = $1)
+        AND R5.rating >= 4
+    ORDER BY dish_id ASC
+"""
+
+
+def generate() -> dict:
+    rand = random.Random(0)
+    # a few popular dishes collect most of the ratings
+    ratings = {(rand.randint(1, CUSTOMERS), min(int(rand.paretovariate(1.2)), DISHES)) for _ in range(RATINGS)}
+    return {
+        'Customers': ((i, 'Customer', 30, '0123456789') for i in range(1, CUSTOMERS + 1)),
+        'Dishes': ((i, 'Dish ' + str(i), 10.0, True) for i in range(1, DISHES + 1)),
+        'Ratings': ((cust_id, dish_id, rand.randint(1, 5)) for cust_id, dish_id in sorted(ratings)),
+    }
+
+
+def timed(call) -> float:
+    start = time.perf_counter()
+    call()
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == '__main__':
+    Solution.drop_tables()
+    Solution.create_tables()
+    BulkLoader.load(generate())
+
+    conn = Connector.DBConnector()
+    try:
+        print(f"rebuild of all components: {timed(lambda: conn.execute('SELECT refresh_customer_components()')):.1f}ms")
+        customers = random.Random(1).sample(range(1, CUSTOMERS + 1), CALLS)
+        recursive = sum(timed(lambda: conn.execute_prepared(RECURSIVE_RECOMMENDATIONS, (c,))) for c in customers)
+        stored = sum(timed(lambda: Solution.get_potential_dish_recommendations(c, session=conn)) for c in customers)
+        print(f"recursive CTE {recursive / CALLS:.2f}ms  components {stored / CALLS:.2f}ms per call")
+        loop = timed(lambda: [Solution.get_potential_dish_recommendations(c, session=conn)
+                              for c in range(1, CUSTOMERS + 1)])
+        batch = timed(lambda: Solution.get_potential_dish_recommendations_batch(session=conn))
+        parallel = timed(lambda: Solution.get_potential_dish_recommendations_batch(processes=PROCESSES, session=conn))
+        print(f"all {CUSTOMERS} customers: loop {loop:.0f}ms  batch {batch:.0f}ms  "
+              f"batch in {PROCESSES} processes {parallel:.0f}ms")
+        start = time.perf_counter()
+        engine = RecommendationEngine.load(session=conn)
+        loading = (time.perf_counter() - start) * 1000
+        in_memory = timed(lambda: [engine.recommendations(c) for c in range(1, CUSTOMERS + 1)])
+        print(f"engine: snapshot {loading:.0f}ms  {in_memory * 1000 / CUSTOMERS:.1f}us per call")
+    finally:
+        conn.close()
+
+    Solution.drop_tables()
+    Connector.DBConnector.close_pool()
@@ -0,0 +1,74 @@
+import sys
+import os
+import timeit
+from collections import namedtuple
+
+# Add the parent directory to the path so we can import Utility
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Utility.DBConnector import ResultSet, ResultSetDict
+
+'''
+    Micro-benchmark of ResultSet access patterns on an in-memory result (no database needed),
+    compared to the previous dict-per-row ResultSet which is reproduced below.
+    Run from the repository root: python Benchmarks/BenchmarkResultSet.py
+'''
+
+ROWS = 50000
+Column = namedtuple('Column', 'name type_code')
+DESCRIPTION = [Column('dish_id', 23), Column('amount', 23), Column('current_price', 1700)]
+RESULTS = [(i, i % 7, 10.5) for i in range(ROWS)]
+
+
+# the ResultSet as it was before rows became views over the fetched tuples
+class DictRowResultSet:
+    def __init__(self, description, results):
+        self.rows = results.copy()
+        self.cols_header = [d.name for d in description]
+        self.cols = ResultSetDict()
+        for col, index in zip(self.cols_header, range(len(results[0]))):
+            self.cols[col] = index
+
+    def __getitem__(self, idx):
+        if type(idx) == str:
+            return [x[self.cols[idx]] for x in self.rows]
+        return self.__getRow(idx)
+
+    def __iter__(self):
+        for row in range(len(self.rows)):
+            yield self.__getRow(row)
+
+    def __getRow(self, row: int):
+        row_to_return = ResultSetDict()
+        for val, col in zip(self.rows[row], self.cols_header):
+            row_to_return[col] = val
+        return row_to_return
+
+
+def iterate(result_set) -> None:
+    # what get_all_order_items does with every row
+    for row in result_set:
+        (row['dish_id'], row['amount'], row['current_price'])
+
+
+def index(result_set) -> None:
+    for i in range(0, ROWS, 10):
+        result_set[i]['amount']
+
+
+def column(result_set) -> None:
+    for _ in range(10):
+        result_set['amount']
+
+
+if __name__ == '__main__':
+    for name, case in [('build', None), ('iterate', iterate), ('index', index), ('column', column)]:
+        timings = []
+        for implementation in (DictRowResultSet, ResultSet):
+            if case is None:
+                run = lambda: implementation(DESCRIPTION, list(RESULTS))
+            else:
+                result_set = implementation(DESCRIPTION, list(RESULTS))
+                run = lambda: case(result_set)
+            timings.append(min(timeit.repeat(run, number=1, repeat=5)) * 1000)
+        print(f"{name:<8} dict rows={timings[0]:8.2f}ms  row views={timings[1]:8.2f}ms  "
+              f"speedup={timings[0] / timings[1]:5.1f}x")
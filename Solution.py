@@ -1,9 +1,13 @@
-from typing import List, Tuple
-from psycopg2 import sql
+from typing import Dict, List, Tuple, Optional
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, datetime
 import Utility.DBConnector as Connector
 from Utility.ReturnValue import ReturnValue
 from Utility.Exceptions import DatabaseException
+from Utility.EntityCache import EntityCache
+from Utility.ResultCache import ResultCache, memoized, mark_failed, mark_uncached
+from Utility.SingleFlight import coalesced
 from Business.Customer import Customer, BadCustomer
 from Business.Order import Order, BadOrder
 from Business.Dish import Dish, BadDish
@@ -59,10 +63,741 @@ def create_tables() -> None:
                             FOREIGN KEY (dish_id) REFERENCES Dishes(dish_id) ON DELETE CASCADE,
                             PRIMARY KEY (cust_id, dish_id));
                      """)
-        conn.execute("""CREATE VIEW OrdersPrices AS SELECT O.order_id AS order_id, SUM(COALESCE(OD.current_price * OD.amount,0)) + O.delivery_fee AS subtotal
-                                                    FROM Orders O  LEFT JOIN OrderDish OD on O.order_id = OD.order_id
-                                                    GROUP BY O.order_id;
+        # the subtotal of every order (its items plus the delivery fee), kept up to date by the triggers below
+        # so reading a total is a primary key lookup instead of an aggregation over OrderDish
+        conn.execute("""CREATE TABLE OrderTotals(
+                            order_id INTEGER PRIMARY KEY,
+                            subtotal DECIMAL NOT NULL,
+                            date TIMESTAMP(0) NOT NULL,
+                            FOREIGN KEY (order_id) REFERENCES Orders(order_id) ON DELETE CASCADE ON UPDATE CASCADE);
+                     """)
+        # the triggers are statement level, a multi-row INSERT or a COPY updates every total it touches once
+        conn.execute("""CREATE OR REPLACE FUNCTION ordertotals_orders() RETURNS TRIGGER AS $$
+                        BEGIN
+                            IF TG_OP = 'INSERT' THEN
+                                INSERT INTO OrderTotals(order_id, subtotal, date)
+                                SELECT order_id, delivery_fee, date FROM new_rows;
+                            ELSE
+                                UPDATE OrderTotals T SET subtotal = T.subtotal + N.delivery_fee - O.delivery_fee,
+                                                         date = N.date
+                                FROM new_rows N JOIN old_rows O ON N.order_id = O.order_id
+                                WHERE T.order_id = N.order_id
+                                  AND (N.delivery_fee <> O.delivery_fee OR N.date <> O.date);
+                            END IF;
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        conn.execute("""CREATE OR REPLACE FUNCTION ordertotals_orderdish() RETURNS TRIGGER AS $$
+                        BEGIN
+                            -- a transition table exists only for the events that have it
+                            IF TG_OP = 'INSERT' THEN
+                                UPDATE OrderTotals T SET subtotal = T.subtotal + D.delta
+                                FROM (SELECT order_id, SUM(current_price * amount) AS delta FROM new_rows
+                                      GROUP BY order_id) AS D
+                                WHERE T.order_id = D.order_id;
+                            ELSIF TG_OP = 'DELETE' THEN
+                                UPDATE OrderTotals T SET subtotal = T.subtotal - D.delta
+                                FROM (SELECT order_id, SUM(current_price * amount) AS delta FROM old_rows
+                                      GROUP BY order_id) AS D
+                                WHERE T.order_id = D.order_id;
+                            ELSE
+                                UPDATE OrderTotals T SET subtotal = T.subtotal + D.delta
+                                FROM (SELECT order_id, SUM(delta) AS delta FROM (
+                                          SELECT order_id, current_price * amount AS delta FROM new_rows
+                                          UNION ALL
+                                          SELECT order_id, -current_price * amount FROM old_rows) AS Changes
+                                      GROUP BY order_id) AS D
+                                WHERE T.order_id = D.order_id AND D.delta <> 0;
+                            END IF;
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        conn.execute("""CREATE TRIGGER ordertotals_orders_insert AFTER INSERT ON Orders
+                            REFERENCING NEW TABLE AS new_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION ordertotals_orders();
+                        CREATE TRIGGER ordertotals_orders_update AFTER UPDATE ON Orders
+                            REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION ordertotals_orders();
+                     """)
+        conn.execute("""CREATE TRIGGER ordertotals_orderdish_insert AFTER INSERT ON OrderDish
+                            REFERENCING NEW TABLE AS new_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION ordertotals_orderdish();
+                        CREATE TRIGGER ordertotals_orderdish_update AFTER UPDATE ON OrderDish
+                            REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION ordertotals_orderdish();
+                        CREATE TRIGGER ordertotals_orderdish_delete AFTER DELETE ON OrderDish
+                            REFERENCING OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION ordertotals_orderdish();
+                     """)
+        conn.execute("""CREATE VIEW OrdersPrices AS SELECT order_id, subtotal FROM OrderTotals;
+                     """)
+        # the revenue (sum of the order subtotals) of every month, rolled up from OrderTotals by its triggers
+        conn.execute("""CREATE TABLE MonthlyRevenue(
+                            year INTEGER,
+                            month INTEGER CHECK (month >= 1 AND month <= 12),
+                            revenue DECIMAL NOT NULL,
+                            PRIMARY KEY (year, month));
+                     """)
+        conn.execute("""CREATE OR REPLACE FUNCTION monthlyrevenue_ordertotals() RETURNS TRIGGER AS $$
+                        BEGIN
+                            IF TG_OP = 'INSERT' THEN
+                                INSERT INTO MonthlyRevenue(year, month, revenue)
+                                SELECT EXTRACT(YEAR FROM date)::integer, EXTRACT(MONTH FROM date)::integer, SUM(subtotal)
+                                FROM new_rows GROUP BY 1, 2
+                                ON CONFLICT (year, month) DO UPDATE SET revenue = MonthlyRevenue.revenue + EXCLUDED.revenue;
+                            ELSIF TG_OP = 'DELETE' THEN
+                                UPDATE MonthlyRevenue M SET revenue = M.revenue - D.revenue
+                                FROM (SELECT EXTRACT(YEAR FROM date)::integer AS year, EXTRACT(MONTH FROM date)::integer AS month,
+                                             SUM(subtotal) AS revenue
+                                      FROM old_rows GROUP BY 1, 2) AS D
+                                WHERE M.year = D.year AND M.month = D.month;
+                            ELSE
+                                INSERT INTO MonthlyRevenue(year, month, revenue)
+                                SELECT EXTRACT(YEAR FROM date)::integer, EXTRACT(MONTH FROM date)::integer, SUM(delta)
+                                FROM (SELECT date, subtotal AS delta FROM new_rows
+                                      UNION ALL
+                                      SELECT date, -subtotal FROM old_rows) AS Changes
+                                GROUP BY 1, 2
+                                ON CONFLICT (year, month) DO UPDATE SET revenue = MonthlyRevenue.revenue + EXCLUDED.revenue;
+                            END IF;
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        conn.execute("""CREATE TRIGGER monthlyrevenue_ordertotals_insert AFTER INSERT ON OrderTotals
+                            REFERENCING NEW TABLE AS new_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION monthlyrevenue_ordertotals();
+                        CREATE TRIGGER monthlyrevenue_ordertotals_update AFTER UPDATE ON OrderTotals
+                            REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION monthlyrevenue_ordertotals();
+                        CREATE TRIGGER monthlyrevenue_ordertotals_delete AFTER DELETE ON OrderTotals
+                            REFERENCING OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION monthlyrevenue_ordertotals();
+                     """)
+        # rating aggregates of every dish, kept up to date by the triggers below. avg_rating is 3 for a dish
+        # nobody rated, the indexes give the top and bottom rated dishes (ties by dish_id) without sorting
+        conn.execute("""CREATE TABLE DishRatingStats(
+                            dish_id INTEGER PRIMARY KEY,
+                            rating_sum INTEGER NOT NULL DEFAULT 0,
+                            rating_count INTEGER NOT NULL DEFAULT 0,
+                            stars_1 INTEGER NOT NULL DEFAULT 0,
+                            stars_2 INTEGER NOT NULL DEFAULT 0,
+                            stars_3 INTEGER NOT NULL DEFAULT 0,
+                            stars_4 INTEGER NOT NULL DEFAULT 0,
+                            stars_5 INTEGER NOT NULL DEFAULT 0,
+                            avg_rating DECIMAL GENERATED ALWAYS AS
+                                (CASE WHEN rating_count = 0 THEN 3 ELSE rating_sum::decimal / rating_count END) STORED,
+                            FOREIGN KEY (dish_id) REFERENCES Dishes(dish_id) ON DELETE CASCADE ON UPDATE CASCADE);
+                     """)
+        conn.execute("CREATE INDEX dishratingstats_top_idx ON DishRatingStats(avg_rating DESC, dish_id ASC)")
+        conn.execute("CREATE INDEX dishratingstats_bottom_idx ON DishRatingStats(avg_rating ASC, dish_id ASC)")
+        # adds the ratings (dish_ids[i], ratings[i]) with signs[i] = 1 and removes them with signs[i] = -1
+        conn.execute("""CREATE OR REPLACE FUNCTION dishratingstats_apply(dish_ids INTEGER[], ratings INTEGER[],
+                                                                         signs INTEGER[]) RETURNS VOID AS $$
+                            UPDATE DishRatingStats S SET rating_sum = S.rating_sum + D.rating_sum,
+                                                         rating_count = S.rating_count + D.rating_count,
+                                                         stars_1 = S.stars_1 + D.stars_1,
+                                                         stars_2 = S.stars_2 + D.stars_2,
+                                                         stars_3 = S.stars_3 + D.stars_3,
+                                                         stars_4 = S.stars_4 + D.stars_4,
+                                                         stars_5 = S.stars_5 + D.stars_5
+                            FROM (SELECT dish_id, SUM(sign * rating) AS rating_sum, SUM(sign) AS rating_count,
+                                         SUM(CASE WHEN rating = 1 THEN sign ELSE 0 END) AS stars_1,
+                                         SUM(CASE WHEN rating = 2 THEN sign ELSE 0 END) AS stars_2,
+                                         SUM(CASE WHEN rating = 3 THEN sign ELSE 0 END) AS stars_3,
+                                         SUM(CASE WHEN rating = 4 THEN sign ELSE 0 END) AS stars_4,
+                                         SUM(CASE WHEN rating = 5 THEN sign ELSE 0 END) AS stars_5
+                                  FROM unnest(dish_ids, ratings, signs) AS C(dish_id, rating, sign)
+                                  GROUP BY dish_id) AS D
+                            WHERE S.dish_id = D.dish_id;
+                        $$ LANGUAGE sql;
+                     """)
+        conn.execute("""CREATE OR REPLACE FUNCTION dishratingstats_ratings() RETURNS TRIGGER AS $$
+                        BEGIN
+                            IF TG_OP = 'INSERT' THEN
+                                PERFORM dishratingstats_apply(array_agg(dish_id), array_agg(rating), array_agg(1))
+                                FROM new_rows;
+                            ELSIF TG_OP = 'DELETE' THEN
+                                PERFORM dishratingstats_apply(array_agg(dish_id), array_agg(rating), array_agg(-1))
+                                FROM old_rows;
+                            ELSE
+                                PERFORM dishratingstats_apply(array_agg(dish_id), array_agg(rating), array_agg(sign))
+                                FROM (SELECT dish_id, rating, 1 AS sign FROM new_rows
+                                      UNION ALL
+                                      SELECT dish_id, rating, -1 FROM old_rows) AS Changes;
+                            END IF;
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        conn.execute("""CREATE OR REPLACE FUNCTION dishratingstats_dishes() RETURNS TRIGGER AS $$
+                        BEGIN
+                            INSERT INTO DishRatingStats(dish_id) SELECT dish_id FROM new_rows;
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        conn.execute("""CREATE TRIGGER dishratingstats_dishes_insert AFTER INSERT ON Dishes
+                            REFERENCING NEW TABLE AS new_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION dishratingstats_dishes();
+                        CREATE TRIGGER dishratingstats_ratings_insert AFTER INSERT ON Ratings
+                            REFERENCING NEW TABLE AS new_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION dishratingstats_ratings();
+                        CREATE TRIGGER dishratingstats_ratings_update AFTER UPDATE ON Ratings
+                            REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION dishratingstats_ratings();
+                        CREATE TRIGGER dishratingstats_ratings_delete AFTER DELETE ON Ratings
+                            REFERENCING OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION dishratingstats_ratings();
+                     """)
+        # every price a dish had, from the time it was set (add_dish, update_dish_price or any other write
+        # of Dishes.price). the primary key gives the price at a point in time with one backward range scan
+        conn.execute("""CREATE TABLE DishPriceHistory(
+                            dish_id INTEGER,
+                            valid_from TIMESTAMP NOT NULL,
+                            price DECIMAL NOT NULL,
+                            PRIMARY KEY (dish_id, valid_from),
+                            FOREIGN KEY (dish_id) REFERENCES Dishes(dish_id) ON DELETE CASCADE ON UPDATE CASCADE);
+                     """)
+        conn.execute("""CREATE OR REPLACE FUNCTION dishpricehistory_dishes() RETURNS TRIGGER AS $$
+                        BEGIN
+                            IF TG_OP = 'INSERT' THEN
+                                INSERT INTO DishPriceHistory(dish_id, valid_from, price)
+                                SELECT dish_id, clock_timestamp(), price FROM new_rows;
+                            ELSE
+                                INSERT INTO DishPriceHistory(dish_id, valid_from, price)
+                                SELECT N.dish_id, clock_timestamp(), N.price
+                                FROM new_rows N JOIN old_rows O ON N.dish_id = O.dish_id
+                                WHERE N.price <> O.price
+                                ON CONFLICT (dish_id, valid_from) DO UPDATE SET price = EXCLUDED.price;
+                            END IF;
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        conn.execute("""CREATE TRIGGER dishpricehistory_dishes_insert AFTER INSERT ON Dishes
+                            REFERENCING NEW TABLE AS new_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION dishpricehistory_dishes();
+                        CREATE TRIGGER dishpricehistory_dishes_update AFTER UPDATE ON Dishes
+                            REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION dishpricehistory_dishes();
+                     """)
+        # amount_sum and item_count of the order items of every (dish, price) pair that has any, kept up to date
+        # by the OrderDish triggers below, get_non_worth_price_increase compares the average amounts of its rows
+        conn.execute("""CREATE TABLE DishPriceStats(
+                            dish_id INTEGER,
+                            price DECIMAL,
+                            amount_sum BIGINT NOT NULL,
+                            item_count INTEGER NOT NULL,
+                            PRIMARY KEY (dish_id, price));
+                     """)
+        conn.execute("""CREATE OR REPLACE FUNCTION dishpricestats_orderdish() RETURNS TRIGGER AS $$
+                        BEGIN
+                            IF TG_OP = 'INSERT' THEN
+                                INSERT INTO DishPriceStats(dish_id, price, amount_sum, item_count)
+                                SELECT dish_id, current_price, SUM(amount), COUNT(*) FROM new_rows GROUP BY 1, 2
+                                ON CONFLICT (dish_id, price) DO UPDATE
+                                    SET amount_sum = DishPriceStats.amount_sum + EXCLUDED.amount_sum,
+                                        item_count = DishPriceStats.item_count + EXCLUDED.item_count;
+                            ELSIF TG_OP = 'DELETE' THEN
+                                UPDATE DishPriceStats S SET amount_sum = S.amount_sum - D.amount_sum,
+                                                            item_count = S.item_count - D.item_count
+                                FROM (SELECT dish_id, current_price AS price, SUM(amount) AS amount_sum,
+                                             COUNT(*) AS item_count
+                                      FROM old_rows GROUP BY 1, 2) AS D
+                                WHERE S.dish_id = D.dish_id AND S.price = D.price;
+                            ELSE
+                                INSERT INTO DishPriceStats(dish_id, price, amount_sum, item_count)
+                                SELECT dish_id, price, SUM(amount), SUM(sign)
+                                FROM (SELECT dish_id, current_price AS price, amount, 1 AS sign FROM new_rows
+                                      UNION ALL
+                                      SELECT dish_id, current_price, -amount, -1 FROM old_rows) AS Changes
+                                GROUP BY 1, 2
+                                ON CONFLICT (dish_id, price) DO UPDATE
+                                    SET amount_sum = DishPriceStats.amount_sum + EXCLUDED.amount_sum,
+                                        item_count = DishPriceStats.item_count + EXCLUDED.item_count;
+                            END IF;
+                            DELETE FROM DishPriceStats WHERE item_count = 0;
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        conn.execute("""CREATE TRIGGER dishpricestats_orderdish_insert AFTER INSERT ON OrderDish
+                            REFERENCING NEW TABLE AS new_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION dishpricestats_orderdish();
+                        CREATE TRIGGER dishpricestats_orderdish_update AFTER UPDATE ON OrderDish
+                            REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION dishpricestats_orderdish();
+                        CREATE TRIGGER dishpricestats_orderdish_delete AFTER DELETE ON OrderDish
+                            REFERENCING OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION dishpricestats_orderdish();
+                     """)
+        # total_amount and order_count of every dish a customer ordered (OrderDish joined with OrderCustomer),
+        # so "did the customer ever order the dish" is a primary key probe, and "who ordered the dish" one on
+        # the second index. an insert adds its rows, other changes recompute the (customer, dish) pairs they
+        # touch from the two tables, which stays right when one statement cascades into both of them
+        conn.execute("""CREATE TABLE CustomerDishOrders(
+                            cust_id INTEGER,
+                            dish_id INTEGER,
+                            total_amount BIGINT NOT NULL,
+                            order_count INTEGER NOT NULL,
+                            PRIMARY KEY (cust_id, dish_id));
+                     """)
+        conn.execute("CREATE INDEX customerdishorders_dish_cust_idx ON CustomerDishOrders(dish_id, cust_id)")
+        conn.execute("""CREATE OR REPLACE FUNCTION customerdishorders_refresh(cust_ids INTEGER[],
+                                                                              dish_ids INTEGER[]) RETURNS VOID AS $$
+                            DELETE FROM CustomerDishOrders C
+                            USING unnest(cust_ids, dish_ids) AS P(cust_id, dish_id)
+                            WHERE C.cust_id = P.cust_id AND C.dish_id = P.dish_id;
+                            INSERT INTO CustomerDishOrders(cust_id, dish_id, total_amount, order_count)
+                            SELECT OC.cust_id, OD.dish_id, SUM(OD.amount), COUNT(*)
+                            FROM (SELECT DISTINCT U.cust_id, U.dish_id FROM unnest(cust_ids, dish_ids) AS U(cust_id, dish_id)) AS P
+                                 JOIN OrderCustomer OC ON OC.cust_id = P.cust_id
+                                 JOIN OrderDish OD ON OD.order_id = OC.order_id AND OD.dish_id = P.dish_id
+                            GROUP BY OC.cust_id, OD.dish_id;
+                        $$ LANGUAGE sql;
+                     """)
+        conn.execute("""CREATE OR REPLACE FUNCTION customerdishorders_orderdish() RETURNS TRIGGER AS $$
+                        BEGIN
+                            IF TG_OP = 'INSERT' THEN
+                                INSERT INTO CustomerDishOrders(cust_id, dish_id, total_amount, order_count)
+                                SELECT OC.cust_id, N.dish_id, SUM(N.amount), COUNT(*)
+                                FROM new_rows N JOIN OrderCustomer OC ON OC.order_id = N.order_id
+                                GROUP BY OC.cust_id, N.dish_id
+                                ON CONFLICT (cust_id, dish_id) DO UPDATE
+                                    SET total_amount = CustomerDishOrders.total_amount + EXCLUDED.total_amount,
+                                        order_count = CustomerDishOrders.order_count + EXCLUDED.order_count;
+                            ELSIF TG_OP = 'DELETE' THEN
+                                PERFORM customerdishorders_refresh(array_agg(OC.cust_id), array_agg(O.dish_id))
+                                FROM old_rows O JOIN OrderCustomer OC ON OC.order_id = O.order_id;
+                            ELSE
+                                PERFORM customerdishorders_refresh(array_agg(OC.cust_id), array_agg(C.dish_id))
+                                FROM (SELECT order_id, dish_id FROM new_rows
+                                      UNION
+                                      SELECT order_id, dish_id FROM old_rows) AS C
+                                     JOIN OrderCustomer OC ON OC.order_id = C.order_id;
+                            END IF;
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        # a removed placement may come with its order items already gone, so the customers it touches are rebuilt
+        conn.execute("""CREATE OR REPLACE FUNCTION customerdishorders_ordercustomer() RETURNS TRIGGER AS $$
+                        DECLARE
+                            custs INTEGER[];
+                        BEGIN
+                            IF TG_OP = 'INSERT' THEN
+                                INSERT INTO CustomerDishOrders(cust_id, dish_id, total_amount, order_count)
+                                SELECT N.cust_id, OD.dish_id, SUM(OD.amount), COUNT(*)
+                                FROM new_rows N JOIN OrderDish OD ON OD.order_id = N.order_id
+                                GROUP BY N.cust_id, OD.dish_id
+                                ON CONFLICT (cust_id, dish_id) DO UPDATE
+                                    SET total_amount = CustomerDishOrders.total_amount + EXCLUDED.total_amount,
+                                        order_count = CustomerDishOrders.order_count + EXCLUDED.order_count;
+                                RETURN NULL;
+                            ELSIF TG_OP = 'DELETE' THEN
+                                SELECT array_agg(DISTINCT cust_id) INTO custs FROM old_rows;
+                            ELSE
+                                SELECT array_agg(cust_id) INTO custs
+                                FROM (SELECT cust_id FROM new_rows UNION SELECT cust_id FROM old_rows) AS C;
+                            END IF;
+                            DELETE FROM CustomerDishOrders WHERE cust_id = ANY(custs);
+                            INSERT INTO CustomerDishOrders(cust_id, dish_id, total_amount, order_count)
+                            SELECT OC.cust_id, OD.dish_id, SUM(OD.amount), COUNT(*)
+                            FROM OrderCustomer OC JOIN OrderDish OD ON OD.order_id = OC.order_id
+                            WHERE OC.cust_id = ANY(custs)
+                            GROUP BY OC.cust_id, OD.dish_id;
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        conn.execute("""CREATE TRIGGER customerdishorders_orderdish_insert AFTER INSERT ON OrderDish
+                            REFERENCING NEW TABLE AS new_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION customerdishorders_orderdish();
+                        CREATE TRIGGER customerdishorders_orderdish_update AFTER UPDATE ON OrderDish
+                            REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION customerdishorders_orderdish();
+                        CREATE TRIGGER customerdishorders_orderdish_delete AFTER DELETE ON OrderDish
+                            REFERENCING OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION customerdishorders_orderdish();
+                        CREATE TRIGGER customerdishorders_ordercustomer_insert AFTER INSERT ON OrderCustomer
+                            REFERENCING NEW TABLE AS new_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION customerdishorders_ordercustomer();
+                        CREATE TRIGGER customerdishorders_ordercustomer_update AFTER UPDATE ON OrderCustomer
+                            REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION customerdishorders_ordercustomer();
+                        CREATE TRIGGER customerdishorders_ordercustomer_delete AFTER DELETE ON OrderCustomer
+                            REFERENCING OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION customerdishorders_ordercustomer();
+                     """)
+        # order_count and total_spent (sum of the subtotals) of every customer that placed an order. new placements
+        # and changed subtotals are added to it, removed or moved placements rebuild their customers (the order
+        # subtotals may be gone with them). the index gives the customers by their average without sorting
+        conn.execute("""CREATE TABLE CustomerSpend(
+                            cust_id INTEGER PRIMARY KEY,
+                            order_count INTEGER NOT NULL,
+                            total_spent DECIMAL NOT NULL,
+                            avg_spent DECIMAL GENERATED ALWAYS AS (total_spent / order_count) STORED);
+                     """)
+        conn.execute("CREATE INDEX customerspend_avg_idx ON CustomerSpend(avg_spent DESC, cust_id ASC)")
+        conn.execute("""CREATE OR REPLACE FUNCTION customerspend_ordercustomer() RETURNS TRIGGER AS $$
+                        DECLARE
+                            custs INTEGER[];
+                        BEGIN
+                            IF TG_OP = 'INSERT' THEN
+                                INSERT INTO CustomerSpend(cust_id, order_count, total_spent)
+                                SELECT N.cust_id, COUNT(*), SUM(T.subtotal)
+                                FROM new_rows N JOIN OrderTotals T ON T.order_id = N.order_id
+                                GROUP BY N.cust_id
+                                ON CONFLICT (cust_id) DO UPDATE
+                                    SET order_count = CustomerSpend.order_count + EXCLUDED.order_count,
+                                        total_spent = CustomerSpend.total_spent + EXCLUDED.total_spent;
+                                RETURN NULL;
+                            ELSIF TG_OP = 'DELETE' THEN
+                                SELECT array_agg(DISTINCT cust_id) INTO custs FROM old_rows;
+                            ELSE
+                                SELECT array_agg(cust_id) INTO custs
+                                FROM (SELECT cust_id FROM new_rows UNION SELECT cust_id FROM old_rows) AS C;
+                            END IF;
+                            DELETE FROM CustomerSpend WHERE cust_id = ANY(custs);
+                            INSERT INTO CustomerSpend(cust_id, order_count, total_spent)
+                            SELECT OC.cust_id, COUNT(*), SUM(T.subtotal)
+                            FROM OrderCustomer OC JOIN OrderTotals T ON T.order_id = OC.order_id
+                            WHERE OC.cust_id = ANY(custs)
+                            GROUP BY OC.cust_id;
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        conn.execute("""CREATE OR REPLACE FUNCTION customerspend_ordertotals() RETURNS TRIGGER AS $$
+                        BEGIN
+                            UPDATE CustomerSpend S SET total_spent = S.total_spent + D.delta
+                            FROM (SELECT OC.cust_id, SUM(N.subtotal - O.subtotal) AS delta
+                                  FROM new_rows N JOIN old_rows O ON N.order_id = O.order_id
+                                       JOIN OrderCustomer OC ON OC.order_id = N.order_id
+                                  GROUP BY OC.cust_id) AS D
+                            WHERE S.cust_id = D.cust_id AND D.delta <> 0;
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        conn.execute("""CREATE TRIGGER customerspend_ordercustomer_insert AFTER INSERT ON OrderCustomer
+                            REFERENCING NEW TABLE AS new_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION customerspend_ordercustomer();
+                        CREATE TRIGGER customerspend_ordercustomer_update AFTER UPDATE ON OrderCustomer
+                            REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION customerspend_ordercustomer();
+                        CREATE TRIGGER customerspend_ordercustomer_delete AFTER DELETE ON OrderCustomer
+                            REFERENCING OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION customerspend_ordercustomer();
+                        CREATE TRIGGER customerspend_ordertotals_update AFTER UPDATE ON OrderTotals
+                            REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION customerspend_ordertotals();
+                     """)
+        # customers are similar when both rated a dish >= 4, get_potential_dish_recommendations looks at the whole
+        # connected component of a customer in this graph. CustomerComponents labels every customer that has a
+        # rating >= 4 with its component: a new high rating joins the components it connects right away
+        # (the smaller ones are relabeled), losing one may split a component, which is then only marked
+        # in StaleComponents and rebuilt in batch by refresh_customer_components() before the next read
+        conn.execute("""CREATE SEQUENCE customercomponents_label_seq;
+                        CREATE TABLE CustomerComponents(
+                            cust_id INTEGER PRIMARY KEY,
+                            component BIGINT NOT NULL,
+                            FOREIGN KEY (cust_id) REFERENCES Customers(cust_id) ON DELETE CASCADE ON UPDATE CASCADE);
+                        CREATE INDEX customercomponents_component_idx ON CustomerComponents(component, cust_id);
+                        CREATE TABLE StaleComponents(
+                            component BIGINT PRIMARY KEY);
                      """)
+        conn.execute("""CREATE OR REPLACE FUNCTION customercomponents_union(new_cust INTEGER, new_dish INTEGER)
+                        RETURNS VOID AS $$
+                        DECLARE
+                            labels BIGINT[];
+                            target BIGINT;
+                        BEGIN
+                            -- the customer's component and the ones of everybody else who rated the dish >= 4
+                            labels := ARRAY(SELECT DISTINCT C.component FROM CustomerComponents C
+                                            WHERE C.cust_id = new_cust
+                                               OR C.cust_id IN (SELECT cust_id FROM Ratings
+                                                                WHERE dish_id = new_dish AND rating >= 4));
+                            IF cardinality(labels) = 0 THEN
+                                INSERT INTO CustomerComponents(cust_id, component)
+                                VALUES (new_cust, nextval('customercomponents_label_seq'));
+                                RETURN;
+                            END IF;
+                            target := labels[1];
+                            IF cardinality(labels) > 1 THEN
+                                SELECT component INTO target FROM CustomerComponents WHERE component = ANY(labels)
+                                GROUP BY component ORDER BY COUNT(*) DESC, component LIMIT 1;
+                                UPDATE CustomerComponents SET component = target
+                                WHERE component = ANY(labels) AND component <> target;
+                                -- a merged component that was waiting for a rebuild makes the result wait too
+                                DELETE FROM StaleComponents WHERE component = ANY(labels) AND component <> target;
+                                IF FOUND THEN
+                                    INSERT INTO StaleComponents(component) VALUES (target) ON CONFLICT DO NOTHING;
+                                END IF;
+                            END IF;
+                            INSERT INTO CustomerComponents(cust_id, component) VALUES (new_cust, target)
+                            ON CONFLICT (cust_id) DO NOTHING;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        conn.execute("""CREATE OR REPLACE FUNCTION customercomponents_ratings() RETURNS TRIGGER AS $$
+                        DECLARE
+                            lost_custs INTEGER[];
+                            lost_dishes INTEGER[];
+                            gained_custs INTEGER[];
+                            gained_dishes INTEGER[];
+                        BEGIN
+                            -- the high ratings (>= 4) this statement removed and added
+                            IF TG_OP = 'DELETE' THEN
+                                SELECT array_agg(cust_id), array_agg(dish_id) INTO lost_custs, lost_dishes
+                                FROM old_rows WHERE rating >= 4;
+                            ELSIF TG_OP = 'UPDATE' THEN
+                                SELECT array_agg(cust_id), array_agg(dish_id) INTO lost_custs, lost_dishes
+                                FROM (SELECT cust_id, dish_id FROM old_rows WHERE rating >= 4
+                                      EXCEPT SELECT cust_id, dish_id FROM new_rows WHERE rating >= 4) AS Lost;
+                                SELECT array_agg(cust_id), array_agg(dish_id) INTO gained_custs, gained_dishes
+                                FROM (SELECT cust_id, dish_id FROM new_rows WHERE rating >= 4
+                                      EXCEPT SELECT cust_id, dish_id FROM old_rows WHERE rating >= 4) AS Gained;
+                            ELSE
+                                SELECT array_agg(cust_id), array_agg(dish_id) INTO gained_custs, gained_dishes
+                                FROM new_rows WHERE rating >= 4;
+                            END IF;
+                            IF lost_custs IS NULL AND gained_custs IS NULL THEN
+                                RETURN NULL;
+                            END IF;
+                            -- serializes the label changes with refresh_customer_components (see the triggers below)
+                            PERFORM pg_advisory_xact_lock(hashtext('customercomponents'));
+                            IF lost_custs IS NOT NULL THEN
+                                INSERT INTO StaleComponents(component)
+                                SELECT DISTINCT C.component FROM CustomerComponents C
+                                WHERE C.cust_id IN (SELECT cust_id FROM unnest(lost_custs) AS L(cust_id)
+                                                    UNION
+                                                    SELECT R.cust_id FROM Ratings R
+                                                    JOIN unnest(lost_dishes) AS L(dish_id) ON R.dish_id = L.dish_id
+                                                    WHERE R.rating >= 4)
+                                ON CONFLICT DO NOTHING;
+                            END IF;
+                            IF cardinality(gained_custs) <= 64 THEN
+                                FOR i IN 1 .. cardinality(gained_custs) LOOP
+                                    PERFORM customercomponents_union(gained_custs[i], gained_dishes[i]);
+                                END LOOP;
+                            ELSIF gained_custs IS NOT NULL THEN
+                                -- a large batch (a bulk insert or load) is cheaper to rebuild than to union row by row
+                                INSERT INTO StaleComponents(component)
+                                SELECT DISTINCT C.component FROM CustomerComponents C
+                                WHERE C.cust_id IN (SELECT R.cust_id FROM Ratings R
+                                                    JOIN (SELECT DISTINCT U.dish_id FROM unnest(gained_dishes) AS U(dish_id)) AS G
+                                                    ON R.dish_id = G.dish_id
+                                                    WHERE R.rating >= 4)
+                                ON CONFLICT DO NOTHING;
+                                WITH Fresh AS (
+                                    INSERT INTO CustomerComponents(cust_id, component)
+                                    SELECT cust_id, nextval('customercomponents_label_seq')
+                                    FROM (SELECT DISTINCT cust_id FROM unnest(gained_custs) AS G(cust_id)) AS G
+                                    WHERE NOT EXISTS (SELECT 1 FROM CustomerComponents C WHERE C.cust_id = G.cust_id)
+                                    RETURNING component)
+                                INSERT INTO StaleComponents(component) SELECT component FROM Fresh;
+                            END IF;
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        # rebuilds the components marked stale, returns how many there were. when a rating write that is not
+        # committed yet holds the lock (or another refresh does) the refresh is skipped instead of waiting for it
+        # and NULL is returned: the components still marked stale may be bigger than they are, so the reader
+        # computes the recommendations of their customers from the ratings instead
+        conn.execute("""CREATE OR REPLACE FUNCTION refresh_customer_components() RETURNS INTEGER AS $$
+                        DECLARE
+                            stale BIGINT[];
+                            members INTEGER[];
+                            first_label BIGINT;
+                        BEGIN
+                            IF NOT EXISTS (SELECT 1 FROM StaleComponents) THEN
+                                RETURN 0;
+                            END IF;
+                            IF NOT pg_try_advisory_xact_lock(hashtext('customercomponents')) THEN
+                                RETURN NULL;
+                            END IF;
+                            stale := ARRAY(SELECT component FROM StaleComponents);
+                            IF cardinality(stale) = 0 THEN
+                                RETURN 0;
+                            END IF;
+                            DELETE FROM StaleComponents WHERE component = ANY(stale);
+                            members := ARRAY(SELECT cust_id FROM CustomerComponents WHERE component = ANY(stale));
+                            DELETE FROM CustomerComponents WHERE component = ANY(stale);
+                            -- every member that still has a high rating starts alone, with a label newer than first_label,
+                            -- then takes the smallest label found through its dishes until nothing changes
+                            first_label := nextval('customercomponents_label_seq');
+                            INSERT INTO CustomerComponents(cust_id, component)
+                            SELECT M.cust_id, nextval('customercomponents_label_seq') FROM unnest(members) AS M(cust_id)
+                            WHERE EXISTS (SELECT 1 FROM Ratings R WHERE R.cust_id = M.cust_id AND R.rating >= 4);
+                            LOOP
+                                UPDATE CustomerComponents C SET component = N.component
+                                FROM (SELECT R.cust_id, MIN(D.component) AS component
+                                      FROM (SELECT R2.dish_id, MIN(C2.component) AS component
+                                            FROM Ratings R2 JOIN CustomerComponents C2 ON C2.cust_id = R2.cust_id
+                                            WHERE R2.rating >= 4 AND C2.component > first_label
+                                            GROUP BY R2.dish_id) AS D
+                                      JOIN Ratings R ON R.dish_id = D.dish_id AND R.rating >= 4
+                                      GROUP BY R.cust_id) AS N
+                                WHERE C.cust_id = N.cust_id AND C.component > first_label AND N.component < C.component;
+                                EXIT WHEN NOT FOUND;
+                            END LOOP;
+                            RETURN cardinality(stale);
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        # the advisory lock of customercomponents_ratings() is held until the rating write commits, so writes that
+        # change ratings >= 4 run one at a time: two unions that do not see each other could leave one component
+        # with two labels, and a stale mark made during a rebuild could name a label that is gone. readers are not:
+        # refresh_customer_components() only tries the lock and skips the rebuild while it is taken
+        conn.execute("""CREATE TRIGGER customercomponents_ratings_insert AFTER INSERT ON Ratings
+                            REFERENCING NEW TABLE AS new_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION customercomponents_ratings();
+                        CREATE TRIGGER customercomponents_ratings_update AFTER UPDATE ON Ratings
+                            REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION customercomponents_ratings();
+                        CREATE TRIGGER customercomponents_ratings_delete AFTER DELETE ON Ratings
+                            REFERENCING OLD TABLE AS old_rows
+                            FOR EACH STATEMENT EXECUTE FUNCTION customercomponents_ratings();
+                     """)
+        # every statement that changes one of the tables sends a notification on the table_changes channel once it
+        # commits, {"table": ..., "keys": [...]} with the primary keys of the rows it changed (an array per row
+        # for composite keys), or "keys": null when it changed more than 100 rows. see ChangeListener
+        conn.execute("""CREATE OR REPLACE FUNCTION notify_key(row_value JSONB, key_columns TEXT[]) RETURNS JSONB AS $$
+                            SELECT CASE WHEN cardinality(key_columns) = 1 THEN row_value -> key_columns[1]
+                                        ELSE (SELECT jsonb_agg(row_value -> K.name ORDER BY K.position)
+                                              FROM unnest(key_columns) WITH ORDINALITY AS K(name, position)) END;
+                        $$ LANGUAGE sql IMMUTABLE;
+                     """)
+        conn.execute("""CREATE OR REPLACE FUNCTION notify_changes() RETURNS TRIGGER AS $$
+                        DECLARE
+                            key_columns TEXT[] := TG_ARGV[1:];
+                            changed BIGINT;
+                            keys JSONB;
+                        BEGIN
+                            IF TG_OP = 'DELETE' THEN
+                                SELECT COUNT(*) INTO changed FROM old_rows;
+                            ELSE
+                                SELECT COUNT(*) INTO changed FROM new_rows;
+                            END IF;
+                            IF changed = 0 THEN
+                                RETURN NULL;
+                            END IF;
+                            IF changed <= 100 THEN
+                                IF TG_OP = 'INSERT' THEN
+                                    SELECT jsonb_agg(DISTINCT notify_key(to_jsonb(N), key_columns)) INTO keys
+                                    FROM new_rows N;
+                                ELSIF TG_OP = 'DELETE' THEN
+                                    SELECT jsonb_agg(DISTINCT notify_key(to_jsonb(O), key_columns)) INTO keys
+                                    FROM old_rows O;
+                                ELSE
+                                    SELECT jsonb_agg(DISTINCT notify_key(C.row_value, key_columns)) INTO keys
+                                    FROM (SELECT to_jsonb(N) AS row_value FROM new_rows N
+                                          UNION ALL
+                                          SELECT to_jsonb(O) FROM old_rows O) AS C;
+                                END IF;
+                            END IF;
+                            PERFORM pg_notify('table_changes', jsonb_build_object('table', TG_ARGV[0], 'keys', keys)::text);
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        for table, key_columns in (('Customers', "'cust_id'"), ('Orders', "'order_id'"), ('Dishes', "'dish_id'"),
+                                   ('OrderCustomer', "'order_id'"), ('OrderDish', "'order_id', 'dish_id'"),
+                                   ('Ratings', "'cust_id', 'dish_id'")):
+            conn.execute(f"""CREATE TRIGGER {table.lower()}_notify_insert AFTER INSERT ON {table}
+                                 REFERENCING NEW TABLE AS new_rows
+                                 FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('{table}', {key_columns});
+                             CREATE TRIGGER {table.lower()}_notify_update AFTER UPDATE ON {table}
+                                 REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+                                 FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('{table}', {key_columns});
+                             CREATE TRIGGER {table.lower()}_notify_delete AFTER DELETE ON {table}
+                                 REFERENCING OLD TABLE AS old_rows
+                                 FOR EACH STATEMENT EXECUTE FUNCTION notify_changes('{table}', {key_columns});
+                          """)
+        # a counter per table, bumped by every statement that writes to it (in the writer's transaction, so the
+        # new version becomes visible together with the change). results computed from the tables can be cached
+        # under the versions of the tables they read, see get_table_versions.
+        # a write does not update a counter row, that would serialize the writers of a table until they commit
+        # and deadlock two that write the same tables in different orders. it appends a row to TableChanges
+        # instead, and the TableVersions view adds the rows of a table to its folded counter in TableVersionBase
+        conn.execute("""CREATE TABLE TableVersionBase(
+                            table_name TEXT PRIMARY KEY,
+                            version BIGINT NOT NULL DEFAULT 0);
+                        INSERT INTO TableVersionBase(table_name) VALUES ('Customers'), ('Orders'), ('Dishes'),
+                            ('OrderCustomer'), ('OrderDish'), ('Ratings');
+                        CREATE TABLE TableChanges(
+                            change_id BIGSERIAL PRIMARY KEY,
+                            table_name TEXT NOT NULL);
+                        CREATE VIEW TableVersions AS
+                            SELECT B.table_name, B.version + COUNT(C.change_id) AS version
+                            FROM TableVersionBase B LEFT JOIN TableChanges C ON C.table_name = B.table_name
+                            GROUP BY B.table_name, B.version;
+                     """)
+        # moves the committed rows of TableChanges into the counters, the versions stay the same. one fold at a
+        # time: the rows it deletes are not deleted by another fold, and writers never wait for it
+        conn.execute("""CREATE OR REPLACE FUNCTION tableversions_fold() RETURNS VOID AS $$
+                        BEGIN
+                            IF NOT pg_try_advisory_xact_lock(hashtext('tableversions')) THEN
+                                RETURN;
+                            END IF;
+                            WITH Folded AS (DELETE FROM TableChanges RETURNING table_name)
+                            UPDATE TableVersionBase B SET version = B.version + F.changes
+                            FROM (SELECT table_name, COUNT(*) AS changes FROM Folded GROUP BY table_name) AS F
+                            WHERE B.table_name = F.table_name;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        # statements that change no rows (e.g. a cascade with nothing to delete) leave the version alone. every
+        # 1000th change folds the log, unless the writer is in a REPEATABLE READ or SERIALIZABLE transaction whose
+        # snapshot may still have rows an earlier fold deleted
+        conn.execute("""CREATE OR REPLACE FUNCTION tableversions_bump() RETURNS TRIGGER AS $$
+                        DECLARE
+                            change BIGINT;
+                        BEGIN
+                            IF TG_OP = 'DELETE' THEN
+                                PERFORM FROM old_rows LIMIT 1;
+                            ELSIF TG_OP <> 'TRUNCATE' THEN
+                                PERFORM FROM new_rows LIMIT 1;
+                            END IF;
+                            IF TG_OP = 'TRUNCATE' OR FOUND THEN
+                                INSERT INTO TableChanges(table_name) VALUES (TG_ARGV[0]) RETURNING change_id INTO change;
+                                IF change % 1000 = 0 AND current_setting('transaction_isolation') = 'read committed' THEN
+                                    PERFORM tableversions_fold();
+                                END IF;
+                            END IF;
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql;
+                     """)
+        for table in ('Customers', 'Orders', 'Dishes', 'OrderCustomer', 'OrderDish', 'Ratings'):
+            conn.execute(f"""CREATE TRIGGER {table.lower()}_version_insert AFTER INSERT ON {table}
+                                 REFERENCING NEW TABLE AS new_rows
+                                 FOR EACH STATEMENT EXECUTE FUNCTION tableversions_bump('{table}');
+                             CREATE TRIGGER {table.lower()}_version_update AFTER UPDATE ON {table}
+                                 REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+                                 FOR EACH STATEMENT EXECUTE FUNCTION tableversions_bump('{table}');
+                             CREATE TRIGGER {table.lower()}_version_delete AFTER DELETE ON {table}
+                                 REFERENCING OLD TABLE AS old_rows
+                                 FOR EACH STATEMENT EXECUTE FUNCTION tableversions_bump('{table}');
+                             CREATE TRIGGER {table.lower()}_version_truncate AFTER TRUNCATE ON {table}
+                                 FOR EACH STATEMENT EXECUTE FUNCTION tableversions_bump('{table}');
+                          """)
+        # secondary indexes for the access paths the primary keys do not cover:
+        # dishes by the orders that contain them (covering the price/amount columns the profit queries read)
+        conn.execute("CREATE INDEX orderdish_dish_price_idx ON OrderDish(dish_id, current_price) INCLUDE (amount)")
+        # ratings of a dish, filtered by rating (recommendations, top/bottom rated dishes)
+        conn.execute("CREATE INDEX ratings_dish_rating_idx ON Ratings(dish_id, rating) INCLUDE (cust_id)")
+        # the orders of a customer
+        conn.execute("CREATE INDEX ordercustomer_cust_order_idx ON OrderCustomer(cust_id, order_id)")
+        # orders in a date range
+        conn.execute("CREATE INDEX orders_date_idx ON Orders(date) INCLUDE (order_id)")
+        # only active dishes can be ordered or have their price changed
+        conn.execute("CREATE INDEX dishes_active_idx ON Dishes(dish_id) INCLUDE (price) WHERE is_active")
     except DatabaseException.ConnectionInvalid as e:
         # do stuff
         print(e)
@@ -94,6 +829,11 @@ def clear_tables() -> None:
         conn.execute("DELETE FROM Dishes")
         conn.execute("DELETE FROM OrderDish")
         conn.execute("DELETE FROM Ratings")
+        conn.execute("DELETE FROM MonthlyRevenue")
+        conn.execute("DELETE FROM DishPriceStats")
+        conn.execute("DELETE FROM CustomerDishOrders")
+        conn.execute("DELETE FROM CustomerSpend")
+        conn.execute("DELETE FROM StaleComponents")
     except DatabaseException.ConnectionInvalid as e:
         # do stuff
         print(e)
@@ -112,6 +852,7 @@ def clear_tables() -> None:
     except Exception as e:
         print(e)
     finally:
+        _clear_cache()
         conn.close()
 
 
@@ -125,6 +866,39 @@ def drop_tables() -> None:
         conn.execute("DROP TABLE IF EXISTS OrderCustomer CASCADE")
         conn.execute("DROP TABLE IF EXISTS OrderDish CASCADE")
         conn.execute("DROP TABLE IF EXISTS Ratings CASCADE")
+        conn.execute("DROP TABLE IF EXISTS OrderTotals CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS ordertotals_orders() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS ordertotals_orderdish() CASCADE")
+        conn.execute("DROP TABLE IF EXISTS MonthlyRevenue CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS monthlyrevenue_ordertotals() CASCADE")
+        conn.execute("DROP TABLE IF EXISTS DishRatingStats CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS dishratingstats_ratings() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS dishratingstats_dishes() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS dishratingstats_apply(INTEGER[], INTEGER[], INTEGER[]) CASCADE")
+        conn.execute("DROP TABLE IF EXISTS DishPriceHistory CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS dishpricehistory_dishes() CASCADE")
+        conn.execute("DROP TABLE IF EXISTS DishPriceStats CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS dishpricestats_orderdish() CASCADE")
+        conn.execute("DROP TABLE IF EXISTS CustomerDishOrders CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS customerdishorders_orderdish() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS customerdishorders_ordercustomer() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS customerdishorders_refresh(INTEGER[], INTEGER[]) CASCADE")
+        conn.execute("DROP TABLE IF EXISTS CustomerSpend CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS customerspend_ordercustomer() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS customerspend_ordertotals() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS notify_changes() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS notify_key(JSONB, TEXT[]) CASCADE")
+        conn.execute("DROP VIEW IF EXISTS TableVersions CASCADE")
+        conn.execute("DROP TABLE IF EXISTS TableVersionBase CASCADE")
+        conn.execute("DROP TABLE IF EXISTS TableChanges CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS tableversions_bump() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS tableversions_fold() CASCADE")
+        conn.execute("DROP TABLE IF EXISTS CustomerComponents CASCADE")
+        conn.execute("DROP TABLE IF EXISTS StaleComponents CASCADE")
+        conn.execute("DROP SEQUENCE IF EXISTS customercomponents_label_seq CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS customercomponents_ratings() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS customercomponents_union(INTEGER, INTEGER) CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS refresh_customer_components() CASCADE")
     except DatabaseException.ConnectionInvalid as e:
         # do stuff
         print(e)
@@ -143,21 +917,22 @@ def drop_tables() -> None:
     except Exception as e:
         print(e)
     finally:
+        _clear_cache()
         conn.close()
 
 
 # CRUD API
 
-def add_customer(customer: Customer) -> ReturnValue:
+def add_customer(customer: Customer, session: Optional[Connector.DBConnector] = None) -> ReturnValue:
     conn, final_status = None, ReturnValue.OK
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("INSERT INTO Customers(cust_id, full_name, age, phone) Values({cust_id}, {full_name}, {age}, {phone})").format(cust_id=sql.Literal(customer.get_cust_id()),
-                      full_name=sql.Literal(customer.get_full_name()),
-                      age=sql.Literal(customer.get_age()),
-                      phone=sql.Literal(customer.get_phone()))
+        conn = _connect(session)
+        query = "INSERT INTO Customers(cust_id, full_name, age, phone) Values($1, $2, $3, $4)"
 
-        conn.execute(query)
+        with conn.savepoint():
+            conn.execute_prepared(query, (customer.get_cust_id(), customer.get_full_name(), customer.get_age(),
+                                          customer.get_phone()))
+        _invalidate(conn, 'Customers', customer.get_cust_id())
     except DatabaseException.ConnectionInvalid as e:
         final_status = ReturnValue.ERROR
     except DatabaseException.NOT_NULL_VIOLATION as e:
@@ -171,55 +946,66 @@ def add_customer(customer: Customer) -> ReturnValue:
     except Exception as e:
         final_status = ReturnValue.ERROR
     finally:
-        conn.close()
+        _release(conn, session)
         return final_status
 
 
 
-def get_customer(customer_id: int) -> Customer:
+def get_customer(customer_id: int, session: Optional[Connector.DBConnector] = None) -> Customer:
+    cache = _cache(session)
+    if cache is not None:
+        found, fields, version = cache.lookup('Customers', customer_id)
+        if found:
+            return Customer(**fields) if fields is not None else BadCustomer()
     conn, results_count, result, failed = None, None, None, False
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("SELECT * FROM Customers WHERE cust_id={cust_id}").format(cust_id=sql.Literal(customer_id))
-        results_count, result = conn.execute(query)
+        conn = _connect(session)
+        with conn.savepoint():
+            query = "SELECT * FROM Customers WHERE cust_id=$1"
+            results_count, result = conn.execute_prepared(query, (customer_id,))
     except Exception as e:
         failed = True
     finally:
-        conn.close()
+        _release(conn, session)
         if results_count != 1 or failed:
+            if cache is not None and not failed:
+                cache.store('Customers', customer_id, None, version)
             return BadCustomer()
         else:
+            if cache is not None:
+                cache.store('Customers', customer_id, dict(result[0]), version)
             return Customer(**result[0])
 
 
 
-def delete_customer(customer_id: int) -> ReturnValue:
+def delete_customer(customer_id: int, session: Optional[Connector.DBConnector] = None) -> ReturnValue:
     conn, results_count, result, final_status = None, None, None, ReturnValue.OK
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("DELETE FROM Customers WHERE cust_id={cust_id}").format(cust_id=sql.Literal(customer_id))
-        results_count, _ = conn.execute(query)
+        conn = _connect(session)
+        query = "DELETE FROM Customers WHERE cust_id=$1"
+        with conn.savepoint():
+            results_count, _ = conn.execute_prepared(query, (customer_id,))
+        _invalidate(conn, 'Customers', customer_id)
     except Exception as e:
         final_status = ReturnValue.ERROR
     finally:
-        conn.close()
+        _release(conn, session)
         if results_count == 0:
             final_status = ReturnValue.NOT_EXISTS
         return final_status
 
 
-def add_order(order: Order) -> ReturnValue:
+def add_order(order: Order, session: Optional[Connector.DBConnector] = None) -> ReturnValue:
     conn, final_status = None, ReturnValue.OK
     try:
-        conn = Connector.DBConnector()
-        query = (sql.SQL("INSERT INTO Orders(order_id, date, delivery_fee, delivery_address) "
-                        "Values({order_id}, {order_date}, {delivery_fee}, {delivery_address})").format(
-                            order_id=sql.Literal(order.get_order_id()),
-                            order_date=sql.Literal(format_timestamp_for_sql(order.get_datetime())),
-                            delivery_fee=sql.Literal(order.get_delivery_fee()),
-                            delivery_address=sql.Literal(order.get_delivery_address())))
-
-        conn.execute(query)
+        conn = _connect(session)
+        query = ("INSERT INTO Orders(order_id, date, delivery_fee, delivery_address) "
+                 "Values($1, $2, $3, $4)")
+
+        with conn.savepoint():
+            conn.execute_prepared(query, (order.get_order_id(), format_timestamp_for_sql(order.get_datetime()),
+                                          order.get_delivery_fee(), order.get_delivery_address()))
+        _invalidate(conn, 'Orders', order.get_order_id())
     except DatabaseException.ConnectionInvalid as e:
         final_status = ReturnValue.ERROR
     except DatabaseException.NOT_NULL_VIOLATION as e:
@@ -233,55 +1019,68 @@ def add_order(order: Order) -> ReturnValue:
     except Exception as e:
         final_status = ReturnValue.ERROR
     finally:
-        conn.close()
+        _release(conn, session)
         return final_status
 
 
-def get_order(order_id: int) -> Order:
+def get_order(order_id: int, session: Optional[Connector.DBConnector] = None) -> Order:
+    cache = _cache(session)
+    if cache is not None:
+        found, qu_res, version = cache.lookup('Orders', order_id)
+        if found:
+            if qu_res is None:
+                return BadOrder()
+            return Order(qu_res['order_id'], qu_res['date'], qu_res['delivery_fee'], qu_res['delivery_address'])
     conn, results_count, result, failed = None, None, None, False
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("SELECT * FROM Orders WHERE order_id={order_id}").format(order_id=sql.Literal(order_id))
-        results_count, result = conn.execute(query)
+        conn = _connect(session)
+        with conn.savepoint():
+            query = "SELECT * FROM Orders WHERE order_id=$1"
+            results_count, result = conn.execute_prepared(query, (order_id,))
     except Exception as e:
         failed = True
     finally:
         # will happen any way after code try termination or exception handling
-        conn.close()
+        _release(conn, session)
         if results_count != 1 or failed:
+            if cache is not None and not failed:
+                cache.store('Orders', order_id, None, version)
             return BadOrder()
         else:
             qu_res = result[0]
+            if cache is not None:
+                cache.store('Orders', order_id, dict(qu_res), version)
             return Order(qu_res['order_id'],qu_res['date'], qu_res['delivery_fee'], qu_res['delivery_address'])
 
 
-def delete_order(order_id: int) -> ReturnValue:
+def delete_order(order_id: int, session: Optional[Connector.DBConnector] = None) -> ReturnValue:
     conn, results_count, result, final_status = None, None, None, ReturnValue.OK
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("DELETE FROM Orders WHERE order_id={order_id}").format(order_id=sql.Literal(order_id))
-        results_count, result = conn.execute(query)
+        conn = _connect(session)
+        query = "DELETE FROM Orders WHERE order_id=$1"
+        with conn.savepoint():
+            results_count, result = conn.execute_prepared(query, (order_id,))
+        _invalidate(conn, 'Orders', order_id)
     except Exception as e:
         final_status = ReturnValue.ERROR
     finally:
-        conn.close()
+        _release(conn, session)
         if results_count == 0:
             final_status = ReturnValue.NOT_EXISTS
         return final_status
 
 
-def add_dish(dish: Dish) -> ReturnValue:
+def add_dish(dish: Dish, session: Optional[Connector.DBConnector] = None) -> ReturnValue:
     conn, final_status = None, ReturnValue.OK
     try:
-        conn = Connector.DBConnector()
-        query = (sql.SQL("INSERT INTO Dishes(dish_id, name, price, is_active) "
-                        "Values({dish_id}, {name}, {price}, {is_active})").format(
-                            dish_id=sql.Literal(dish.get_dish_id()),
-                            name=sql.Literal(dish.get_name()),
-                            price=sql.Literal(dish.get_price()),
-                            is_active=sql.Literal(dish.get_is_active())))
-
-        conn.execute(query)
+        conn = _connect(session)
+        query = ("INSERT INTO Dishes(dish_id, name, price, is_active) "
+                 "Values($1, $2, $3, $4)")
+
+        with conn.savepoint():
+            conn.execute_prepared(query, (dish.get_dish_id(), dish.get_name(), dish.get_price(),
+                                          dish.get_is_active()))
+        _invalidate(conn, 'Dishes', dish.get_dish_id())
     except DatabaseException.ConnectionInvalid as e:
         final_status = ReturnValue.ERROR
     except DatabaseException.NOT_NULL_VIOLATION as e:
@@ -295,35 +1094,45 @@ def add_dish(dish: Dish) -> ReturnValue:
     except Exception as e:
         final_status = ReturnValue.ERROR
     finally:
-        conn.close()
+        _release(conn, session)
         return final_status
 
 
-def get_dish(dish_id: int) -> Dish:
+def get_dish(dish_id: int, session: Optional[Connector.DBConnector] = None) -> Dish:
+    cache = _cache(session)
+    if cache is not None:
+        found, fields, version = cache.lookup('Dishes', dish_id)
+        if found:
+            return Dish(**fields) if fields is not None else BadDish()
     conn, results_count, result, failed = None, None, None, False
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("SELECT * FROM Dishes WHERE dish_id={dish_id}").format(dish_id=sql.Literal(dish_id))
-        results_count, result = conn.execute(query)
+        conn = _connect(session)
+        with conn.savepoint():
+            query = "SELECT * FROM Dishes WHERE dish_id=$1"
+            results_count, result = conn.execute_prepared(query, (dish_id,))
     except Exception as e:
         failed = True
     finally:
         # will happen any way after code try termination or exception handling
-        conn.close()
+        _release(conn, session)
         if results_count != 1 or failed:
+            if cache is not None and not failed:
+                cache.store('Dishes', dish_id, None, version)
             return BadDish()
         else:
+            if cache is not None:
+                cache.store('Dishes', dish_id, dict(result[0]), version)
             return Dish(**result[0])
 
 
-def update_dish_price(dish_id: int, price: float) -> ReturnValue:
+def update_dish_price(dish_id: int, price: float, session: Optional[Connector.DBConnector] = None) -> ReturnValue:
     conn, results_count, result, final_status = None, None, None, ReturnValue.OK
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("UPDATE Dishes SET price={price} WHERE dish_id={dish_id} AND is_active=True").format(
-            price=sql.Literal(price),
-            dish_id=sql.Literal(dish_id))
-        results_count, result = conn.execute(query)
+        conn = _connect(session)
+        query = "UPDATE Dishes SET price=$1 WHERE dish_id=$2 AND is_active=True"
+        with conn.savepoint():
+            results_count, result = conn.execute_prepared(query, (price, dish_id))
+        _invalidate(conn, 'Dishes', dish_id)
     except DatabaseException.ConnectionInvalid as e:
         final_status = ReturnValue.ERROR
     except DatabaseException.NOT_NULL_VIOLATION as e:
@@ -333,20 +1142,20 @@ def update_dish_price(dish_id: int, price: float) -> ReturnValue:
     except Exception as e:
         final_status = ReturnValue.ERROR
     finally:
-        conn.close()
+        _release(conn, session)
         if results_count == 0:
             final_status = ReturnValue.NOT_EXISTS
         return final_status
 
 
-def update_dish_active_status(dish_id: int, is_active: bool) -> ReturnValue:
+def update_dish_active_status(dish_id: int, is_active: bool, session: Optional[Connector.DBConnector] = None) -> ReturnValue:
     conn, results_count, result, final_status = None, None, None, ReturnValue.OK
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("UPDATE Dishes SET is_active={is_active} WHERE dish_id={dish_id}").format(
-            is_active=sql.Literal(is_active),
-            dish_id=sql.Literal(dish_id))
-        results_count, result = conn.execute(query)
+        conn = _connect(session)
+        query = "UPDATE Dishes SET is_active=$1 WHERE dish_id=$2"
+        with conn.savepoint():
+            results_count, result = conn.execute_prepared(query, (is_active, dish_id))
+        _invalidate(conn, 'Dishes', dish_id)
     except DatabaseException.ConnectionInvalid as e:
         final_status = ReturnValue.ERROR
     except DatabaseException.NOT_NULL_VIOLATION as e:
@@ -356,22 +1165,38 @@ def update_dish_active_status(dish_id: int, is_active: bool) -> ReturnValue:
     except Exception as e:
         final_status = ReturnValue.ERROR
     finally:
-        conn.close()
+        _release(conn, session)
         if results_count == 0:
             final_status = ReturnValue.NOT_EXISTS
         return final_status
 
 
-def customer_placed_order(customer_id: int, order_id: int) -> ReturnValue:
+# the price the dish had at ts, None if it did not exist then (or does not exist anymore)
+def get_dish_price_at(dish_id: int, ts: datetime, session: Optional[Connector.DBConnector] = None) -> Optional[float]:
+    conn, results_count, result, failed = None, None, [], False
+    try:
+        conn = _connect(session)
+        with conn.savepoint():
+            query = ("SELECT price FROM DishPriceHistory WHERE dish_id=$1 AND valid_from <= $2"
+                     " ORDER BY valid_from DESC LIMIT 1")
+            results_count, result = conn.execute_prepared(query, (dish_id, ts))
+    except Exception as e:
+        failed = True
+    finally:
+        # will happen any way after code try termination or exception handling
+        _release(conn, session)
+        if results_count != 1 or failed:
+            return None
+        return float(result[0]['price'])
+
+
+def customer_placed_order(customer_id: int, order_id: int, session: Optional[Connector.DBConnector] = None) -> ReturnValue:
     conn, results_count, result, final_status = None, None, None, ReturnValue.OK
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("INSERT INTO OrderCustomer (order_id, cust_id)"
-                        " VALUES ({order_id}, {customer_id})").format(
-            customer_id=sql.Literal(customer_id),
-            order_id=sql.Literal(order_id),
-            Null=sql.Literal(None))
-        results_count, result = conn.execute(query)
+        conn = _connect(session)
+        query = "INSERT INTO OrderCustomer (order_id, cust_id) VALUES ($1, $2)"
+        with conn.savepoint():
+            results_count, result = conn.execute_prepared(query, (order_id, customer_id))
     except DatabaseException.ConnectionInvalid as e:
         final_status = ReturnValue.ERROR
     except DatabaseException.NOT_NULL_VIOLATION as e:
@@ -385,43 +1210,42 @@ def customer_placed_order(customer_id: int, order_id: int) -> ReturnValue:
     except Exception as e:
         final_status = ReturnValue.ERROR
     finally:
-        conn.close()
+        _release(conn, session)
         if results_count == 0:
             final_status = ReturnValue.NOT_EXISTS
         return final_status
 
 
-def get_customer_that_placed_order(order_id: int) -> Customer:
+def get_customer_that_placed_order(order_id: int, session: Optional[Connector.DBConnector] = None) -> Customer:
     conn, results_count, result, failed = None, None, None, False
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("SELECT C.cust_id, C.full_name, C.age, C.phone FROM Customers C INNER JOIN OrderCustomer OC ON OC.cust_id=C.cust_id WHERE OC.order_id={order_id}").format(order_id=sql.Literal(order_id))
-        results_count, result = conn.execute(query)
+        conn = _connect(session)
+        with conn.savepoint():
+            query = "SELECT C.cust_id, C.full_name, C.age, C.phone FROM Customers C INNER JOIN OrderCustomer OC ON OC.cust_id=C.cust_id WHERE OC.order_id=$1"
+            results_count, result = conn.execute_prepared(query, (order_id,))
     except Exception as e:
         failed = True
     finally:
         # will happen any way after code try termination or exception handling
-        conn.close()
+        _release(conn, session)
         if results_count != 1 or failed:
             return BadCustomer()
         else:
             return Customer(**result[0])
 
 
-def order_contains_dish(order_id: int, dish_id: int, amount: int) -> ReturnValue:
+def order_contains_dish(order_id: int, dish_id: int, amount: int, session: Optional[Connector.DBConnector] = None) -> ReturnValue:
     conn, final_status = None, ReturnValue.OK
     try:
-        conn = Connector.DBConnector()
-        query = (sql.SQL("INSERT INTO OrderDish (order_id, dish_id, current_price, amount) "
-                         "( SELECT {order_id}, {dish_id}, D.price, {amount}"
-                         "  FROM Dishes D"
-                         "  WHERE D.dish_id={dish_id}"
-                         "  AND D.is_active=TRUE)").format(
-            order_id=sql.Literal(order_id),
-            dish_id=sql.Literal(dish_id),
-            amount=sql.Literal(amount)))
-
-        results_count, result = conn.execute(query)
+        conn = _connect(session)
+        query = ("INSERT INTO OrderDish (order_id, dish_id, current_price, amount) "
+                 "( SELECT $1::integer, $2::integer, D.price, $3::integer"
+                 "  FROM Dishes D"
+                 "  WHERE D.dish_id=$2"
+                 "  AND D.is_active=TRUE)")
+
+        with conn.savepoint():
+            results_count, result = conn.execute_prepared(query, (order_id, dish_id, amount))
         if results_count == 0:
             final_status = ReturnValue.NOT_EXISTS
     except DatabaseException.ConnectionInvalid as e:
@@ -437,59 +1261,57 @@ def order_contains_dish(order_id: int, dish_id: int, amount: int) -> ReturnValue
     except Exception as e:
         final_status = ReturnValue.ERROR
     finally:
-        conn.close()
+        _release(conn, session)
         return final_status
 
 
-def order_does_not_contain_dish(order_id: int, dish_id: int) -> ReturnValue:
+def order_does_not_contain_dish(order_id: int, dish_id: int, session: Optional[Connector.DBConnector] = None) -> ReturnValue:
     conn, results_count, result, final_status = None, None, None, ReturnValue.OK
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("DELETE FROM OrderDish"
-                        " WHERE order_id={order_id}"
-                        " AND dish_id={dish_id}").format(order_id=sql.Literal(order_id),dish_id=sql.Literal(dish_id))
-        results_count, result = conn.execute(query)
+        conn = _connect(session)
+        query = ("DELETE FROM OrderDish"
+                 " WHERE order_id=$1"
+                 " AND dish_id=$2")
+        with conn.savepoint():
+            results_count, result = conn.execute_prepared(query, (order_id, dish_id))
     except Exception as e:
         final_status = ReturnValue.ERROR
     finally:
-        conn.close()
+        _release(conn, session)
         if results_count == 0:
             final_status = ReturnValue.NOT_EXISTS
         return final_status
 
 
-def get_all_order_items(order_id: int) -> List[OrderDish]:
+def get_all_order_items(order_id: int, session: Optional[Connector.DBConnector] = None) -> List[OrderDish]:
     conn, results_count, result, failed = None, None, None, False
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL(
-            "SELECT dish_id, amount, current_price"
-            " FROM OrderDish WHERE order_id={order_id}"
-            " ORDER BY dish_id ASC").format(
-            order_id=sql.Literal(order_id))
-        results_count, qu_result = conn.execute(query)
-        result = [
-            OrderDish(dish_id=row['dish_id'],amount=row['amount'],price=row['current_price']) for row in qu_result
-        ]
+        conn = _connect(session)
+        with conn.savepoint():
+            query = ("SELECT dish_id, amount, current_price"
+                     " FROM OrderDish WHERE order_id=$1"
+                     " ORDER BY dish_id ASC")
+            results_count, qu_result = conn.execute_prepared(query, (order_id,))
+            result = [
+                OrderDish(dish_id=row['dish_id'],amount=row['amount'],price=row['current_price']) for row in qu_result
+            ]
     except Exception as e:
         failed = True
     finally:
         # will happen any way after code try termination or exception handling
-        conn.close()
+        _release(conn, session)
         return result
 
 
-def customer_rated_dish(cust_id: int, dish_id: int, rating: int) -> ReturnValue:
+def customer_rated_dish(cust_id: int, dish_id: int, rating: int, session: Optional[Connector.DBConnector] = None) -> ReturnValue:
     conn, final_status = None, ReturnValue.OK
     try:
-        conn = Connector.DBConnector()
-        query = (sql.SQL("INSERT INTO Ratings(cust_id, dish_id, rating) "
-                         "Values({cust_id}, {dish_id}, {rating})").format(
-            cust_id=sql.Literal(cust_id),
-            dish_id=sql.Literal(dish_id),
-            rating=sql.Literal(rating)))
+        conn = _connect(session)
+        query = ("INSERT INTO Ratings(cust_id, dish_id, rating) "
+                 "Values($1, $2, $3)")
 
-        conn.execute(query)
+        with conn.savepoint():
+            conn.execute_prepared(query, (cust_id, dish_id, rating))
     except DatabaseException.ConnectionInvalid as e:
         final_status = ReturnValue.ERROR
     except DatabaseException.NOT_NULL_VIOLATION as e:
@@ -503,141 +1325,164 @@ def customer_rated_dish(cust_id: int, dish_id: int, rating: int) -> ReturnValue:
     except Exception as e:
         final_status = ReturnValue.ERROR
     finally:
-        conn.close()
+        _release(conn, session)
         return final_status
 
 
-def customer_deleted_rating_on_dish(cust_id: int, dish_id: int) -> ReturnValue:
+def customer_deleted_rating_on_dish(cust_id: int, dish_id: int, session: Optional[Connector.DBConnector] = None) -> ReturnValue:
     conn, results_count, result, final_status = None, None, None, ReturnValue.OK
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("DELETE FROM Ratings"
-                        " WHERE cust_id={cust_id} AND dish_id={dish_id}").format(cust_id=sql.Literal(cust_id), dish_id=sql.Literal(dish_id))
-        results_count, result = conn.execute(query)
+        conn = _connect(session)
+        query = ("DELETE FROM Ratings"
+                 " WHERE cust_id=$1 AND dish_id=$2")
+        with conn.savepoint():
+            results_count, result = conn.execute_prepared(query, (cust_id, dish_id))
     except DatabaseException.FOREIGN_KEY_VIOLATION as e:
         final_status = ReturnValue.NOT_EXISTS
     except Exception as e:
         final_status = ReturnValue.ERROR
     finally:
-        conn.close()
+        _release(conn, session)
         if results_count == 0:
             final_status = ReturnValue.NOT_EXISTS
         return final_status
 
-def get_all_customer_ratings(cust_id: int) -> List[Tuple[int, int]]:
+def get_all_customer_ratings(cust_id: int, session: Optional[Connector.DBConnector] = None) -> List[Tuple[int, int]]:
     conn, results_count, result, failed = None, None, None, False
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL(
-            "SELECT dish_id, rating"
-            " FROM Ratings WHERE cust_id={cust_id}"
-            " ORDER BY dish_id ASC").format(
-            cust_id=sql.Literal(cust_id))
-        results_count, qu_result = conn.execute(query)
-        result = [
-            (row['dish_id'], row['rating']) for row in qu_result
-        ]
+        conn = _connect(session)
+        with conn.savepoint():
+            query = ("SELECT dish_id, rating"
+                     " FROM Ratings WHERE cust_id=$1"
+                     " ORDER BY dish_id ASC")
+            results_count, qu_result = conn.execute_prepared(query, (cust_id,))
+            result = [
+                (row['dish_id'], row['rating']) for row in qu_result
+            ]
     except Exception as e:
         failed = True
     finally:
         # will happen any way after code try termination or exception handling
-        conn.close()
+        _release(conn, session)
         return result
 # ---------------------------------- BASIC API: ----------------------------------
 
 # Basic API
 
 
-def get_order_total_price(order_id: int) -> float:
+def get_order_total_price(order_id: int, session: Optional[Connector.DBConnector] = None) -> float:
     conn, results_count, result, failed = None, None, [], False
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("SELECT subtotal FROM OrdersPrices WHERE order_id={order_id}").format(order_id=sql.Literal(order_id))
-        results_count, result = conn.execute(query)
+        conn = _connect(session)
+        with conn.savepoint():
+            query = "SELECT subtotal FROM OrdersPrices WHERE order_id=$1"
+            results_count, result = conn.execute_prepared(query, (order_id,))
     except Exception as e:
         failed = True
     finally:
         # will happen any way after code try termination or exception handling
-        conn.close()
+        _release(conn, session)
         if results_count != 1 or failed:
             return 0
         else:
             qu_res = result[0]
             return float(qu_res['subtotal'])
 
-def get_customers_spent_max_avg_amount_money() -> List[int]:
+@coalesced
+@memoized('OrderCustomer', 'Orders', 'OrderDish')
+def get_customers_spent_max_avg_amount_money(session: Optional[Connector.DBConnector] = None) -> List[int]:
     conn, results_count, result, failed = None, None, [], False
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL(
+        conn = _connect(session)
+        with conn.savepoint():
+            # the first entry of the average index gives the top average, its tier follows it in cust_id order
+            query = """
+                SELECT cust_id FROM CustomerSpend
+                WHERE avg_spent = (SELECT avg_spent FROM CustomerSpend ORDER BY avg_spent DESC LIMIT 1)
+                ORDER BY avg_spent DESC, cust_id ASC
             """
-            SELECT cust_id FROM
-                (SELECT OC.cust_id AS cust_id, AVG(COALESCE(OP.subtotal, 0)) AS avg_spent
-                 FROM OrderCustomer OC JOIN OrdersPrices OP on OC.order_id = OP.order_id
-                 GROUP BY OC.cust_id ) AS CustomerAvg
-                WHERE avg_spent = (SELECT MAX(avg_spent2) FROM (SELECT AVG(COALESCE(OP.subtotal, 0)) as avg_spent2 FROM OrderCustomer OC JOIN OrdersPrices OP on OC.order_id = OP.order_id
-                 GROUP BY OC.cust_id))
-                ORDER BY cust_id ASC
-            """)
-        results_count, qu_result = conn.execute(query)
-        result = [
-            row['cust_id'] for row in qu_result
-        ]
+            results_count, qu_result = conn.execute_prepared(query)
+            result = [
+                row['cust_id'] for row in qu_result
+            ]
     except Exception as e:
         failed = True
+        mark_failed()
     finally:
         # will happen any way after code try termination or exception handling
-        conn.close()
+        _release(conn, session)
         return result
 
 
-def get_most_ordered_dish_in_period(start: datetime, end: datetime) -> Dish:
-    conn, results_count, result, failed = None, None, None, False
+# the n customers with the highest average order subtotal, ties by cust_id
+def get_top_customers_by_avg_spend(n: int, session: Optional[Connector.DBConnector] = None) -> List[int]:
+    conn, results_count, result, failed = None, None, [], False
     try:
-        conn = Connector.DBConnector()
+        conn = _connect(session)
+        with conn.savepoint():
+            query = "SELECT cust_id FROM CustomerSpend ORDER BY avg_spent DESC, cust_id ASC LIMIT $1"
+            results_count, qu_result = conn.execute_prepared(query, (max(n, 0),))
+            result = [
+                row['cust_id'] for row in qu_result
+            ]
+    except Exception as e:
+        failed = True
+    finally:
+        # will happen any way after code try termination or exception handling
+        _release(conn, session)
+        return result
+
 
-        query = sql.SQL("SELECT D.dish_id, D.name, D.price, D.is_active, SUM(OD.amount) as tot_amount"
-                        " FROM (SELECT * FROM Orders WHERE date >= {start} AND date <= {end}) as O"
-                        " JOIN OrderDish as OD ON O.order_id = OD.order_id"
-                        " JOIN Dishes as D ON OD.dish_id=D.dish_id"
-                        " GROUP BY D.dish_id"
-                        " ORDER BY tot_amount DESC, D.dish_id ASC LIMIT 1").format(
-            start=sql.Literal(start),
-            end=sql.Literal(end))
-        results_count, result = conn.execute(query)
+@coalesced
+@memoized('Orders', 'OrderDish', 'Dishes')
+def get_most_ordered_dish_in_period(start: datetime, end: datetime, session: Optional[Connector.DBConnector] = None) -> Dish:
+    conn, results_count, result, failed = None, None, None, False
+    try:
+        conn = _connect(session)
+        with conn.savepoint():
+
+            query = ("SELECT D.dish_id, D.name, D.price, D.is_active, SUM(OD.amount) as tot_amount"
+                            " FROM (SELECT * FROM Orders WHERE date >= $1 AND date <= $2) as O"
+                            " JOIN OrderDish as OD ON O.order_id = OD.order_id"
+                            " JOIN Dishes as D ON OD.dish_id=D.dish_id"
+                            " GROUP BY D.dish_id"
+                            " ORDER BY tot_amount DESC, D.dish_id ASC LIMIT 1")
+            results_count, result = conn.execute_prepared(query, (start, end))
     except Exception as e:
         failed = True
+        mark_failed()
     finally:
         # will happen any way after code try termination or exception handling
-        conn.close()
+        _release(conn, session)
         if results_count != 1 or failed:
             return BadDish()
         else:
             qu_res = result[0]
             return Dish(dish_id=qu_res['dish_id'], name=qu_res['name'], price=qu_res['price'], is_active=qu_res['is_active'])
 
-def did_customer_order_top_rated_dishes(cust_id: int) -> bool:
+@coalesced
+@memoized('Ratings', 'Dishes', 'OrderDish', 'OrderCustomer')
+def did_customer_order_top_rated_dishes(cust_id: int, session: Optional[Connector.DBConnector] = None) -> bool:
     conn, results_count, result, failed = None, None, None, False
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("""SELECT EXISTS (
-                         SELECT 1 FROM OrderDish OD JOIN OrderCustomer OC ON OD.order_id=OC.order_id 
-                         WHERE OC.cust_id = {cust_id} AND
-                         OD.dish_id IN (
-                          SELECT NewRates.dish_id FROM
-                          (SELECT D.dish_id as dish_id, COALESCE(R.rating, 3.0) as new_rating FROM Dishes D LEFT JOIN Ratings R ON D.dish_id = R.dish_id) as NewRates
-                          GROUP BY NewRates.dish_id
-                          ORDER BY AVG(new_rating) DESC, NewRates.dish_id ASC
-                          LIMIT 5
-                         )
-                        ) AS did_order""").format(
-            cust_id=sql.Literal(cust_id))
-        results_count, result = conn.execute(query)
+        conn = _connect(session)
+        with conn.savepoint():
+            query = """SELECT EXISTS (
+                             SELECT 1 FROM CustomerDishOrders CDO
+                             WHERE CDO.cust_id = $1 AND
+                             CDO.dish_id IN (
+                              SELECT dish_id FROM DishRatingStats
+                              ORDER BY avg_rating DESC, dish_id ASC
+                              LIMIT 5
+                             )
+                            ) AS did_order"""
+            results_count, result = conn.execute_prepared(query, (cust_id,))
     except Exception as e:
         failed = True
+        mark_failed()
     finally:
         # will happen any way after code try termination or exception handling
-        conn.close()
+        _release(conn, session)
         if results_count != 1 or failed:
             return False
         else:
@@ -650,153 +1495,484 @@ def did_customer_order_top_rated_dishes(cust_id: int) -> bool:
 # Advanced API
 
 
-def get_customers_rated_but_not_ordered() -> List[int]:
+@coalesced
+@memoized('Ratings', 'Dishes', 'OrderDish', 'OrderCustomer')
+def get_customers_rated_but_not_ordered(session: Optional[Connector.DBConnector] = None) -> List[int]:
     conn, results_count, result, failed = None, None, None, False
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL(
-            """
-            SELECT DISTINCT R.cust_id
-            FROM ratings R
-            WHERE R.rating < 3
-              AND R.dish_id IN (
-                SELECT dish_id
-                FROM (
-                    SELECT D.dish_id, COALESCE(AVG(R2.rating), 3) AS avg_rating
-                    FROM dishes D
-                    LEFT JOIN ratings R2 ON D.dish_id = R2.dish_id
-                    GROUP BY D.dish_id
-                    ORDER BY avg_rating ASC, D.dish_id ASC
+        conn = _connect(session)
+        with conn.savepoint():
+            query = (
+                """
+                SELECT DISTINCT R.cust_id
+                FROM ratings R
+                WHERE R.rating < 3
+                  AND R.dish_id IN (
+                    SELECT dish_id
+                    FROM DishRatingStats
+                    ORDER BY avg_rating ASC, dish_id ASC
                     LIMIT 5
-                )
-              )
-              AND NOT EXISTS (
-                SELECT 1
-                FROM OrderCustomer OC
-                JOIN orderdish OD ON OC.order_id = OD.order_id
-                WHERE OC.cust_id = R.cust_id
-                  AND OD.dish_id = R.dish_id
-              )
-            ORDER BY R.cust_id ASC
-            """)
-        results_count, qu_result = conn.execute(query)
-        result = [
-            row['cust_id'] for row in qu_result
-        ]
+                  )
+                  AND NOT EXISTS (
+                    SELECT 1
+                    FROM CustomerDishOrders CDO
+                    WHERE CDO.cust_id = R.cust_id
+                      AND CDO.dish_id = R.dish_id
+                  )
+                ORDER BY R.cust_id ASC
+                """)
+            results_count, qu_result = conn.execute_prepared(query)
+            result = [
+                row['cust_id'] for row in qu_result
+            ]
     except Exception as e:
         failed = True
+        mark_failed()
     finally:
         # will happen any way after code try termination or exception handling
-        conn.close()
+        _release(conn, session)
         return result
 
 
-def get_non_worth_price_increase() -> List[int]:
+@coalesced
+@memoized('Dishes', 'OrderDish')
+def get_non_worth_price_increase(session: Optional[Connector.DBConnector] = None) -> List[int]:
     conn, results_count, result, failed = None, None, None, False
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL(
+        conn = _connect(session)
+        with conn.savepoint():
+            # the average profit of an order item at the current price against the best one at a lower price
+            query = """
+                SELECT D.dish_id AS dish_id
+                FROM Dishes D
+                JOIN DishPriceStats C ON C.dish_id = D.dish_id AND C.price = D.price
+                JOIN DishPriceStats P ON P.dish_id = D.dish_id AND P.price < D.price
+                WHERE D.is_active = TRUE
+                GROUP BY D.dish_id, C.amount_sum, C.item_count, D.price
+                HAVING C.amount_sum::decimal / C.item_count * D.price < MAX(P.amount_sum::decimal / P.item_count * P.price)
+                ORDER BY D.dish_id ASC
             """
-            SELECT CurrentPriceData.dish_id
-            FROM (
-            SELECT D.dish_id, D.price AS current_price, AVG(OD.amount) * D.price AS current_avg_profit
-            FROM Dishes D
-            JOIN orderdish OD ON D.dish_id = OD.dish_id AND D.price = OD.current_price
-            WHERE D.is_active = TRUE
-            GROUP BY D.dish_id, D.price
-            ) AS CurrentPriceData
-            JOIN (
-                SELECT
-                    OD.dish_id,
-                    OD.current_price AS old_price,
-                    AVG(OD.amount) * OD.current_price AS old_avg_profit
-                FROM orderdish OD
-                JOIN dishes D ON OD.dish_id = D.dish_id
-                WHERE OD.current_price < D.price  -- Ensures the price in the order is lower than current price
-                GROUP BY OD.dish_id, OD.current_price, OD.dish_id
-                ORDER BY OD.dish_id ASC
-            ) AS PastPriceData
-            ON CurrentPriceData.dish_id = PastPriceData.dish_id
-            WHERE PastPriceData.old_price < CurrentPriceData.current_price
-            GROUP BY CurrentPriceData.dish_id, CurrentPriceData.current_avg_profit
-            HAVING CurrentPriceData.current_avg_profit < MAX(PastPriceData.old_avg_profit)
-            ORDER BY CurrentPriceData.dish_id ASC
-            """)
-        results_count, qu_result = conn.execute(query)
-        result = [
-            row['dish_id'] for row in qu_result
-        ]
+            results_count, qu_result = conn.execute_prepared(query)
+            result = [
+                row['dish_id'] for row in qu_result
+            ]
     except Exception as e:
         failed = True
+        mark_failed()
     finally:
         # will happen any way after code try termination or exception handling
-        conn.close()
+        _release(conn, session)
         return result
 
 
-def get_cumulative_profit_per_month(year: int) -> List[Tuple[int, float]]:
+@coalesced
+@memoized('Orders', 'OrderDish')
+def get_cumulative_profit_per_month(year: int, session: Optional[Connector.DBConnector] = None) -> List[Tuple[int, float]]:
     conn, results_count, result, failed = None, None, None, False
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("""
-        WITH RECURSIVE all_months AS (
-            SELECT 1 as i
-            UNION
-            SELECT i+1
-            FROM all_months
-            WHERE i < 12
-        ) SELECT i as month, COALESCE((SELECT SUM(OP.subtotal) FROM Orders as O JOIN OrdersPrices as OP ON O.order_id = OP.order_id WHERE EXTRACT(YEAR FROM O.date) = {year} AND EXTRACT(MONTH FROM O.date) <= am.i ), 0.0) as total FROM all_months as am
-        ORDER BY month DESC
-        """).format(year=sql.Literal(year))
-        results_count, qu_result = conn.execute(query)
-        result = [
-            (row['month'], float(row['total'])) for row in qu_result
-        ]
+        conn = _connect(session)
+        with conn.savepoint():
+            # running sum over the monthly rollup, months without orders count as 0
+            query = """
+            SELECT M.month AS month, SUM(COALESCE(R.revenue, 0.0)) OVER (ORDER BY M.month) AS total
+            FROM generate_series(1, 12) AS M(month) LEFT JOIN MonthlyRevenue R ON R.year = $1 AND R.month = M.month
+            ORDER BY month DESC
+            """
+            results_count, qu_result = conn.execute_prepared(query, (year,))
+            result = [
+                (row['month'], float(row['total'])) for row in qu_result
+            ]
     except Exception as e:
         failed = True
+        mark_failed()
     finally:
         # will happen any way after code try termination or exception handling
-        conn.close()
+        _release(conn, session)
         return result
 
-def get_potential_dish_recommendations(cust_id: int) -> List[int]:
+# get_cumulative_profit_per_month of every year from start_year to end_year (inclusive) in one query,
+# as a dict year -> the list get_cumulative_profit_per_month returns for it
+@coalesced
+def get_cumulative_profit_per_month_in_years(start_year: int, end_year: int,
+                                             session: Optional[Connector.DBConnector] = None) -> Dict[int, List[Tuple[int, float]]]:
     conn, results_count, result, failed = None, None, None, False
     try:
-        conn = Connector.DBConnector()
-        query = sql.SQL("""
-        WITH RECURSIVE similar_customers AS (
-            SELECT R2.cust_id as cust_id
-            FROM Ratings as R1 JOIN Ratings as R2 ON R1.dish_id = R2.dish_id
-            WHERE R1.cust_id={cust_id}
-                AND R1.rating >= 4 AND R2.rating >= 4
-            UNION
-            SELECT R4.cust_id as cust_id
-            FROM Ratings as R3 INNER JOIN similar_customers as S ON R3.cust_id = S.cust_id
-                JOIN Ratings as R4 ON R3.dish_id = R4.dish_id
-            WHERE R3.rating >= 4 AND R4.rating >= 4
-        ) SELECT DISTINCT R5.dish_id as dish_id FROM similar_customers as S2
-        INNER JOIN Ratings as R5 ON S2.cust_id = R5.cust_id
-        WHERE S2.cust_id <> {cust_id} AND R5.dish_id NOT IN (
-            SELECT dish_id FROM OrderDish as OD LEFT JOIN OrderCustomer as OC ON OD.order_id = OC.order_id
-                           WHERE OC.cust_id = {cust_id}
-            )
-            AND R5.rating >= 4
-            ORDER BY dish_id ASC
-                        """).format(cust_id=sql.Literal(cust_id))
-        results_count, qu_result = conn.execute(query)
-        result = [
-            row['dish_id'] for row in qu_result
-        ]
+        conn = _connect(session)
+        with conn.savepoint():
+            query = """
+            SELECT Y.year AS year, M.month AS month,
+                   SUM(COALESCE(R.revenue, 0.0)) OVER (PARTITION BY Y.year ORDER BY M.month) AS total
+            FROM generate_series($1::integer, $2::integer) AS Y(year) CROSS JOIN generate_series(1, 12) AS M(month)
+            LEFT JOIN MonthlyRevenue R ON R.year = Y.year AND R.month = M.month
+            ORDER BY year ASC, month DESC
+            """
+            results_count, qu_result = conn.execute_prepared(query, (start_year, end_year))
+            result = {}
+            for row in qu_result:
+                result.setdefault(row['year'], []).append((row['month'], float(row['total'])))
     except Exception as e:
         failed = True
     finally:
         # will happen any way after code try termination or exception handling
-        conn.close()
+        _release(conn, session)
+        return result
+
+@coalesced
+@memoized('Ratings', 'OrderDish', 'OrderCustomer')
+def get_potential_dish_recommendations(cust_id: int, session: Optional[Connector.DBConnector] = None) -> List[int]:
+    conn, results_count, result, failed = None, None, None, False
+    try:
+        conn = _connect(session)
+        with conn.savepoint():
+            # components that lost a high rating since the last call are rebuilt first
+            _, refreshed = conn.execute_prepared("SELECT refresh_customer_components() AS stale")
+            skipped = refreshed[0]['stale'] is None
+            if skipped:
+                # a rating write is changing the components, the result is not memoized
+                mark_uncached()
+            if skipped and _stale_customers(conn, [cust_id]):
+                result = _similar_recommendations(conn, cust_id)
+            else:
+                query = """
+                SELECT DISTINCT R.dish_id AS dish_id
+                FROM CustomerComponents C1
+                JOIN CustomerComponents C2 ON C2.component = C1.component AND C2.cust_id <> C1.cust_id
+                JOIN Ratings R ON R.cust_id = C2.cust_id AND R.rating >= 4
+                WHERE C1.cust_id = $1 AND R.dish_id NOT IN (
+                    SELECT dish_id FROM CustomerDishOrders WHERE cust_id = $1
+                    )
+                ORDER BY dish_id ASC
+                """
+                results_count, qu_result = conn.execute_prepared(query, (cust_id,))
+                result = [
+                    row['dish_id'] for row in qu_result
+                ]
+    except Exception as e:
+        failed = True
+        mark_failed()
+    finally:
+        # will happen any way after code try termination or exception handling
+        _release(conn, session)
         return result
 
 
+# get_potential_dish_recommendations of many customers (every customer when cust_ids is None) in one call,
+# as a dict cust_id -> dish list. the dishes of a similarity component are collected once for all of its customers.
+# with processes > 1 the customers are split by component between that many worker processes, each with a
+# connection of its own (outside a session transaction only, the workers could not see its changes)
+def get_potential_dish_recommendations_batch(cust_ids: Optional[List[int]] = None, processes: int = 1,
+                                             session: Optional[Connector.DBConnector] = None) -> Dict[int, List[int]]:
+    conn, result, failed = None, None, False
+    try:
+        conn = _connect(session)
+        with conn.savepoint():
+            _, refreshed = conn.execute_prepared("SELECT refresh_customer_components() AS stale")
+            if cust_ids is None:
+                _, customers = conn.execute_prepared("SELECT cust_id FROM Customers ORDER BY cust_id")
+                cust_ids = customers['cust_id']
+            if processes > 1 and not conn.in_transaction():
+                result = _recommendations_in_processes(conn, cust_ids, processes)
+            else:
+                result = _recommendations(conn, cust_ids)
+            if refreshed[0]['stale'] is None:
+                for cust_id in _stale_customers(conn, cust_ids):
+                    result[cust_id] = _similar_recommendations(conn, cust_id)
+    except Exception as e:
+        failed = True
+    finally:
+        # will happen any way after code try termination or exception handling
+        _release(conn, session)
+        return result
+
+
+# the version of every table (Customers, Orders, Dishes, OrderCustomer, OrderDish, Ratings) as a dict
+# table name -> counter. a counter grows with every statement that writes to its table, so a result computed
+# while the tables it reads had the same versions is still valid. empty dict on failure
+def get_table_versions(session: Optional[Connector.DBConnector] = None) -> Dict[str, int]:
+    conn, results_count, result, failed = None, None, {}, False
+    try:
+        conn = _connect(session)
+        with conn.savepoint():
+            results_count, qu_result = conn.execute_prepared("SELECT table_name, version FROM TableVersions")
+            result = {row['table_name']: row['version'] for row in qu_result}
+    except Exception as e:
+        failed = True
+    finally:
+        # will happen any way after code try termination or exception handling
+        _release(conn, session)
+        return result
+
+
+# ---------------------------------- BULK API: ----------------------------------
+
+# Bulk API: each function inserts a whole list with multi-row statements and returns one ReturnValue
+# per item, meaning the same as the matching single-row function would have returned for it
+
+
+def add_customers(customers: List[Customer], session: Optional[Connector.DBConnector] = None) -> List[ReturnValue]:
+    statuses = _bulk_insert("INSERT INTO Customers(cust_id, full_name, age, phone) VALUES %s"
+                            " ON CONFLICT DO NOTHING RETURNING cust_id",
+                            customers,
+                            lambda c: (c.get_cust_id(), c.get_full_name(), c.get_age(), c.get_phone()),
+                            add_customer, session)
+    _invalidate(session, 'Customers',
+                *(c.get_cust_id() for c, status in zip(customers, statuses) if status == ReturnValue.OK))
+    return statuses
+
+
+def add_orders(orders: List[Order], session: Optional[Connector.DBConnector] = None) -> List[ReturnValue]:
+    statuses = _bulk_insert("INSERT INTO Orders(order_id, date, delivery_fee, delivery_address) VALUES %s"
+                            " ON CONFLICT DO NOTHING RETURNING order_id",
+                            orders,
+                            lambda o: (o.get_order_id(), format_timestamp_for_sql(o.get_datetime()),
+                                       o.get_delivery_fee(), o.get_delivery_address()),
+                            add_order, session)
+    _invalidate(session, 'Orders',
+                *(o.get_order_id() for o, status in zip(orders, statuses) if status == ReturnValue.OK))
+    return statuses
+
+
+def add_dishes(dishes: List[Dish], session: Optional[Connector.DBConnector] = None) -> List[ReturnValue]:
+    statuses = _bulk_insert("INSERT INTO Dishes(dish_id, name, price, is_active) VALUES %s"
+                            " ON CONFLICT DO NOTHING RETURNING dish_id",
+                            dishes,
+                            lambda d: (d.get_dish_id(), d.get_name(), d.get_price(), d.get_is_active()),
+                            add_dish, session)
+    _invalidate(session, 'Dishes',
+                *(d.get_dish_id() for d, status in zip(dishes, statuses) if status == ReturnValue.OK))
+    return statuses
+
+
+# placements are (customer_id, order_id) pairs
+def customers_placed_orders(placements: List[Tuple[int, int]],
+                            session: Optional[Connector.DBConnector] = None) -> List[ReturnValue]:
+    return _bulk_insert("INSERT INTO OrderCustomer(cust_id, order_id) VALUES %s"
+                        " ON CONFLICT DO NOTHING RETURNING order_id",
+                        placements,
+                        lambda p: (p[0], p[1]),
+                        lambda p, session: customer_placed_order(p[0], p[1], session=session), session,
+                        key=lambda row: (row[1],))
+
+
+# items are (order_id, OrderDish) pairs, the price of the OrderDish is ignored like in order_contains_dish
+def order_contains_dishes(items: List[Tuple[int, OrderDish]],
+                          session: Optional[Connector.DBConnector] = None) -> List[ReturnValue]:
+    return _bulk_insert("INSERT INTO OrderDish (order_id, dish_id, current_price, amount)"
+                        " SELECT V.order_id, V.dish_id, D.price, V.amount"
+                        " FROM (VALUES %s) AS V(order_id, dish_id, amount)"
+                        " JOIN Dishes D ON D.dish_id = V.dish_id AND D.is_active = TRUE"
+                        " ON CONFLICT DO NOTHING RETURNING order_id, dish_id",
+                        items,
+                        lambda i: (i[0], i[1].get_dish_id(), i[1].get_amount()),
+                        lambda i, session: order_contains_dish(i[0], i[1].get_dish_id(), i[1].get_amount(),
+                                                               session=session), session,
+                        key=lambda row: (row[0], row[1]),
+                        template="(%s::integer, %s::integer, %s::integer)",
+                        skipped=_skipped_order_items)
+
+
+# ratings are (cust_id, dish_id, rating) triples
+def customer_rated_dishes(ratings: List[Tuple[int, int, int]],
+                          session: Optional[Connector.DBConnector] = None) -> List[ReturnValue]:
+    return _bulk_insert("INSERT INTO Ratings(cust_id, dish_id, rating) VALUES %s"
+                        " ON CONFLICT DO NOTHING RETURNING cust_id, dish_id",
+                        ratings,
+                        lambda r: (r[0], r[1], r[2]),
+                        lambda r, session: customer_rated_dish(r[0], r[1], r[2], session=session), session,
+                        key=lambda row: (row[0], row[1]))
+
+
 # ---------------------------------- Utility: ----------------------------------
 
+# Sessions: with a session the API functions run inside the caller's transaction,
+# otherwise they borrow a connection of their own
+
+def _connect(session: Optional[Connector.DBConnector]) -> Connector.DBConnector:
+    return session if session is not None else Connector.DBConnector()
+
+
+def _release(conn: Connector.DBConnector, session: Optional[Connector.DBConnector]) -> None:
+    if session is None:
+        conn.close()
+
+
+# Entity cache: without a session get_customer, get_dish and get_order read through EntityCache.current()
+# when it is configured (a session may see rows of its own that are not committed yet). the writes of this
+# process drop the ids they touch when they commit, changes made by other processes are seen once the
+# entries expire
+
+def _cache(session: Optional[Connector.DBConnector]) -> Optional[EntityCache]:
+    return EntityCache.current() if session is None else None
+
+
+def _invalidate(conn: Optional[Connector.DBConnector], table: str, *keys) -> None:
+    cache = EntityCache.current()
+    if cache is None:
+        return
+    if conn is None:
+        cache.invalidate(table, *keys)
+    else:
+        # inside a transaction the old rows stay the committed ones until it commits
+        conn.after_commit(lambda: cache.invalidate(table, *keys))
+
+
+def _clear_cache() -> None:
+    cache = EntityCache.current()
+    if cache is not None:
+        cache.clear()
+    # recreated tables count their versions from 0 again
+    results = ResultCache.current()
+    if results is not None:
+        results.clear()
+
+
+# Bulk inserts: every page of items is sent as one "INSERT ... ON CONFLICT DO NOTHING RETURNING key" statement.
+# Items whose key comes back were inserted, the rest were skipped (ALREADY_EXISTS unless skipped() says otherwise).
+# A page that breaks a constraint is rolled back to its savepoint and split in halves until the failing items
+# are alone, those are then inserted by the single-row function to get its exact ReturnValue.
+
+_BULK_PAGE_SIZE = 1000
+
+
+def _bulk_insert(query: str, items: list, to_row, single, session: Optional[Connector.DBConnector],
+                 key=lambda row: (row[0],), template=None, skipped=None) -> List[ReturnValue]:
+    conn, statuses = None, [ReturnValue.ERROR] * len(items)
+
+    def insert(start: int, end: int) -> None:
+        rows = [to_row(item) for item in items[start:end]]
+        try:
+            with conn.savepoint():
+                _, returned = conn.execute_values(query, rows, template=template, page_size=len(rows))
+        except Exception as e:
+            if end - start == 1:
+                statuses[start] = single(items[start], session=conn)
+            else:
+                middle = (start + end) // 2
+                insert(start, middle)
+                insert(middle, end)
+            return
+        inserted = set(tuple(row) for row in returned.rows)
+        skipped_status = skipped(conn, rows) if skipped is not None else lambda row: ReturnValue.ALREADY_EXISTS
+        for index, row in zip(range(start, end), rows):
+            if key(row) in inserted:
+                # the first occurrence of a key is the one that got inserted
+                inserted.discard(key(row))
+                statuses[index] = ReturnValue.OK
+            else:
+                statuses[index] = skipped_status(row)
+
+    try:
+        conn = _connect(session)
+        with conn.transaction():
+            for start in range(0, len(items), _BULK_PAGE_SIZE):
+                insert(start, min(start + _BULK_PAGE_SIZE, len(items)))
+    except Exception as e:
+        statuses = [ReturnValue.ERROR] * len(items)
+    finally:
+        if conn is not None:
+            _release(conn, session)
+    return statuses
+
+
+# an order item is skipped either because the dish is missing or inactive (NOT_EXISTS) or because it is a duplicate
+def _skipped_order_items(conn: Connector.DBConnector, rows: list):
+    query = "SELECT dish_id FROM Dishes WHERE is_active = TRUE AND dish_id = ANY($1::integer[])"
+    _, result = conn.execute_prepared(query, ([row[1] for row in rows if isinstance(row[1], int)],))
+    active = set(result['dish_id'])
+    return lambda row: ReturnValue.ALREADY_EXISTS if row[1] in active else ReturnValue.NOT_EXISTS
+
+
+# Batch recommendations: a dish goes to a customer when some other member of the customer's component rated it
+# >= 4 (it has more high raters in the component than the customer alone) and the customer never ordered it
+
+_BATCH_RECOMMENDATIONS = """
+    WITH Targets AS (
+        SELECT DISTINCT C.cust_id, C.component
+        FROM CustomerComponents C JOIN unnest($1::integer[]) AS T(cust_id) ON C.cust_id = T.cust_id
+    ), ComponentDishes AS (
+        SELECT C.component, R.dish_id, COUNT(*) AS raters
+        FROM CustomerComponents C JOIN Ratings R ON R.cust_id = C.cust_id AND R.rating >= 4
+        WHERE C.component IN (SELECT component FROM Targets)
+        GROUP BY C.component, R.dish_id
+    ) SELECT T.cust_id AS cust_id, D.dish_id AS dish_id
+    FROM Targets T JOIN ComponentDishes D ON D.component = T.component
+    WHERE D.raters > (SELECT COUNT(*) FROM Ratings R
+                      WHERE R.cust_id = T.cust_id AND R.dish_id = D.dish_id AND R.rating >= 4)
+      AND NOT EXISTS (SELECT 1 FROM CustomerDishOrders CDO WHERE CDO.cust_id = T.cust_id AND CDO.dish_id = D.dish_id)
+    ORDER BY cust_id ASC, dish_id ASC
+"""
+
+
+def _recommendations(conn: Connector.DBConnector, cust_ids: List[int]) -> Dict[int, List[int]]:
+    result = {cust_id: [] for cust_id in cust_ids}
+    _, rows = conn.execute_prepared(_BATCH_RECOMMENDATIONS, (list(result),))
+    for row in rows:
+        result[row['cust_id']].append(row['dish_id'])
+    return result
+
+
+def _recommendations_in_processes(conn: Connector.DBConnector, cust_ids: List[int],
+                                  processes: int) -> Dict[int, List[int]]:
+    result = {cust_id: [] for cust_id in cust_ids}
+    # customers without a component get no recommendations, the others are sorted so that the customers
+    # of a component end up with the same worker
+    _, labels = conn.execute_prepared("SELECT cust_id, component FROM CustomerComponents"
+                                      " WHERE cust_id = ANY($1::integer[]) ORDER BY component, cust_id",
+                                      (list(result),))
+    ordered = labels['cust_id']
+    if not ordered:
+        return result
+    size = -(-len(ordered) // processes)
+    chunks = [ordered[start:start + size] for start in range(0, len(ordered), size)]
+    # spawned workers open connections of their own instead of inheriting the pooled ones of this process
+    with ProcessPoolExecutor(max_workers=len(chunks), mp_context=multiprocessing.get_context('spawn')) as pool:
+        for part in pool.map(_recommendations_worker, chunks):
+            result.update(part)
+    return result
+
+
+def _recommendations_worker(cust_ids: List[int]) -> Dict[int, List[int]]:
+    conn = Connector.DBConnector()
+    try:
+        return _recommendations(conn, cust_ids)
+    finally:
+        conn.close()
+
+
+# Stale components: while refresh_customer_components() is skipped, the customers of a component still marked
+# stale get the dishes of the customers similar to them from the ratings, with the recursive query the
+# components replaced
+
+_SIMILAR_RECOMMENDATIONS = """
+    WITH RECURSIVE similar_customers AS (
+        SELECT R2.cust_id as cust_id
+        FROM Ratings as R1 JOIN Ratings as R2 ON R1.dish_id = R2.dish_id
+        WHERE R1.cust_id = $1 AND R1.rating >= 4 AND R2.rating >= 4
+        UNION
+        SELECT R4.cust_id as cust_id
+        FROM Ratings as R3 INNER JOIN similar_customers as S ON R3.cust_id = S.cust_id
+            JOIN Ratings as R4 ON R3.dish_id = R4.dish_id
+        WHERE R3.rating >= 4 AND R4.rating >= 4
+    ) SELECT DISTINCT R5.dish_id as dish_id FROM similar_customers as S2
+    INNER JOIN Ratings as R5 ON S2.cust_id = R5.cust_id
+    WHERE S2.cust_id <> $1 AND R5.rating >= 4
+        AND R5.dish_id NOT IN (SELECT dish_id FROM CustomerDishOrders WHERE cust_id = $1)
+    ORDER BY dish_id ASC
+"""
+
+
+def _stale_customers(conn: Connector.DBConnector, cust_ids: List[int]) -> List[int]:
+    _, rows = conn.execute_prepared("SELECT C.cust_id FROM CustomerComponents C"
+                                    " JOIN StaleComponents S ON S.component = C.component"
+                                    " WHERE C.cust_id = ANY($1::integer[]) ORDER BY C.cust_id", (list(cust_ids),))
+    return rows['cust_id']
+
+
+def _similar_recommendations(conn: Connector.DBConnector, cust_id: int) -> List[int]:
+    _, rows = conn.execute_prepared(_SIMILAR_RECOMMENDATIONS, (cust_id,))
+    return rows['dish_id']
+
+
 # Timestamps for SQL
 
 def format_timestamp_for_sql(dt: datetime) -> str:
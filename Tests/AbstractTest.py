@@ -1,13 +1,27 @@
-import unittest
-import Solution as Solution
-
-
-class AbstractTest(unittest.TestCase):
-    # before each test, setUp is executed
-    def setUp(self) -> None:
-        Solution.drop_tables()
-        Solution.create_tables()
-
-    # after each test, tearDown is executed
-    def tearDown(self) -> None:
-        Solution.drop_tables()
+import unittest
+import Solution as Solution
+import Utility.DBConnector as Connector
+
+
+class AbstractTest(unittest.TestCase):
+    # before each test, setUp is executed
+    def setUp(self) -> None:
+        Solution.drop_tables()
+        Solution.create_tables()
+
+    # after each test, tearDown is executed
+    def tearDown(self) -> None:
+        Solution.drop_tables()
+
+    # the rows of query as tuples, read on a connection of its own
+    def query(self, query: str) -> list:
+        conn = Connector.DBConnector()
+        try:
+            _, result = conn.execute(query)
+            return [tuple(row.values()) for row in result]
+        finally:
+            conn.close()
+
+    # a table maintained by triggers holds the rows recomputed from the base tables
+    def assertConsistent(self, recomputed: str, stored: str) -> None:
+        self.assertEqual(self.query(recomputed), self.query(stored))
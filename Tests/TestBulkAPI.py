@@ -0,0 +1,81 @@
+import unittest
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer
+from Business.Dish import Dish
+from Business.Order import Order
+from Business.OrderDish import OrderDish
+from datetime import datetime
+
+
+class TestBulkAPI(AbstractTest):
+
+    def test_add_customers(self):
+        """Test: per-row statuses match add_customer, including duplicates inside the batch"""
+        Solution.add_customer(Customer(1, 'Alice', 25, "0123456789"))
+        result = Solution.add_customers([
+            Customer(1, 'Alice', 25, "0123456789"),
+            Customer(2, 'Bob', 30, "1234567890"),
+            Customer(3, 'Young', 17, "1234567890"),
+            Customer(2, 'Bob Again', 30, "1234567890"),
+            Customer(4, None, 30, "1234567890"),
+            Customer(5, 'Eve', 22, "4567890123"),
+        ])
+        self.assertEqual([ReturnValue.ALREADY_EXISTS, ReturnValue.OK, ReturnValue.BAD_PARAMS,
+                          ReturnValue.ALREADY_EXISTS, ReturnValue.BAD_PARAMS, ReturnValue.OK], result)
+        self.assertEqual(Customer(2, 'Bob', 30, "1234567890"), Solution.get_customer(2))
+        self.assertEqual(Customer(5, 'Eve', 22, "4567890123"), Solution.get_customer(5))
+
+    def test_add_orders_and_dishes(self):
+        """Test: orders and dishes are inserted in one call each"""
+        self.assertEqual([ReturnValue.OK, ReturnValue.BAD_PARAMS],
+                         Solution.add_orders([Order(1, datetime(2024, 1, 1, 12, 0, 0), 10.0, "Address1"),
+                                              Order(2, datetime(2024, 1, 1, 12, 0, 0), -1.0, "Address2")]))
+        self.assertEqual([ReturnValue.OK, ReturnValue.OK, ReturnValue.BAD_PARAMS],
+                         Solution.add_dishes([Dish(1, "Pizza", 50.0, True), Dish(2, "Burger", 30.0, False),
+                                              Dish(3, "Salad", 0, True)]))
+        self.assertEqual(Order(1, datetime(2024, 1, 1, 12, 0, 0), 10.0, "Address1"), Solution.get_order(1))
+        self.assertEqual(Dish(2, "Burger", 30.0, False), Solution.get_dish(2))
+
+    def test_order_items_and_placements(self):
+        """Test: missing or inactive dishes are NOT_EXISTS, duplicates ALREADY_EXISTS"""
+        Solution.add_customers([Customer(1, 'Alice', 25, "0123456789")])
+        Solution.add_dishes([Dish(1, "Pizza", 50.0, True), Dish(2, "Burger", 30.0, False)])
+        Solution.add_orders([Order(1, datetime(2024, 1, 1), 10.0, "Address1"),
+                             Order(2, datetime(2024, 1, 2), 5.0, "Address2")])
+        self.assertEqual([ReturnValue.OK, ReturnValue.NOT_EXISTS, ReturnValue.ALREADY_EXISTS],
+                         Solution.customers_placed_orders([(1, 1), (2, 2), (1, 1)]))
+        result = Solution.order_contains_dishes([
+            (1, OrderDish(1, 2)),
+            (1, OrderDish(2, 1)),
+            (1, OrderDish(3, 1)),
+            (1, OrderDish(1, 4)),
+            (3, OrderDish(1, 1)),
+            (2, OrderDish(1, -1)),
+            (2, OrderDish(1, 3)),
+        ])
+        self.assertEqual([ReturnValue.OK, ReturnValue.NOT_EXISTS, ReturnValue.NOT_EXISTS, ReturnValue.ALREADY_EXISTS,
+                          ReturnValue.NOT_EXISTS, ReturnValue.BAD_PARAMS, ReturnValue.OK], result)
+        self.assertEqual(110.0, Solution.get_order_total_price(1))
+        self.assertEqual(155.0, Solution.get_order_total_price(2))
+
+    def test_customer_rated_dishes(self):
+        """Test: ratings of unknown customers or dishes are NOT_EXISTS"""
+        Solution.add_customers([Customer(1, 'Alice', 25, "0123456789")])
+        Solution.add_dishes([Dish(1, "Pizza", 50.0, True)])
+        self.assertEqual([ReturnValue.OK, ReturnValue.NOT_EXISTS, ReturnValue.BAD_PARAMS, ReturnValue.ALREADY_EXISTS],
+                         Solution.customer_rated_dishes([(1, 1, 5), (2, 1, 5), (1, 1, 6), (1, 1, 4)]))
+        self.assertEqual([(1, 5)], Solution.get_all_customer_ratings(1))
+
+    def test_bulk_inside_session(self):
+        """Test: bulk calls join the caller's session"""
+        with Connector.DBConnector.session() as session:
+            Solution.add_customers([Customer(i, 'Name', 30, "0123456789") for i in range(1, 2501)], session=session)
+        self.assertEqual(Customer(2500, 'Name', 30, "0123456789"), Solution.get_customer(2500))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,108 @@
+import unittest
+import os
+import json
+import tempfile
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility import BulkLoader
+from Utility.ReturnValue import ReturnValue
+from Utility.Exceptions import DatabaseException
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer
+from Business.Dish import Dish
+from datetime import datetime
+
+
+class TestBulkLoader(AbstractTest):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+        super().tearDown()
+
+    def __sources(self) -> dict:
+        customers = os.path.join(self.directory.name, 'customers.csv')
+        with open(customers, 'w') as file:
+            file.write('phone,cust_id,full_name,age\n')
+            file.write('0123456789,1,"Alice, the first",25\n')
+            file.write('1234567890,2,Bob,30\n')
+        items = os.path.join(self.directory.name, 'items.jsonl')
+        with open(items, 'w') as file:
+            file.write(json.dumps({'order_id': 1, 'dish_id': 1, 'current_price': 50.0, 'amount': 2}) + '\n')
+            file.write(json.dumps({'order_id': 1, 'dish_id': 2, 'current_price': 30.0, 'amount': 1}) + '\n')
+        # deliberately out of foreign key order
+        return {
+            'OrderDish': items,
+            'Ratings': [(1, 1, 5), {'cust_id': 2, 'dish_id': 1, 'rating': 4}],
+            'OrderCustomer': [(1, 1)],
+            'Orders': [(1, datetime(2024, 1, 1, 12, 0, 0), 10.0, 'Address1')],
+            'Dishes': (dish for dish in [(1, 'Pizza', 50.0, True), (2, 'Burger', 30.0, False)]),
+            'Customers': customers,
+        }
+
+    def __check_loaded(self, stats: dict) -> None:
+        self.assertEqual(list(BulkLoader.TABLES), list(stats))
+        self.assertEqual([2, 1, 2, 1, 2, 2], [table_stats.rows for table_stats in stats.values()])
+        self.assertEqual(Customer(1, 'Alice, the first', 25, "0123456789"), Solution.get_customer(1))
+        self.assertEqual(Dish(2, 'Burger', 30.0, False), Solution.get_dish(2))
+        self.assertEqual(1, Solution.get_customer_that_placed_order(1).get_cust_id())
+        self.assertEqual(140.0, Solution.get_order_total_price(1))
+        self.assertEqual([(1, 5)], Solution.get_all_customer_ratings(1))
+
+    def test_load_all_tables(self):
+        """Test: files and iterables are loaded in foreign key order"""
+        self.__check_loaded(BulkLoader.load(self.__sources()))
+
+    def test_deferred_constraints_are_restored(self):
+        """Test: foreign keys dropped for the load exist again afterwards"""
+        self.__check_loaded(BulkLoader.load(self.__sources(), defer_constraints=True))
+        self.assertEqual(ReturnValue.NOT_EXISTS, Solution.customer_rated_dish(3, 1, 5))
+        self.assertEqual(ReturnValue.OK, Solution.delete_customer(1))
+        self.assertEqual([], Solution.get_all_customer_ratings(1))
+
+    def test_failed_load_rolls_back(self):
+        """Test: a constraint violation aborts the whole load"""
+        with self.assertRaises(DatabaseException.FOREIGN_KEY_VIOLATION):
+            BulkLoader.load({'Customers': [(1, 'Alice', 25, '0123456789')], 'Ratings': [(1, 7, 5)]})
+        self.assertEqual(-1, Solution.get_customer(1).get_cust_id())
+
+    def test_streamed_rows(self):
+        """Test: rows streamed from another table are loaded by column name"""
+        BulkLoader.load({'Customers': [(1, 'Alice', 25, '0123456789'), (2, 'Bob', 30, '1234567890')],
+                         'Dishes': [(1, 'Pizza', 50.0, True)]})
+        conn = Connector.DBConnector()
+        try:
+            rows = conn.stream("SELECT 5 AS rating, D.dish_id, C.cust_id FROM Customers C CROSS JOIN Dishes D")
+            stats = BulkLoader.load({'Ratings': rows})
+            _, customers = conn.execute("SELECT cust_id, 'Copy' AS full_name, age, phone FROM Customers")
+        finally:
+            conn.close()
+        self.assertEqual(2, stats['Ratings'].rows)
+        self.assertEqual([(1, 5)], Solution.get_all_customer_ratings(2))
+        Solution.clear_tables()
+        BulkLoader.load({'Customers': customers})
+        self.assertEqual(Customer(2, 'Copy', 30, "1234567890"), Solution.get_customer(2))
+
+    def test_none_is_null(self):
+        """Test: None and missing keys are loaded as NULL, not as empty strings"""
+        with self.assertRaises(DatabaseException.NOT_NULL_VIOLATION):
+            BulkLoader.load({'Customers': [(1, None, 30, '0123456789')]})
+        items = os.path.join(self.directory.name, 'customers.jsonl')
+        with open(items, 'w') as file:
+            file.write(json.dumps({'cust_id': 1, 'age': 30, 'phone': '0123456789'}) + '\n')
+        with self.assertRaises(DatabaseException.NOT_NULL_VIOLATION):
+            BulkLoader.load({'Customers': items})
+        BulkLoader.load({'Customers': [(1, '', 30, '0123456789')]})
+        self.assertEqual(Customer(1, '', 30, "0123456789"), Solution.get_customer(1))
+
+    def test_unknown_table(self):
+        """Test: only tables of the schema can be loaded"""
+        self.assertRaises(ValueError, BulkLoader.load, {'Users': []})
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,79 @@
+import unittest
+import queue
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.EntityCache import EntityCache
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer
+from Business.Dish import Dish
+
+
+class TestChangeNotifications(AbstractTest):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.changes = queue.Queue()
+        self.listener = Connector.DBConnector.add_invalidator(self.__record)
+        self.assertTrue(self.listener.wait_listening(10))
+
+    def tearDown(self) -> None:
+        Connector.DBConnector.remove_invalidator(self.__record)
+        super().tearDown()
+
+    def __record(self, table, keys) -> None:
+        self.changes.put((table, keys))
+
+    # the next change reported for table, skipping the others
+    def __next_change(self, table: str):
+        while True:
+            changed, keys = self.changes.get(timeout=10)
+            if changed == table:
+                return keys
+
+    def test_keys_of_changed_rows(self):
+        """Test: inserts, updates and deletes report their table and keys after they commit"""
+        Solution.add_dish(Dish(1, 'Pizza', 10.0, True))
+        self.assertEqual([1], self.__next_change('Dishes'))
+        Solution.update_dish_price(1, 12.0)
+        self.assertEqual([1], self.__next_change('Dishes'))
+        Solution.add_customer(Customer(5, 'Alice', 25, "0123456789"))
+        self.assertEqual([5], self.__next_change('Customers'))
+        Solution.customer_rated_dish(5, 1, 4)
+        self.assertEqual([(5, 1)], self.__next_change('Ratings'))
+        Solution.delete_customer(5)
+        self.assertEqual([5], self.__next_change('Customers'))
+        self.assertEqual([(5, 1)], self.__next_change('Ratings'))
+
+    def test_large_statement_and_rollback(self):
+        """Test: a statement changing many rows reports no keys, a rolled back one nothing"""
+        with self.assertRaises(RuntimeError):
+            with Connector.DBConnector.session() as session:
+                Solution.add_dish(Dish(1, 'Pizza', 10.0, True), session=session)
+                raise RuntimeError("abort")
+        Solution.add_dishes([Dish(i, 'Dish ' + str(i), 10.0, True) for i in range(2, 203)])
+        self.assertIsNone(self.__next_change('Dishes'))
+        self.assertTrue(self.changes.empty())
+
+    def test_entity_cache_follows_other_writers(self):
+        """Test: a cache that listens drops rows changed behind the back of Solution"""
+        cache = EntityCache.configure(ttl=3600.0, listen=True)
+        try:
+            Solution.add_dish(Dish(1, 'Pizza', 10.0, True))
+            self.__next_change('Dishes')
+            self.assertEqual(10.0, Solution.get_dish(1).get_price())
+            conn = Connector.DBConnector()
+            try:
+                conn.execute("UPDATE Dishes SET price = 15 WHERE dish_id = 1")
+            finally:
+                conn.close()
+            self.assertEqual([1], self.__next_change('Dishes'))
+            # the cache's own invalidator runs on the same listener thread, before ours
+            self.assertEqual(15.0, Solution.get_dish(1).get_price())
+            self.assertEqual(1, cache.stats('Dishes').invalidations)
+        finally:
+            EntityCache.configure(None)
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,86 @@
+import unittest
+import threading
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Utility.Exceptions import DatabaseException
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer
+
+
+class TestConnectionPool(AbstractTest):
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        Connector.DBConnector.configure_pool()
+
+    def __backend_pid(self) -> int:
+        conn = Connector.DBConnector()
+        try:
+            _, result = conn.execute("SELECT pg_backend_pid() AS pid")
+            return result[0]['pid']
+        finally:
+            conn.close()
+
+    def test_connection_is_reused(self):
+        """Test: consecutive connectors borrow the same server backend"""
+        self.assertEqual(self.__backend_pid(), self.__backend_pid())
+
+    def test_close_is_idempotent(self):
+        """Test: closing a connector twice returns its connection only once"""
+        Connector.DBConnector.configure_pool(min_size=0, max_size=2)
+        conn = Connector.DBConnector()
+        conn.close()
+        conn.close()
+        self.assertEqual(0, Connector.DBConnector.get_pool().stats()['in_use'])
+        self.assertEqual(1, Connector.DBConnector.get_pool().stats()['idle'])
+
+    def test_max_size_is_enforced(self):
+        """Test: a checkout fails once max_size connections are borrowed and the timeout expires"""
+        Connector.DBConnector.configure_pool(min_size=0, max_size=1, checkout_timeout=0.2)
+        first = Connector.DBConnector()
+        try:
+            self.assertRaises(DatabaseException.ConnectionInvalid, Connector.DBConnector)
+        finally:
+            first.close()
+        second = Connector.DBConnector()
+        second.close()
+
+    def test_failed_statement_does_not_poison_pool(self):
+        """Test: a connection returned in an aborted transaction is rolled back before reuse"""
+        Connector.DBConnector.configure_pool(min_size=0, max_size=1)
+        self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(1, 'Alice', 25, "0123456789")))
+        self.assertEqual(ReturnValue.ALREADY_EXISTS, Solution.add_customer(Customer(1, 'Alice', 25, "0123456789")))
+        self.assertEqual(Customer(1, 'Alice', 25, "0123456789"), Solution.get_customer(1))
+
+    def test_broken_connection_is_replaced(self):
+        """Test: a connection closed behind the pool's back is not handed out again"""
+        Connector.DBConnector.configure_pool(min_size=0, max_size=1, ping_after=0)
+        conn = Connector.DBConnector()
+        raw = conn.connection
+        conn.close()
+        raw.close()
+        Solution.add_customer(Customer(1, 'Alice', 25, "0123456789"))
+        self.assertEqual(Customer(1, 'Alice', 25, "0123456789"), Solution.get_customer(1))
+
+    def test_concurrent_calls(self):
+        """Test: many threads share a small pool without errors"""
+        Connector.DBConnector.configure_pool(min_size=1, max_size=3)
+        results = []
+
+        def worker(first_id: int) -> None:
+            for cust_id in range(first_id, first_id + 10):
+                results.append(Solution.add_customer(Customer(cust_id, 'Name', 30, "0123456789")))
+
+        threads = [threading.Thread(target=worker, args=(i * 10 + 1,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([ReturnValue.OK] * 80, results)
+        self.assertLessEqual(Connector.DBConnector.get_pool().stats()['created'], 3)
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
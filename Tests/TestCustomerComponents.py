@@ -0,0 +1,150 @@
+import unittest
+import random
+import threading
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer
+from Business.Dish import Dish
+from Business.Order import Order
+from Business.OrderDish import OrderDish
+from datetime import datetime
+
+# the recursive query get_potential_dish_recommendations used before the components were stored
+RECURSIVE_RECOMMENDATIONS = """
+    WITH RECURSIVE similar_customers AS (
+        SELECT R2.cust_id as cust_id
+        FROM Ratings as R1 JOIN Ratings as R2 ON R1.dish_id = R2.dish_id
+        WHERE R1.cust_id={cust_id} AND R1.rating >= 4 AND R2.rating >= 4
+        UNION
+        SELECT R4.cust_id as cust_id
+        FROM Ratings as R3 INNER JOIN similar_customers as S ON R3.cust_id = S.cust_id
+            JOIN Ratings as R4 ON R3.dish_id = R4.dish_id
+        WHERE R3.rating >= 4 AND R4.rating >= 4
+    ) SELECT DISTINCT R5.dish_id as dish_id FROM similar_customers as S2
+    INNER JOIN Ratings as R5 ON S2.cust_id = R5.cust_id
+    WHERE S2.cust_id <> {cust_id} AND R5.dish_id NOT IN (
+        SELECT dish_id FROM OrderDish as OD LEFT JOIN OrderCustomer as OC ON OD.order_id = OC.order_id
+        WHERE OC.cust_id = {cust_id})
+        AND R5.rating >= 4
+    ORDER BY dish_id ASC
+"""
+
+CUSTOMERS = 40
+DISHES = 30
+
+
+class TestCustomerComponents(AbstractTest):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.rand = random.Random(11)
+        Solution.add_customers([Customer(i, 'Customer', 30, "0123456789") for i in range(1, CUSTOMERS + 1)])
+        Solution.add_dishes([Dish(i, 'Dish ' + str(i), 10.0, True) for i in range(1, DISHES + 1)])
+        Solution.add_orders([Order(i, datetime(2024, 1, 1), 1.0, 'Address') for i in range(1, CUSTOMERS + 1)])
+        Solution.customers_placed_orders([(i, i) for i in range(1, CUSTOMERS + 1)])
+        Solution.order_contains_dishes([(self.rand.randint(1, CUSTOMERS), OrderDish(self.rand.randint(1, DISHES), 1, 10.0))
+                                        for _ in range(60)])
+
+    def __assert_same_as_recursive(self) -> None:
+        conn = Connector.DBConnector()
+        try:
+            for cust_id in range(1, CUSTOMERS + 1):
+                _, expected = conn.execute(RECURSIVE_RECOMMENDATIONS.format(cust_id=cust_id))
+                self.assertEqual(expected['dish_id'], Solution.get_potential_dish_recommendations(cust_id),
+                                 "recommendations of customer " + str(cust_id))
+        finally:
+            conn.close()
+
+    def __rate_randomly(self, count: int) -> None:
+        for _ in range(count):
+            cust_id, dish_id = self.rand.randint(1, CUSTOMERS), self.rand.randint(1, DISHES)
+            if self.rand.random() < 0.8:
+                Solution.customer_rated_dish(cust_id, dish_id, self.rand.randint(1, 5))
+            else:
+                Solution.customer_deleted_rating_on_dish(cust_id, dish_id)
+
+    def test_incremental_unions(self):
+        """Test: single-rating inserts and deletes give the same recommendations as the recursive query"""
+        for _ in range(4):
+            self.__rate_randomly(25)
+            self.__assert_same_as_recursive()
+
+    def test_bulk_insert_and_downgrades(self):
+        """Test: a bulk insert, downgrades and deletes of customers and dishes are rebuilt correctly"""
+        ratings = {(self.rand.randint(1, CUSTOMERS), self.rand.randint(1, DISHES)) for _ in range(200)}
+        Solution.customer_rated_dishes([(c, d, self.rand.randint(1, 5)) for c, d in sorted(ratings)])
+        conn = Connector.DBConnector()
+        try:
+            # one multi-row statement takes the batch path: its components wait for a rebuild
+            _, result = conn.execute("SELECT COUNT(*) AS stale FROM StaleComponents")
+            self.assertGreater(result[0]['stale'], 0)
+        finally:
+            conn.close()
+        self.__assert_same_as_recursive()
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("UPDATE Ratings SET rating = 3 WHERE rating >= 4 AND (cust_id + dish_id) % 3 = 0")
+            conn.execute("DELETE FROM Dishes WHERE dish_id = 7")
+        finally:
+            conn.close()
+        Solution.delete_customer(5)
+        self.__assert_same_as_recursive()
+        self.__rate_randomly(30)
+        self.__assert_same_as_recursive()
+
+    def test_batch_matches_single(self):
+        """Test: the batch function returns the single-customer recommendations of every customer"""
+        self.__rate_randomly(120)
+        single = {cust_id: Solution.get_potential_dish_recommendations(cust_id) for cust_id in range(1, CUSTOMERS + 1)}
+        self.assertEqual(single, Solution.get_potential_dish_recommendations_batch())
+        self.assertEqual({3: single[3], 4: single[4], 999: []},
+                         Solution.get_potential_dish_recommendations_batch([3, 4, 999, 3]))
+        self.assertEqual(single, Solution.get_potential_dish_recommendations_batch(processes=2))
+
+    # whether call() returns within 5 seconds in another thread
+    @staticmethod
+    def __returns(call) -> bool:
+        thread = threading.Thread(target=call, daemon=True)
+        thread.start()
+        thread.join(5)
+        return not thread.is_alive()
+
+    def test_refresh_does_not_wait(self):
+        """Test: a reader does not wait for a rating write that holds the components lock"""
+        Solution.customer_rated_dishes([(c, 1, 5) for c in range(1, 5)] + [(c, 2, 5) for c in range(5, 9)])
+        # leaves a component to rebuild
+        Solution.customer_deleted_rating_on_dish(4, 1)
+        with Connector.DBConnector.session() as union:
+            # joins the two components and holds the lock until it commits
+            Solution.customer_rated_dish(1, 2, 5, session=union)
+            recommendations = []
+            self.assertTrue(self.__returns(
+                lambda: recommendations.append(Solution.get_potential_dish_recommendations(1))))
+            # from the committed ratings, the pending rebuild is left for later
+            self.assertEqual([[1]], recommendations)
+            union.commit()
+        self.__assert_same_as_recursive()
+
+    def test_skipped_refresh_reads_the_ratings(self):
+        """Test: while the rebuild of a split component is skipped, its customers get the dishes of the ratings"""
+        Solution.customer_rated_dishes([(1, 10, 5), (2, 10, 5), (2, 11, 5), (3, 11, 5), (3, 12, 5)])
+        # customer 3 is no longer similar to customers 1 and 2, their component waits for a rebuild
+        Solution.customer_deleted_rating_on_dish(2, 11)
+        with Connector.DBConnector.session() as rating:
+            # holds the lock until it ends
+            Solution.customer_rated_dish(4, 20, 5, session=rating)
+            recommendations, batch = [], []
+            self.assertTrue(self.__returns(
+                lambda: recommendations.append(Solution.get_potential_dish_recommendations(1))))
+            self.assertTrue(self.__returns(
+                lambda: batch.append(Solution.get_potential_dish_recommendations_batch([1, 3, 4]))))
+            self.assertEqual([[10]], recommendations)
+            self.assertEqual([{1: [10], 3: [], 4: []}], batch)
+            rating.rollback()
+        self.__assert_same_as_recursive()
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
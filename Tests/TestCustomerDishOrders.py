@@ -0,0 +1,67 @@
+import unittest
+import random
+from datetime import datetime
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility import BulkLoader
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer
+from Business.Dish import Dish
+from Business.Order import Order
+
+
+class TestCustomerDishOrders(AbstractTest):
+
+    def __assert_consistent(self) -> None:
+        self.assertConsistent("SELECT OC.cust_id, OD.dish_id, SUM(OD.amount), COUNT(*)"
+                              " FROM OrderCustomer OC JOIN OrderDish OD ON OD.order_id = OC.order_id"
+                              " GROUP BY 1, 2 ORDER BY 1, 2",
+                              "SELECT cust_id, dish_id, total_amount, order_count FROM CustomerDishOrders"
+                              " ORDER BY 1, 2")
+
+    def test_follows_api_calls(self):
+        """Test: placements, order items and deletes of customers, orders and dishes keep the pairs right"""
+        rand = random.Random(9)
+        for i in range(1, 11):
+            Solution.add_customer(Customer(i, 'Customer', 30, "0123456789"))
+            Solution.add_dish(Dish(i, 'Dish ' + str(i), 10.0, True))
+        for order_id in range(1, 31):
+            Solution.add_order(Order(order_id, datetime(2024, 1, 1), 1.0, 'Address'))
+        for _ in range(150):
+            order_id, action = rand.randint(1, 30), rand.random()
+            if action < 0.2:
+                Solution.customer_placed_order(rand.randint(1, 10), order_id)
+            elif action < 0.8:
+                Solution.order_contains_dish(order_id, rand.randint(1, 10), rand.randint(1, 5))
+            else:
+                Solution.order_does_not_contain_dish(order_id, rand.randint(1, 10))
+        self.__assert_consistent()
+        Solution.delete_order(7)
+        Solution.delete_customer(3)
+        self.__assert_consistent()
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("DELETE FROM Dishes WHERE dish_id = 4")
+            conn.execute("UPDATE OrderDish SET amount = amount + 1 WHERE dish_id % 2 = 0")
+            conn.execute("UPDATE OrderDish SET order_id = 30 WHERE order_id = 29 AND dish_id NOT IN"
+                         " (SELECT dish_id FROM OrderDish WHERE order_id = 30)")
+            conn.execute("UPDATE OrderCustomer SET cust_id = 10 WHERE cust_id = 9")
+        finally:
+            conn.close()
+        self.__assert_consistent()
+
+    def test_follows_bulk_load(self):
+        """Test: COPY loads of the placements before and after the order items"""
+        BulkLoader.load({'Customers': [(i, 'Customer', 30, '0123456789') for i in range(1, 6)],
+                         'Orders': [(i, datetime(2024, 1, 1), 1.0, 'Address') for i in range(1, 41)],
+                         'Dishes': [(i, 'Dish ' + str(i), 10.0, True) for i in range(1, 6)],
+                         'OrderCustomer': [(i, i % 5 + 1) for i in range(1, 21)]})
+        BulkLoader.load({'OrderDish': [(i, d, 10.0, i % 3) for i in range(1, 41) for d in range(1, 6) if (i + d) % 2]})
+        BulkLoader.load({'OrderCustomer': [(i, i % 4 + 1) for i in range(21, 41)]})
+        self.__assert_consistent()
+        self.assertTrue(Solution.did_customer_order_top_rated_dishes(1))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,76 @@
+import unittest
+import random
+from datetime import datetime
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer
+from Business.Dish import Dish
+from Business.Order import Order
+
+# the query get_customers_spent_max_avg_amount_money ran on OrdersPrices before CustomerSpend
+AGGREGATED_MAX_AVG = """
+    SELECT cust_id FROM
+        (SELECT OC.cust_id AS cust_id, AVG(COALESCE(OP.subtotal, 0)) AS avg_spent
+         FROM OrderCustomer OC JOIN OrdersPrices OP on OC.order_id = OP.order_id
+         GROUP BY OC.cust_id ) AS CustomerAvg
+        WHERE avg_spent = (SELECT MAX(avg_spent2) FROM (SELECT AVG(COALESCE(OP.subtotal, 0)) as avg_spent2
+         FROM OrderCustomer OC JOIN OrdersPrices OP on OC.order_id = OP.order_id GROUP BY OC.cust_id))
+        ORDER BY cust_id ASC
+"""
+
+
+class TestCustomerSpend(AbstractTest):
+
+    def __assert_consistent(self) -> None:
+        self.assertConsistent("SELECT OC.cust_id, COUNT(*), SUM(T.subtotal), AVG(T.subtotal)"
+                              " FROM OrderCustomer OC JOIN OrderTotals T ON T.order_id = OC.order_id"
+                              " GROUP BY 1 ORDER BY 1",
+                              "SELECT cust_id, order_count, total_spent, avg_spent FROM CustomerSpend ORDER BY 1")
+        self.assertEqual([cust_id for (cust_id,) in self.query(AGGREGATED_MAX_AVG)],
+                         Solution.get_customers_spent_max_avg_amount_money())
+
+    def test_follows_orders(self):
+        """Test: placements, order items, fees and deletes keep the averages equal to the aggregate"""
+        rand = random.Random(4)
+        for i in range(1, 9):
+            Solution.add_customer(Customer(i, 'Customer', 30, "0123456789"))
+            Solution.add_dish(Dish(i, 'Dish ' + str(i), float(i), True))
+        for order_id in range(1, 41):
+            Solution.add_order(Order(order_id, datetime(2024, 1, 1), float(order_id % 3), 'Address'))
+        for _ in range(200):
+            order_id, action = rand.randint(1, 40), rand.random()
+            if action < 0.2:
+                Solution.customer_placed_order(rand.randint(1, 8), order_id)
+            elif action < 0.8:
+                Solution.order_contains_dish(order_id, rand.randint(1, 8), rand.randint(1, 3))
+            else:
+                Solution.order_does_not_contain_dish(order_id, rand.randint(1, 8))
+        self.__assert_consistent()
+        Solution.delete_order(5)
+        Solution.delete_customer(2)
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("UPDATE Orders SET delivery_fee = delivery_fee + 2 WHERE order_id % 4 = 0")
+            conn.execute("UPDATE OrderCustomer SET cust_id = 8 WHERE cust_id = 7")
+            conn.execute("DELETE FROM Dishes WHERE dish_id = 3")
+        finally:
+            conn.close()
+        self.__assert_consistent()
+
+    def test_top_customers(self):
+        """Test: the top customers by average spend, ties by id"""
+        for i in range(1, 5):
+            Solution.add_customer(Customer(i, 'Customer', 30, "0123456789"))
+        for order_id, (cust_id, fee) in enumerate([(1, 10.0), (1, 30.0), (2, 20.0), (3, 5.0), (4, 20.0)], 1):
+            Solution.add_order(Order(order_id, datetime(2024, 1, 1), fee, 'Address'))
+            Solution.customer_placed_order(cust_id, order_id)
+        self.assertEqual([1, 2, 4], Solution.get_customers_spent_max_avg_amount_money())
+        self.assertEqual([1, 2, 4, 3], Solution.get_top_customers_by_avg_spend(10))
+        self.assertEqual([1, 2], Solution.get_top_customers_by_avg_spend(2))
+        self.assertEqual([], Solution.get_top_customers_by_avg_spend(0))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
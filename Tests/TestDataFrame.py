@@ -0,0 +1,55 @@
+import unittest
+import numpy
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Tests.AbstractTest import AbstractTest
+from Business.Dish import Dish
+from Business.Order import Order
+from datetime import datetime
+
+
+class TestDataFrame(AbstractTest):
+
+    def setUp(self) -> None:
+        super().setUp()
+        Solution.add_orders([Order(1, datetime(2024, 1, 15, 12, 0, 0), 10.5, "Address1"),
+                             Order(2, datetime(2024, 2, 1, 8, 30, 0), 0, "Address2")])
+        Solution.add_dishes([Dish(1, "Pizza", 50.25, True), Dish(2, "Burger", 30.0, False)])
+        self.conn = Connector.DBConnector()
+
+    def tearDown(self) -> None:
+        self.conn.close()
+        super().tearDown()
+
+    def test_execute_df_column_types(self):
+        """Test: NUMERIC becomes float64, TIMESTAMP datetime64, integers int64, text object"""
+        frame = self.conn.execute_df("SELECT * FROM Orders ORDER BY order_id")
+        self.assertEqual(['order_id', 'date', 'delivery_fee', 'delivery_address'], list(frame.columns))
+        self.assertEqual(numpy.int64, frame['order_id'].dtype)
+        self.assertEqual(numpy.float64, frame['delivery_fee'].dtype)
+        self.assertTrue(numpy.issubdtype(frame['date'].dtype, numpy.datetime64))
+        self.assertEqual([10.5, 0.0], frame['delivery_fee'].tolist())
+        self.assertEqual(numpy.datetime64('2024-02-01T08:30:00'), frame['date'].to_numpy()[1])
+        self.assertEqual(['Address1', 'Address2'], frame['delivery_address'].tolist())
+
+    def test_to_numpy(self):
+        """Test: single columns convert to NumPy arrays, NULLs become nan"""
+        _, result = self.conn.execute("SELECT dish_id, price, is_active, NULLIF(dish_id, 2) AS maybe FROM Dishes"
+                                      " ORDER BY dish_id")
+        self.assertEqual([50.25, 30.0], result.to_numpy('PRICE').tolist())
+        self.assertEqual(bool, result.to_numpy('is_active').dtype)
+        maybe = result.to_numpy('maybe')
+        self.assertEqual(1.0, maybe[0])
+        self.assertTrue(numpy.isnan(maybe[1]))
+
+    def test_empty_result(self):
+        """Test: an empty result still has its columns"""
+        frame = self.conn.execute_df("SELECT dish_id, price FROM Dishes WHERE dish_id < 0")
+        self.assertEqual(['dish_id', 'price'], list(frame.columns))
+        self.assertEqual(0, len(frame))
+        self.assertEqual(numpy.float64, frame['price'].dtype)
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
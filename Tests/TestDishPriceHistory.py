@@ -0,0 +1,81 @@
+import unittest
+import random
+from datetime import datetime
+import Solution as Solution
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+from Business.Dish import Dish
+from Business.Order import Order
+
+# the query get_non_worth_price_increase ran on OrderDish before DishPriceStats
+GROUPED_NON_WORTH = """
+    SELECT CurrentPriceData.dish_id
+    FROM (
+    SELECT D.dish_id, D.price AS current_price, AVG(OD.amount) * D.price AS current_avg_profit
+    FROM Dishes D
+    JOIN orderdish OD ON D.dish_id = OD.dish_id AND D.price = OD.current_price
+    WHERE D.is_active = TRUE
+    GROUP BY D.dish_id, D.price
+    ) AS CurrentPriceData
+    JOIN (
+        SELECT OD.dish_id, OD.current_price AS old_price, AVG(OD.amount) * OD.current_price AS old_avg_profit
+        FROM orderdish OD
+        JOIN dishes D ON OD.dish_id = D.dish_id
+        WHERE OD.current_price < D.price
+        GROUP BY OD.dish_id, OD.current_price, OD.dish_id
+    ) AS PastPriceData
+    ON CurrentPriceData.dish_id = PastPriceData.dish_id
+    WHERE PastPriceData.old_price < CurrentPriceData.current_price
+    GROUP BY CurrentPriceData.dish_id, CurrentPriceData.current_avg_profit
+    HAVING CurrentPriceData.current_avg_profit < MAX(PastPriceData.old_avg_profit)
+    ORDER BY CurrentPriceData.dish_id ASC
+"""
+
+
+class TestDishPriceHistory(AbstractTest):
+
+    def test_non_worth_price_increase_matches_grouping(self):
+        """Test: the aggregates give the dishes the grouping over OrderDish gave, and equal it"""
+        rand = random.Random(5)
+        for dish_id in range(1, 9):
+            Solution.add_dish(Dish(dish_id, 'Dish ' + str(dish_id), 10.0, True))
+        for order_id in range(1, 31):
+            Solution.add_order(Order(order_id, datetime(2024, 1, 1), 1.0, 'Address'))
+        for _ in range(200):
+            dish_id = rand.randint(1, 8)
+            action = rand.random()
+            if action < 0.1:
+                Solution.update_dish_price(dish_id, rand.choice([5.0, 10.0, 15.0, 20.0]))
+            elif action < 0.15:
+                Solution.update_dish_active_status(dish_id, rand.random() < 0.7)
+            elif action < 0.8:
+                Solution.order_contains_dish(rand.randint(1, 30), dish_id, rand.randint(1, 6))
+            else:
+                Solution.order_does_not_contain_dish(rand.randint(1, 30), dish_id)
+        Solution.delete_order(4)
+        expected = [dish_id for (dish_id,) in self.query(GROUPED_NON_WORTH)]
+        self.assertEqual(expected, Solution.get_non_worth_price_increase())
+        self.assertConsistent("SELECT dish_id, current_price, SUM(amount), COUNT(*) FROM OrderDish"
+                              " GROUP BY 1, 2 ORDER BY 1, 2",
+                              "SELECT dish_id, price, amount_sum, item_count FROM DishPriceStats ORDER BY 1, 2")
+
+    def test_price_at(self):
+        """Test: every price change is recorded with the time it took effect"""
+        self.assertIsNone(Solution.get_dish_price_at(1, datetime.now()))
+        Solution.add_dish(Dish(1, 'Pizza', 10.0, True))
+        self.assertIsNone(Solution.get_dish_price_at(1, datetime(2000, 1, 1)))
+        self.assertEqual(10.0, Solution.get_dish_price_at(1, datetime.now()))
+        Solution.update_dish_price(1, 12.5)
+        Solution.update_dish_active_status(1, False)
+        self.assertEqual(ReturnValue.NOT_EXISTS, Solution.update_dish_price(1, 20.0))
+        history = self.query("SELECT valid_from, price FROM DishPriceHistory WHERE dish_id = 1 ORDER BY valid_from")
+        self.assertEqual([10, 12.5], [price for _, price in history])
+        self.assertEqual(10.0, Solution.get_dish_price_at(1, history[0][0]))
+        self.assertEqual(10.0, Solution.get_dish_price_at(1, history[0][0] + (history[1][0] - history[0][0]) / 2))
+        self.assertEqual(12.5, Solution.get_dish_price_at(1, history[1][0]))
+        self.assertEqual(12.5, Solution.get_dish_price_at(1, datetime(2100, 1, 1)))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
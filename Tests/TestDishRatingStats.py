@@ -0,0 +1,62 @@
+import unittest
+import random
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer
+from Business.Dish import Dish
+
+
+class TestDishRatingStats(AbstractTest):
+
+    def __assert_consistent(self) -> None:
+        self.assertConsistent(
+            "SELECT D.dish_id, COALESCE(SUM(R.rating), 0) AS s, COUNT(R.rating) AS c,"
+            " COUNT(*) FILTER (WHERE R.rating = 1) AS s1, COUNT(*) FILTER (WHERE R.rating = 2) AS s2,"
+            " COUNT(*) FILTER (WHERE R.rating = 3) AS s3, COUNT(*) FILTER (WHERE R.rating = 4) AS s4,"
+            " COUNT(*) FILTER (WHERE R.rating = 5) AS s5, COALESCE(AVG(R.rating), 3) AS a"
+            " FROM Dishes D LEFT JOIN Ratings R ON D.dish_id = R.dish_id GROUP BY D.dish_id ORDER BY D.dish_id",
+            "SELECT dish_id, rating_sum, rating_count, stars_1, stars_2, stars_3, stars_4, stars_5, avg_rating"
+            " FROM DishRatingStats ORDER BY dish_id")
+        # the top and bottom 5 the way the functions used to compute them
+        for direction in ('DESC', 'ASC'):
+            self.assertConsistent("SELECT D.dish_id FROM Dishes D LEFT JOIN Ratings R ON D.dish_id = R.dish_id"
+                                  " GROUP BY D.dish_id ORDER BY AVG(COALESCE(R.rating, 3.0)) " + direction +
+                                  ", D.dish_id ASC LIMIT 5",
+                                  "SELECT dish_id FROM DishRatingStats ORDER BY avg_rating " + direction +
+                                  ", dish_id ASC LIMIT 5")
+
+    def test_stats_follow_ratings(self):
+        """Test: sums, counts, histograms and averages match the ratings after random changes"""
+        rand = random.Random(3)
+        for cust_id in range(1, 16):
+            Solution.add_customer(Customer(cust_id, 'Customer', 30, "0123456789"))
+        for dish_id in range(1, 13):
+            Solution.add_dish(Dish(dish_id, 'Dish ' + str(dish_id), 10.0, True))
+        for _ in range(150):
+            cust_id, dish_id = rand.randint(1, 15), rand.randint(1, 12)
+            if rand.random() < 0.7:
+                Solution.customer_rated_dish(cust_id, dish_id, rand.randint(1, 5))
+            else:
+                Solution.customer_deleted_rating_on_dish(cust_id, dish_id)
+        self.__assert_consistent()
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("UPDATE Ratings SET rating = 6 - rating WHERE cust_id % 2 = 0")
+            conn.execute("UPDATE Ratings SET dish_id = 12 WHERE dish_id = 11 AND cust_id NOT IN"
+                         " (SELECT cust_id FROM Ratings WHERE dish_id = 12)")
+            conn.execute("DELETE FROM Dishes WHERE dish_id = 5")
+        finally:
+            conn.close()
+        Solution.delete_customer(3)
+        self.__assert_consistent()
+
+    def test_unrated_dish_counts_as_three(self):
+        """Test: a dish without ratings has avg_rating 3"""
+        Solution.add_dish(Dish(1, 'Pizza', 10.0, True))
+        self.assertEqual([(1, 0, 3)], self.query("SELECT dish_id, rating_count, avg_rating FROM DishRatingStats"))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,134 @@
+import unittest
+from datetime import datetime
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility import BulkLoader
+from Utility.EntityCache import EntityCache
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer, BadCustomer
+from Business.Dish import Dish, BadDish
+from Business.Order import Order, BadOrder
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestEntityCache(AbstractTest):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.cache = EntityCache.configure(ttl=60.0, negative_ttl=5.0)
+
+    def tearDown(self) -> None:
+        EntityCache.configure(None)
+        super().tearDown()
+
+    def test_read_through(self):
+        """Test: the second get of an id is a hit and returns an entity of its own"""
+        Solution.add_dish(Dish(1, 'Pizza', 10.0, True))
+        first = Solution.get_dish(1)
+        first.set_price(99.0)
+        self.assertEqual(Dish(1, 'Pizza', 10.0, True), Solution.get_dish(1))
+        stats = self.cache.stats('Dishes')
+        self.assertEqual((1, 1), (stats.hits, stats.misses))
+        Solution.add_order(Order(1, datetime(2024, 1, 1, 12, 0, 0), 5.0, 'Address'))
+        Solution.get_order(1)
+        self.assertEqual(Order(1, datetime(2024, 1, 1, 12, 0, 0), 5.0, 'Address'), Solution.get_order(1))
+        self.assertEqual(1, self.cache.stats('Orders').hits)
+
+    def test_writes_invalidate(self):
+        """Test: updates, deletes and adds of this process are seen by the next get"""
+        self.assertEqual(BadCustomer(), Solution.get_customer(1))
+        self.assertEqual(BadCustomer(), Solution.get_customer(1))
+        self.assertEqual(1, self.cache.stats('Customers').negative_hits)
+        Solution.add_customer(Customer(1, 'Alice', 25, "0123456789"))
+        self.assertEqual(Customer(1, 'Alice', 25, "0123456789"), Solution.get_customer(1))
+        Solution.delete_customer(1)
+        self.assertEqual(BadCustomer(), Solution.get_customer(1))
+
+        Solution.add_dish(Dish(1, 'Pizza', 10.0, True))
+        Solution.get_dish(1)
+        Solution.update_dish_price(1, 12.0)
+        self.assertEqual(12.0, Solution.get_dish(1).get_price())
+        Solution.update_dish_active_status(1, False)
+        self.assertFalse(Solution.get_dish(1).get_is_active())
+
+        self.assertEqual(BadOrder(), Solution.get_order(2))
+        Solution.add_orders([Order(2, datetime(2024, 1, 1), 5.0, 'Address')])
+        self.assertEqual(2, Solution.get_order(2).get_order_id())
+        Solution.delete_order(2)
+        self.assertEqual(BadOrder(), Solution.get_order(2))
+
+        self.assertEqual(BadDish(), Solution.get_dish(7))
+        BulkLoader.load({'Dishes': [(7, 'Dish 7', 10.0, True)]})
+        self.assertEqual(7, Solution.get_dish(7).get_dish_id())
+
+    def test_sessions(self):
+        """Test: reads in a session bypass the cache, writes in a session invalidate when it commits"""
+        Solution.add_customer(Customer(1, 'Alice', 25, "0123456789"))
+        with Connector.DBConnector.session() as session:
+            self.assertEqual(BadCustomer(), Solution.get_customer(2))
+            Solution.add_customer(Customer(2, 'Bob', 30, "0123456789"), session=session)
+            Solution.add_customers([Customer(3, 'Carol', 30, "0123456789")], session=session)
+            self.assertEqual('Bob', Solution.get_customer(2, session=session).get_full_name())
+            self.assertEqual(BadCustomer(), Solution.get_customer(2))
+            self.assertEqual(BadCustomer(), Solution.get_customer(3))
+        self.assertEqual('Bob', Solution.get_customer(2).get_full_name())
+        self.assertEqual('Carol', Solution.get_customer(3).get_full_name())
+        with self.assertRaises(RuntimeError):
+            with Connector.DBConnector.session() as session:
+                Solution.get_customer(1)
+                self.assertEqual(ReturnValue.OK, Solution.delete_customer(1, session=session))
+                raise RuntimeError("abort")
+        self.assertEqual(3, self.cache.size('Customers'))
+        self.assertEqual('Alice', Solution.get_customer(1).get_full_name())
+
+    def test_clear_tables(self):
+        """Test: clear_tables empties the cache"""
+        Solution.add_dish(Dish(1, 'Pizza', 10.0, True))
+        Solution.get_dish(1)
+        Solution.clear_tables()
+        self.assertEqual(BadDish(), Solution.get_dish(1))
+
+    def test_ttl_and_lru(self):
+        """Test: entries expire after their ttl and the least recently used ones are evicted"""
+        clock = FakeClock()
+        cache = EntityCache(ttl=10.0, negative_ttl=1.0, sizes={'Dishes': 2}, clock=clock)
+        for dish_id in (1, 2):
+            _, _, version = cache.lookup('Dishes', dish_id)
+            cache.store('Dishes', dish_id, {'dish_id': dish_id}, version)
+        _, _, version = cache.lookup('Customers', 5)
+        cache.store('Customers', 5, None, version)
+        self.assertEqual((True, None), cache.lookup('Customers', 5)[:2])
+        cache.lookup('Dishes', 1)
+        _, _, version = cache.lookup('Dishes', 3)
+        cache.store('Dishes', 3, {'dish_id': 3}, version)
+        self.assertFalse(cache.lookup('Dishes', 2)[0])
+        self.assertTrue(cache.lookup('Dishes', 1)[0])
+        clock.now = 2.0
+        self.assertFalse(cache.lookup('Customers', 5)[0])
+        self.assertTrue(cache.lookup('Dishes', 3)[0])
+        clock.now = 20.0
+        self.assertFalse(cache.lookup('Dishes', 3)[0])
+        self.assertEqual(1, cache.stats('Dishes').evictions)
+        self.assertEqual(1, cache.stats('Dishes').expirations)
+
+    def test_read_overtaken_by_write(self):
+        """Test: a row read before an invalidation of its table is not stored"""
+        cache = EntityCache()
+        _, _, version = cache.lookup('Dishes', 1)
+        cache.invalidate('Dishes', 1)
+        cache.store('Dishes', 1, {'dish_id': 1}, version)
+        self.assertFalse(cache.lookup('Dishes', 1)[0])
+        self.assertEqual(1, cache.stats('Dishes').discarded)
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
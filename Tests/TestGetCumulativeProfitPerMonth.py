@@ -1,5 +1,6 @@
 import unittest
 import Solution as Solution
+import Utility.DBConnector as Connector
 from Utility.ReturnValue import ReturnValue
 from Tests.AbstractTest import AbstractTest
 from Business.Customer import Customer
@@ -274,6 +275,36 @@ class TestGetCumulativeProfitPerMonth(AbstractTest):
         # Should still use the price at time of order (50.0)
         self.assertEqual(expected, result, "Should use price at time of order, all months show cumulative")
 
+    def test_rollup_follows_order_changes(self):
+        """Test: moving, re-pricing and deleting orders updates the monthly rollup"""
+        Solution.add_order(Order(1, datetime(2023, 1, 15, 12, 0, 0), 10.0, "Address1"))
+        Solution.add_order(Order(2, datetime(2023, 3, 15, 12, 0, 0), 5.0, "Address2"))
+        Solution.order_contains_dish(1, 1, 2)  # 110.0
+        Solution.order_contains_dish(2, 2, 1)  # 35.0
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("UPDATE Orders SET date = '2023-02-01 10:00:00', delivery_fee = 20 WHERE order_id = 1")
+        finally:
+            conn.close()
+        result = Solution.get_cumulative_profit_per_month(2023)
+        self.assertEqual([(4, 155.0), (3, 155.0), (2, 120.0), (1, 0.0)], result[-4:])
+        Solution.delete_order(1)
+        result = Solution.get_cumulative_profit_per_month(2023)
+        self.assertEqual([(4, 35.0), (3, 35.0), (2, 0.0), (1, 0.0)], result[-4:])
+
+    def test_multiple_years(self):
+        """Test: the multi-year variant returns the single-year curve of every year in the range"""
+        Solution.add_order(Order(1, datetime(2022, 6, 1, 12, 0, 0), 10.0, "Address1"))
+        Solution.add_order(Order(2, datetime(2023, 2, 1, 12, 0, 0), 5.0, "Address2"))
+        Solution.add_order(Order(3, datetime(2024, 12, 31, 23, 0, 0), 7.0, "Address3"))
+        Solution.order_contains_dish(2, 3, 2)
+        result = Solution.get_cumulative_profit_per_month_in_years(2021, 2024)
+        self.assertEqual([2021, 2022, 2023, 2024], list(result))
+        for year in range(2021, 2025):
+            self.assertEqual(Solution.get_cumulative_profit_per_month(year), result[year])
+        self.assertEqual((12, 45.0), result[2023][0])
+        self.assertEqual({}, Solution.get_cumulative_profit_per_month_in_years(2025, 2024))
+
 
 # *** DO NOT RUN EACH TEST MANUALLY ***
 if __name__ == '__main__':
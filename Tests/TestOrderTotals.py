@@ -0,0 +1,86 @@
+import unittest
+import random
+from datetime import datetime
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility import BulkLoader
+from Tests.AbstractTest import AbstractTest
+from Business.Order import Order
+from Business.Dish import Dish
+
+
+class TestOrderTotals(AbstractTest):
+
+    # the subtotals the way the old OrdersPrices view computed them
+    def __recomputed(self) -> dict:
+        conn = Connector.DBConnector()
+        try:
+            _, result = conn.execute("SELECT O.order_id, SUM(COALESCE(OD.current_price * OD.amount, 0)) + O.delivery_fee"
+                                     " AS subtotal FROM Orders O LEFT JOIN OrderDish OD ON O.order_id = OD.order_id"
+                                     " GROUP BY O.order_id")
+            return dict(zip(result['order_id'], result['subtotal']))
+        finally:
+            conn.close()
+
+    def __stored(self) -> dict:
+        conn = Connector.DBConnector()
+        try:
+            _, result = conn.execute("SELECT order_id, subtotal FROM OrdersPrices")
+            return dict(zip(result['order_id'], result['subtotal']))
+        finally:
+            conn.close()
+
+    def test_totals_follow_api_calls(self):
+        """Test: totals stay equal to the aggregate through adds, removals and deletes"""
+        rand = random.Random(7)
+        for dish_id in range(1, 6):
+            Solution.add_dish(Dish(dish_id, 'Dish ' + str(dish_id), 10.0 + dish_id, True))
+        for order_id in range(1, 11):
+            Solution.add_order(Order(order_id, datetime(2024, 1, order_id, 12, 0, 0), 2.5, 'Address'))
+        for _ in range(60):
+            order_id, dish_id = rand.randint(1, 10), rand.randint(1, 5)
+            if rand.random() < 0.6:
+                Solution.order_contains_dish(order_id, dish_id, rand.randint(1, 4))
+            else:
+                Solution.order_does_not_contain_dish(order_id, dish_id)
+            if rand.random() < 0.1:
+                Solution.update_dish_price(dish_id, rand.randint(5, 30))
+        Solution.delete_order(3)
+        conn = Connector.DBConnector()
+        try:
+            # cascades to OrderDish
+            conn.execute("DELETE FROM Dishes WHERE dish_id = 2")
+        finally:
+            conn.close()
+        self.assertEqual(self.__recomputed(), self.__stored())
+
+    def test_totals_follow_direct_updates(self):
+        """Test: updates of amount, current_price and delivery_fee move the totals"""
+        Solution.add_dish(Dish(1, 'Pizza', 10.0, True))
+        Solution.add_order(Order(1, datetime(2024, 1, 1, 12, 0, 0), 5.0, 'Address'))
+        Solution.add_order(Order(2, datetime(2024, 1, 2, 12, 0, 0), 5.0, 'Address'))
+        Solution.order_contains_dish(1, 1, 2)
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("UPDATE OrderDish SET amount = 3")
+            conn.execute("UPDATE OrderDish SET current_price = 12")
+            conn.execute("UPDATE Orders SET delivery_fee = delivery_fee + 1")
+            conn.execute("UPDATE OrderDish SET order_id = 2")
+        finally:
+            conn.close()
+        self.assertEqual(6.0, Solution.get_order_total_price(1))
+        self.assertEqual(42.0, Solution.get_order_total_price(2))
+        self.assertEqual(self.__recomputed(), self.__stored())
+
+    def test_totals_follow_bulk_load(self):
+        """Test: a COPY load updates every total in one statement"""
+        BulkLoader.load({'Orders': [(i, datetime(2024, 1, 1), 1.0, 'Address') for i in range(1, 101)],
+                         'Dishes': [(i, 'Dish ' + str(i), float(i), True) for i in range(1, 11)],
+                         'OrderDish': [(i, d, float(d), 2) for i in range(1, 101) for d in range(1, 4)]})
+        self.assertEqual(13.0, Solution.get_order_total_price(50))
+        self.assertEqual(self.__recomputed(), self.__stored())
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,70 @@
+import unittest
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer, BadCustomer
+
+
+class TestPreparedStatements(AbstractTest):
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        Connector.DBConnector.configure_pool()
+
+    def __prepared(self, conn: Connector.DBConnector) -> list:
+        _, result = conn.execute("SELECT statement FROM pg_prepared_statements ORDER BY prepare_time")
+        return result['statement'] if result.size() else []
+
+    def test_statement_is_prepared_once(self):
+        """Test: repeated calls reuse one prepared statement per query"""
+        Connector.DBConnector.configure_pool(min_size=0, max_size=1)
+        self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(1, 'Alice', 25, "0123456789")))
+        for _ in range(3):
+            self.assertEqual(Customer(1, 'Alice', 25, "0123456789"), Solution.get_customer(1))
+        self.assertEqual(BadCustomer(), Solution.get_customer(2))
+        conn = Connector.DBConnector()
+        try:
+            statements = self.__prepared(conn)
+            self.assertEqual(2, len(statements))
+            self.assertEqual(1, len([s for s in statements if 'SELECT * FROM Customers' in s]))
+        finally:
+            conn.close()
+
+    def test_least_recently_used_is_evicted(self):
+        """Test: the per-connection cache deallocates its least recently used statement"""
+        Connector.DBConnector.configure_pool(min_size=0, max_size=1, statement_cache_size=2)
+        conn = Connector.DBConnector()
+        try:
+            conn.execute_prepared("SELECT 1 AS one")
+            conn.execute_prepared("SELECT 2 AS two")
+            conn.execute_prepared("SELECT 1 AS one")
+            _, result = conn.execute_prepared("SELECT $1::integer AS three", (3,))
+            self.assertEqual(3, result[0]['three'])
+            statements = self.__prepared(conn)
+            self.assertEqual(2, len(statements))
+            self.assertFalse(any('SELECT 2' in s for s in statements))
+        finally:
+            conn.close()
+
+    def test_prepared_statement_survives_rollback(self):
+        """Test: a statement prepared inside a rolled back transaction stays usable"""
+        Connector.DBConnector.configure_pool(min_size=0, max_size=1)
+        conn = Connector.DBConnector()
+        try:
+            try:
+                with conn.transaction():
+                    Solution.add_customer(Customer(1, 'Alice', 25, "0123456789"), session=conn)
+                    raise RuntimeError()
+            except RuntimeError:
+                pass
+            self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(1, 'Alice', 25, "0123456789"),
+                                                                   session=conn))
+            self.assertEqual(Customer(1, 'Alice', 25, "0123456789"), Solution.get_customer(1, session=conn))
+        finally:
+            conn.close()
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,106 @@
+import unittest
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.QueryObserver import QueryObserver, QueryStats, normalize
+from Utility.ReturnValue import ReturnValue
+from Utility.Exceptions import DatabaseException
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer
+
+
+class RecordingObserver(QueryObserver):
+    def __init__(self) -> None:
+        self.calls = []
+
+    def before(self, event) -> None:
+        self.calls.append(('before', event.query))
+
+    def after(self, event) -> None:
+        self.calls.append(('after', event))
+
+    def error(self, event) -> None:
+        self.calls.append(('error', event))
+
+
+class TestQueryObserver(AbstractTest):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.observer = RecordingObserver()
+        self.stats = QueryStats()
+        Connector.DBConnector.add_observer(self.observer)
+        Connector.DBConnector.add_observer(self.stats)
+
+    def tearDown(self) -> None:
+        Connector.DBConnector.remove_observer(self.observer)
+        Connector.DBConnector.remove_observer(self.stats)
+        super().tearDown()
+
+    def test_before_and_after(self):
+        """Test: a Solution call reports its statement, caller, rows and timings"""
+        Solution.add_customer(Customer(1, 'Alice', 25, "0123456789"))
+        self.observer.calls.clear()
+        Solution.get_customer(1)
+        self.assertEqual(['before', 'after'], [kind for kind, _ in self.observer.calls])
+        event = self.observer.calls[1][1]
+        self.assertEqual("SELECT * FROM Customers WHERE cust_id=$1", event.query)
+        self.assertEqual((1,), event.params)
+        self.assertEqual('Solution.get_customer', event.caller)
+        self.assertEqual(1, event.rows_fetched)
+        self.assertGreater(event.bytes_fetched, 0)
+        self.assertGreaterEqual(event.duration, event.execute_time)
+        self.assertIsNone(event.exception)
+
+    def test_error(self):
+        """Test: a failing statement reports the exception class to error"""
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("INSERT INTO Customers(cust_id, full_name, age, phone) VALUES (1, 'Alice', 25, '0123456789')")
+            self.observer.calls.clear()
+            self.assertRaises(DatabaseException.UNIQUE_VIOLATION, conn.execute,
+                              "INSERT INTO Customers(cust_id, full_name, age, phone) VALUES (1, 'Bob', 30, '0123456789')")
+        finally:
+            conn.close()
+        self.assertEqual(['before', 'error'], [kind for kind, _ in self.observer.calls])
+        self.assertEqual(DatabaseException.UNIQUE_VIOLATION, self.observer.calls[1][1].exception)
+
+    def test_stats_group_by_template(self):
+        """Test: calls that differ only in their literals share one template"""
+        self.stats.reset()
+        conn = Connector.DBConnector()
+        try:
+            for cust_id in range(1, 6):
+                conn.execute("SELECT * FROM Customers WHERE cust_id=" + str(cust_id))
+        finally:
+            conn.close()
+        dump = self.stats.dump()
+        self.assertEqual(1, len(dump))
+        self.assertEqual("SELECT * FROM Customers WHERE cust_id=?", dump[0]['template'])
+        self.assertEqual(5, dump[0]['calls'])
+        self.assertEqual(5, sum(dump[0]['histogram'].values()))
+        self.stats.reset()
+        self.assertEqual([], self.stats.dump())
+
+    def test_normalize(self):
+        """Test: literals, IN lists and VALUES rows are folded"""
+        self.assertEqual("SELECT * FROM t WHERE a=? AND b=? AND c IN (?...) AND d=$1",
+                         normalize("SELECT *  FROM t\n WHERE a=1 AND b='it''s' AND c IN (1, 2,3) AND d=$1"))
+        self.assertEqual("INSERT INTO t VALUES (?...)",
+                         normalize("INSERT INTO t VALUES (1, 'a'), (2, 'b'), (3, 'c')"))
+
+    def test_observer_failure_is_ignored(self):
+        """Test: an observer that raises does not break the query"""
+        class Broken(QueryObserver):
+            def after(self, event) -> None:
+                raise RuntimeError()
+        broken = Broken()
+        Connector.DBConnector.add_observer(broken)
+        try:
+            self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(1, 'Alice', 25, "0123456789")))
+        finally:
+            Connector.DBConnector.remove_observer(broken)
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
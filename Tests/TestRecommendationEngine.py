@@ -0,0 +1,86 @@
+import unittest
+import random
+from datetime import datetime
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility import BulkLoader
+from Utility.QueryObserver import QueryObserver
+from Utility.RecommendationEngine import RecommendationEngine
+from Tests.AbstractTest import AbstractTest
+
+CUSTOMERS = 60
+DISHES = 40
+
+
+# commits an order item of customer 2 right after the snapshot read Ratings
+class CommitAfterRatings(QueryObserver):
+    def __init__(self) -> None:
+        self.done = False
+
+    def after(self, event) -> None:
+        if not self.done and 'FROM Ratings' in event.query:
+            self.done = True
+            Solution.order_contains_dish(2, 2, 1)
+
+
+class TestRecommendationEngine(AbstractTest):
+
+    def __load(self, seed: int, ratings: int) -> None:
+        rand = random.Random(seed)
+        rated = {(rand.randint(1, CUSTOMERS), rand.randint(1, DISHES)) for _ in range(ratings)}
+        # some orders have no customer and some customers place several orders
+        orders = range(1, CUSTOMERS + 21)
+        BulkLoader.load({
+            'Customers': [(i, 'Customer', 30, '0123456789') for i in range(1, CUSTOMERS + 1)],
+            'Orders': [(i, datetime(2024, 1, 1), 1.0, 'Address') for i in orders],
+            'Dishes': [(i, 'Dish ' + str(i), 10.0, True) for i in range(1, DISHES + 1)],
+            'OrderCustomer': [(i, rand.randint(1, CUSTOMERS)) for i in orders if i % 7 != 0],
+            'OrderDish': [(i, d, 10.0, 1) for i in orders for d in rand.sample(range(1, DISHES + 1), 3)],
+            'Ratings': [(c, d, rand.randint(1, 5)) for c, d in sorted(rated)],
+        })
+
+    def __assert_same_as_sql(self) -> None:
+        engine = RecommendationEngine.load()
+        for cust_id in range(0, CUSTOMERS + 2):
+            self.assertEqual(Solution.get_potential_dish_recommendations(cust_id), engine.recommendations(cust_id),
+                             "recommendations of customer " + str(cust_id))
+
+    def test_sparse_ratings(self):
+        """Test: many small components give the same recommendations as the SQL function"""
+        self.__load(1, 50)
+        self.__assert_same_as_sql()
+
+    def test_dense_ratings(self):
+        """Test: a few large components give the same recommendations as the SQL function"""
+        self.__load(2, 400)
+        self.__assert_same_as_sql()
+
+    def test_empty_snapshot(self):
+        """Test: without ratings nobody gets recommendations"""
+        engine = RecommendationEngine.load()
+        self.assertEqual([], engine.recommendations(1))
+        self.assertEqual(0, engine.component_count())
+
+    def test_snapshot_is_consistent(self):
+        """Test: a commit made while the snapshot loads is not seen by the tables read after it"""
+        BulkLoader.load({
+            'Customers': [(i, 'Customer', 30, '0123456789') for i in (1, 2)],
+            'Orders': [(2, datetime(2024, 1, 1), 1.0, 'Address')],
+            'Dishes': [(i, 'Dish ' + str(i), 10.0, True) for i in (1, 2)],
+            'OrderCustomer': [(2, 2)],
+            'Ratings': [(1, 1, 5), (1, 2, 5), (2, 1, 5)],
+        })
+        observer = CommitAfterRatings()
+        Connector.DBConnector.add_observer(observer)
+        try:
+            engine = RecommendationEngine.load()
+        finally:
+            Connector.DBConnector.remove_observer(observer)
+        self.assertTrue(observer.done)
+        self.assertEqual([1, 2], engine.recommendations(2))
+        self.assertEqual([1], Solution.get_potential_dish_recommendations(2))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,135 @@
+import unittest
+from datetime import datetime
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.ResultCache import ResultCache
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer
+from Business.Dish import Dish
+from Business.Order import Order
+
+
+class TestResultCache(AbstractTest):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.cache = ResultCache.configure(size=3)
+        Solution.add_customer(Customer(1, 'Alice', 25, "0123456789"))
+        Solution.add_dish(Dish(1, 'Pizza', 10.0, True))
+        Solution.add_order(Order(1, datetime(2024, 3, 1), 5.0, 'Address'))
+        Solution.customer_placed_order(1, 1)
+        Solution.order_contains_dish(1, 1, 2)
+
+    def tearDown(self) -> None:
+        ResultCache.configure(None)
+        super().tearDown()
+
+    def test_hits_until_a_dependency_changes(self):
+        """Test: results are served until a table they depend on changes, other tables do not matter"""
+        expected = Solution.get_cumulative_profit_per_month(2024)
+        served = Solution.get_cumulative_profit_per_month(year=2024)
+        self.assertEqual(expected, served)
+        served.clear()
+        self.assertEqual(expected, Solution.get_cumulative_profit_per_month(2024))
+        stats = self.cache.stats('get_cumulative_profit_per_month')
+        self.assertEqual((2, 1), (stats.hits, stats.misses))
+
+        # Ratings and Customers are not read by it
+        Solution.customer_rated_dish(1, 1, 5)
+        Solution.add_customer(Customer(2, 'Bob', 30, "0123456789"))
+        self.assertEqual(expected, Solution.get_cumulative_profit_per_month(2024))
+        self.assertEqual(3, stats.hits)
+
+        Solution.add_order(Order(2, datetime(2024, 5, 1), 5.0, 'Address'))
+        Solution.order_contains_dish(2, 1, 3)
+        self.assertNotEqual(expected, Solution.get_cumulative_profit_per_month(2024))
+        self.assertEqual(1, stats.stale)
+        self.assertAlmostEqual(0.6, stats.hit_rate())
+
+    def test_other_processes_writes(self):
+        """Test: a change made without the API is seen through the server-side versions"""
+        self.assertEqual(Dish(1, 'Pizza', 10.0, True), Solution.get_most_ordered_dish_in_period(
+            datetime(2024, 1, 1), datetime(2024, 12, 31)))
+        self.assertEqual([1], Solution.get_customers_spent_max_avg_amount_money())
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("UPDATE Dishes SET name = 'Pasta' WHERE dish_id = 1")
+        finally:
+            conn.close()
+        self.assertEqual('Pasta', Solution.get_most_ordered_dish_in_period(
+            datetime(2024, 1, 1), datetime(2024, 12, 31)).get_name())
+        self.assertEqual([1], Solution.get_customers_spent_max_avg_amount_money())
+        self.assertEqual(1, self.cache.stats('get_customers_spent_max_avg_amount_money').hits)
+        self.assertEqual(1, self.cache.stats('get_most_ordered_dish_in_period').stale)
+
+    def test_lru_eviction_and_sessions(self):
+        """Test: the least recently used result is evicted, calls with a session bypass the cache"""
+        for cust_id in (1, 2, 3):
+            Solution.get_potential_dish_recommendations(cust_id)
+        Solution.get_potential_dish_recommendations(1)
+        Solution.get_non_worth_price_increase()
+        self.assertEqual(3, self.cache.size())
+        stats = self.cache.stats('get_potential_dish_recommendations')
+        self.assertEqual((1, 3, 1), (stats.hits, stats.misses, stats.evictions))
+        Solution.get_potential_dish_recommendations(1)
+        self.assertEqual(2, stats.hits)
+        Solution.get_potential_dish_recommendations(2)
+        self.assertEqual(4, stats.misses)
+
+        with Connector.DBConnector.session() as session:
+            Solution.add_customer(Customer(2, 'Bob', 30, "0123456789"), session=session)
+            Solution.customer_rated_dish(2, 1, 1, session=session)
+            self.assertEqual([2], Solution.get_customers_rated_but_not_ordered(session=session))
+            session.rollback()
+        self.assertEqual([], Solution.get_customers_rated_but_not_ordered())
+        self.assertEqual(1, self.cache.stats('get_customers_rated_but_not_ordered').misses)
+
+    def test_failed_call_is_not_kept(self):
+        """Test: the default result of a failed query is returned but not served to the next call"""
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("ALTER TABLE CustomerSpend RENAME TO CustomerSpendMoved")
+            self.assertEqual([], Solution.get_customers_spent_max_avg_amount_money())
+            conn.execute("ALTER TABLE CustomerSpendMoved RENAME TO CustomerSpend")
+        finally:
+            conn.close()
+        self.assertEqual([1], Solution.get_customers_spent_max_avg_amount_money())
+        stats = self.cache.stats('get_customers_spent_max_avg_amount_money')
+        self.assertEqual((0, 2, 1), (stats.hits, stats.misses, stats.failures))
+        self.assertEqual([1], Solution.get_customers_spent_max_avg_amount_money())
+        self.assertEqual(1, stats.hits)
+
+    def test_skipped_refresh_is_not_kept(self):
+        """Test: recommendations read while a rating write holds the components lock are not served later"""
+        Solution.add_customer(Customer(2, 'Bob', 30, "0123456789"))
+        Solution.add_customer(Customer(3, 'Carol', 30, "0123456789"))
+        Solution.add_dish(Dish(2, 'Pasta', 10.0, True))
+        Solution.add_dish(Dish(3, 'Salad', 10.0, True))
+        for cust_id, dish_id in ((1, 2), (2, 2), (2, 3), (3, 3)):
+            Solution.customer_rated_dish(cust_id, dish_id, 5)
+        # splits the component of customers 1 to 3
+        Solution.customer_deleted_rating_on_dish(2, 3)
+        stats = self.cache.stats('get_potential_dish_recommendations')
+        with Connector.DBConnector.session() as session:
+            # holds the lock until it ends
+            Solution.customer_rated_dish(1, 3, 5, session=session)
+            self.assertEqual([2], Solution.get_potential_dish_recommendations(1))
+            self.assertEqual([2], Solution.get_potential_dish_recommendations(1))
+            self.assertEqual((0, 2, 2), (stats.hits, stats.misses, stats.uncached))
+            session.rollback()
+        self.assertEqual([2], Solution.get_potential_dish_recommendations(1))
+        self.assertEqual([2], Solution.get_potential_dish_recommendations(1))
+        self.assertEqual((1, 3, 2), (stats.hits, stats.misses, stats.uncached))
+
+    def test_cleared_with_the_tables(self):
+        """Test: recreated tables, whose versions start again, do not serve results of the old ones"""
+        self.assertTrue(Solution.did_customer_order_top_rated_dishes(1))
+        Solution.drop_tables()
+        Solution.create_tables()
+        self.assertFalse(Solution.did_customer_order_top_rated_dishes(1))
+        self.assertEqual(0, self.cache.stats('did_customer_order_top_rated_dishes').hits)
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
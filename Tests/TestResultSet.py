@@ -0,0 +1,53 @@
+import unittest
+from collections import namedtuple
+from Utility.DBConnector import ResultSet
+from Business.Customer import Customer
+
+Column = namedtuple('Column', 'name type_code')
+
+
+class TestResultSet(unittest.TestCase):
+
+    def setUp(self) -> None:
+        description = [Column('cust_id', 23), Column('full_name', 25), Column('age', 23), Column('phone', 25)]
+        self.result = ResultSet(description, [(1, 'Alice', 25, '0123456789'), (2, 'Bob', 30, '1234567890')])
+
+    def test_size(self):
+        """Test: size and isEmpty"""
+        self.assertEqual(2, self.result.size())
+        self.assertFalse(self.result.isEmpty())
+        self.assertTrue(ResultSet().isEmpty())
+
+    def test_row_access(self):
+        """Test: rows are case-insensitive mappings that can be unpacked into Business objects"""
+        row = self.result[1]
+        self.assertEqual('Bob', row['FULL_NAME'])
+        self.assertIsNone(row[0])
+        self.assertEqual(['cust_id', 'full_name', 'age', 'phone'], list(row))
+        self.assertEqual({'cust_id': 2, 'full_name': 'Bob', 'age': 30, 'phone': '1234567890'}, dict(row))
+        self.assertEqual(Customer(2, 'Bob', 30, '1234567890'), Customer(**row))
+        self.assertRaises(KeyError, row.__getitem__, 'missing')
+
+    def test_column_access(self):
+        """Test: a column is returned as a fresh list every time"""
+        names = self.result['Full_Name']
+        self.assertEqual(['Alice', 'Bob'], names)
+        names.append('Eve')
+        self.assertEqual(['Alice', 'Bob'], self.result['full_name'])
+        self.assertEqual([], ResultSet()['anything'])
+
+    def test_iteration_and_str(self):
+        """Test: iteration yields every row and str prints a header line and one line per row"""
+        self.assertEqual([1, 2], [row['cust_id'] for row in self.result])
+        self.assertEqual("cust_id   full_name   age   phone   \n"
+                         "1   Alice   25   0123456789   \n"
+                         "2   Bob   30   1234567890   \n", str(self.result))
+
+    def test_invalid_row(self):
+        """Test: an out of range row is an empty row"""
+        self.assertEqual({}, dict(self.result[5]))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
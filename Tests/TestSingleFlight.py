@@ -0,0 +1,103 @@
+import unittest
+import threading
+import time
+from datetime import datetime
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.SingleFlight import SingleFlight
+from Tests.AbstractTest import AbstractTest
+from Business.Dish import Dish
+from Business.Order import Order
+
+THREADS = 6
+
+
+class TestSingleFlight(AbstractTest):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.flights = SingleFlight.configure()
+        Solution.add_dish(Dish(1, 'Pizza', 10.0, True))
+        Solution.add_order(Order(1, datetime(2024, 3, 1), 5.0, 'Address'))
+        Solution.order_contains_dish(1, 1, 2)
+
+    def tearDown(self) -> None:
+        SingleFlight.configure(False)
+        super().tearDown()
+
+    # run call(i) in THREADS threads while MonthlyRevenue is locked, release it once every call is waiting
+    def __concurrently(self, call, name: str) -> list:
+        results = [None] * THREADS
+        threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, call(i))) for i in range(THREADS)]
+        stats = self.flights.stats(name)
+        calls = stats.calls + THREADS
+        with Connector.DBConnector.session() as session:
+            session.execute("LOCK TABLE MonthlyRevenue IN ACCESS EXCLUSIVE MODE")
+            for thread in threads:
+                thread.start()
+            deadline = time.monotonic() + 10
+            while stats.calls < calls:
+                if time.monotonic() > deadline:
+                    session.rollback()
+                    for thread in threads:
+                        thread.join()
+                    self.fail(f"only {stats.calls - calls + THREADS} of {THREADS} calls started")
+                time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_identical_calls_share_one_execution(self):
+        """Test: concurrent calls with the same arguments run the query once and all get its result"""
+        expected = Solution.get_cumulative_profit_per_month(2024)
+        results = self.__concurrently(lambda i: Solution.get_cumulative_profit_per_month(year=2024),
+                                      'get_cumulative_profit_per_month')
+        self.assertEqual([expected] * THREADS, results)
+        # every caller has a list of its own
+        self.assertEqual(THREADS, len({id(result) for result in results}))
+        stats = self.flights.stats('get_cumulative_profit_per_month')
+        self.assertEqual((THREADS + 1, 2, THREADS - 1), (stats.calls, stats.executions, stats.deduplicated))
+        self.assertEqual(0, self.flights.in_flight())
+
+    def test_different_arguments_and_sessions(self):
+        """Test: calls with other arguments or with a session are not coalesced"""
+        years = self.__concurrently(lambda i: Solution.get_cumulative_profit_per_month_in_years(2023 + i % 2, 2024),
+                                    'get_cumulative_profit_per_month_in_years')
+        self.assertEqual([2023, 2024] * (THREADS // 2), [min(result) for result in years])
+        stats = self.flights.stats('get_cumulative_profit_per_month_in_years')
+        self.assertEqual((2, THREADS - 2), (stats.executions, stats.deduplicated))
+
+        with Connector.DBConnector.session() as session:
+            Solution.get_cumulative_profit_per_month(2024, session=session)
+        self.assertEqual(0, self.flights.stats('get_cumulative_profit_per_month').calls)
+
+    def test_errors_reach_every_caller(self):
+        """Test: an exception of the shared execution is raised in the callers that waited for it"""
+        release = threading.Event()
+        errors = []
+
+        def failing():
+            release.wait()
+            raise ValueError('failed')
+
+        def call():
+            try:
+                self.flights.call('failing', ('failing',), failing)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        while self.flights.stats('failing').calls < 3:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(3, len(errors))
+        self.assertEqual(2, self.flights.stats('failing').deduplicated)
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,82 @@
+import unittest
+import json
+import os
+import tempfile
+from datetime import datetime
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer
+from Business.Order import Order
+from Business.Dish import Dish
+
+
+class TestSlowQueryLog(AbstractTest):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'slow.jsonl')
+
+    def tearDown(self) -> None:
+        Connector.DBConnector.configure_slow_query_log(None)
+        self.directory.cleanup()
+        super().tearDown()
+
+    def __records(self) -> list:
+        with open(self.path) as file:
+            return [json.loads(line) for line in file]
+
+    def test_slow_query_is_explained(self):
+        """Test: a statement over the threshold is logged with its caller, parameter count and plan"""
+        Solution.add_order(Order(1, datetime(2024, 3, 1, 12, 0, 0), 10.0, 'Address 1'))
+        log = Connector.DBConnector.configure_slow_query_log(0.0, self.path)
+        Solution.get_cumulative_profit_per_month(2024)
+        log.flush()
+        records = [r for r in self.__records() if r['caller'] == 'Solution.get_cumulative_profit_per_month']
+        self.assertEqual(1, len(records))
+        self.assertNotIn('params', records[0])
+        self.assertEqual(1, records[0]['param_count'])
+        self.assertIn('Execution Time', records[0]['plan'][0])
+        self.assertIn('Shared Hit Blocks', records[0]['plan'][0]['Plan'])
+
+    def test_fast_query_is_not_logged(self):
+        """Test: nothing is logged under the threshold"""
+        log = Connector.DBConnector.configure_slow_query_log(60.0, self.path)
+        Solution.get_customer(1)
+        log.flush()
+        self.assertEqual([], self.__records())
+
+    def test_write_is_not_re_run(self):
+        """Test: a slow UPDATE is only planned, it is not applied twice and its triggers do not fire again"""
+        Solution.add_dish(Dish(1, 'Pizza', 10.0, True))
+        version = Solution.get_table_versions()['Dishes']
+        log = Connector.DBConnector.configure_slow_query_log(0.0, self.path)
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("UPDATE Dishes SET price = price + 1")
+        finally:
+            conn.close()
+        log.flush()
+        self.assertEqual(11.0, Solution.get_dish(1).get_price())
+        self.assertEqual(version + 1, Solution.get_table_versions()['Dishes'])
+        records = [r for r in self.__records() if r['query'].startswith('UPDATE')]
+        self.assertEqual(1, len(records))
+        self.assertIn('Plan', records[0]['plan'][0])
+        self.assertNotIn('Execution Time', records[0]['plan'][0])
+
+    def test_same_template_explained_once(self):
+        """Test: repeated slow calls of one template are all logged but explained once per interval"""
+        Solution.add_customer(Customer(1, 'Alice', 25, "0123456789"))
+        log = Connector.DBConnector.configure_slow_query_log(0.0, self.path)
+        for _ in range(3):
+            Solution.get_customer(1)
+        log.flush()
+        records = [r for r in self.__records() if r['caller'] == 'Solution.get_customer']
+        self.assertEqual(3, len(records))
+        self.assertEqual(1, len([r for r in records if r['plan'] is not None]))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,54 @@
+import unittest
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.Exceptions import DatabaseException
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer
+
+
+class TestStreaming(AbstractTest):
+
+    def setUp(self) -> None:
+        super().setUp()
+        Solution.add_customers([Customer(i, 'Name' + str(i), 30, "0123456789") for i in range(1, 1001)])
+        self.conn = Connector.DBConnector()
+
+    def tearDown(self) -> None:
+        self.conn.close()
+        super().tearDown()
+
+    def test_stream_all_rows(self):
+        """Test: every row is yielded once, in query order, with case-insensitive columns"""
+        rows = self.conn.stream("SELECT cust_id, full_name FROM Customers ORDER BY cust_id", chunk_size=64)
+        ids = []
+        for row in rows:
+            self.assertEqual('Name' + str(row['cust_id']), row['FULL_NAME'])
+            ids.append(row['Cust_Id'])
+        self.assertEqual(list(range(1, 1001)), ids)
+
+    def test_stream_uses_server_side_cursor(self):
+        """Test: the rows come from a named cursor that is closed when the iteration ends"""
+        with self.conn.transaction():
+            rows = self.conn.stream("SELECT cust_id FROM Customers", chunk_size=10)
+            next(rows)
+            _, cursors = self.conn.execute("SELECT name FROM pg_cursors")
+            self.assertEqual(['stream_1'], cursors['name'])
+            rows.close()
+            _, cursors = self.conn.execute("SELECT name FROM pg_cursors")
+            self.assertEqual([], cursors['name'])
+
+    def test_stream_empty_result(self):
+        """Test: an empty result yields nothing"""
+        self.assertEqual([], list(self.conn.stream("SELECT * FROM Customers WHERE cust_id < 0")))
+
+    def test_stream_error(self):
+        """Test: errors surface while iterating and leave the connector usable"""
+        with self.assertRaises(Exception):
+            list(self.conn.stream("SELECT * FROM NoSuchTable"))
+        _, result = self.conn.execute("SELECT COUNT(*) AS total FROM Customers")
+        self.assertEqual(1000, result[0]['total'])
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,102 @@
+import unittest
+import threading
+from datetime import datetime
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility import BulkLoader
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer
+from Business.Dish import Dish
+from Business.Order import Order
+from Utility.ReturnValue import ReturnValue
+
+
+class TestTableVersions(AbstractTest):
+
+    # the tables whose versions changed since before
+    def __changed(self, before: dict) -> set:
+        after = Solution.get_table_versions()
+        self.assertEqual(set(before), set(after))
+        return {table for table in after if after[table] != before[table]}
+
+    def test_writes_bump_their_tables(self):
+        """Test: every write bumps the versions of the tables it changes and only those"""
+        versions = Solution.get_table_versions()
+        self.assertEqual({'Customers', 'Orders', 'Dishes', 'OrderCustomer', 'OrderDish', 'Ratings'}, set(versions))
+        Solution.add_dish(Dish(1, 'Pizza', 10.0, True))
+        self.assertEqual({'Dishes'}, self.__changed(versions))
+        versions = Solution.get_table_versions()
+        Solution.add_order(Order(1, datetime(2024, 1, 1), 1.0, 'Address'))
+        Solution.order_contains_dish(1, 1, 2)
+        self.assertEqual({'Orders', 'OrderDish'}, self.__changed(versions))
+        versions = Solution.get_table_versions()
+        Solution.get_order_total_price(1)
+        Solution.get_non_worth_price_increase()
+        self.assertEqual(set(), self.__changed(versions))
+        Solution.add_customer(Customer(1, 'Alice', 25, "0123456789"))
+        Solution.customer_rated_dish(1, 1, 5)
+        versions = Solution.get_table_versions()
+        # cascades into Ratings
+        Solution.delete_customer(1)
+        self.assertEqual({'Customers', 'Ratings'}, self.__changed(versions))
+        versions = Solution.get_table_versions()
+        BulkLoader.load({'Customers': [(2, 'Customer', 30, '0123456789')]})
+        self.assertEqual({'Customers'}, self.__changed(versions))
+
+    def test_versions_follow_commit(self):
+        """Test: a version changed in a transaction becomes visible when it commits, and not after a rollback"""
+        versions = Solution.get_table_versions()
+        with self.assertRaises(RuntimeError):
+            with Connector.DBConnector.session() as session:
+                Solution.add_dish(Dish(1, 'Pizza', 10.0, True), session=session)
+                self.assertEqual({'Dishes'}, {table for table, version in
+                                              Solution.get_table_versions(session=session).items()
+                                              if version != versions[table]})
+                self.assertEqual(set(), self.__changed(versions))
+                raise RuntimeError("abort")
+        self.assertEqual(set(), self.__changed(versions))
+
+    def test_writers_do_not_wait_for_each_other(self):
+        """Test: two sessions that write the same tables in different orders do not block or deadlock"""
+        results = []
+        dish_added = threading.Event()
+
+        def other():
+            with Connector.DBConnector.session() as session:
+                results.append(Solution.add_dish(Dish(2, 'Pasta', 10.0, True), session=session))
+                dish_added.set()
+                results.append(Solution.add_order(Order(2, datetime(2024, 2, 1), 1.0, 'Address'), session=session))
+
+        versions = Solution.get_table_versions()
+        thread = threading.Thread(target=other)
+        with Connector.DBConnector.session() as session:
+            results.append(Solution.add_order(Order(1, datetime(2024, 1, 1), 1.0, 'Address'), session=session))
+            thread.start()
+            self.assertTrue(dish_added.wait(10))
+            results.append(Solution.add_dish(Dish(1, 'Pizza', 10.0, True), session=session))
+            thread.join(10)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual([ReturnValue.OK] * 4, results)
+        after = Solution.get_table_versions()
+        self.assertEqual((versions['Orders'] + 2, versions['Dishes'] + 2), (after['Orders'], after['Dishes']))
+
+    def test_fold_keeps_the_versions(self):
+        """Test: folding the change log into the counters leaves every version as it was"""
+        Solution.add_dish(Dish(1, 'Pizza', 10.0, True))
+        Solution.add_order(Order(1, datetime(2024, 1, 1), 1.0, 'Address'))
+        versions = Solution.get_table_versions()
+        conn = Connector.DBConnector()
+        try:
+            conn.execute("SELECT tableversions_fold()")
+            _, changes = conn.execute("SELECT COUNT(*) AS changes FROM TableChanges")
+        finally:
+            conn.close()
+        self.assertEqual(0, changes[0]['changes'])
+        self.assertEqual(versions, Solution.get_table_versions())
+        Solution.add_dish(Dish(2, 'Pasta', 10.0, True))
+        self.assertEqual({'Dishes'}, self.__changed(versions))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
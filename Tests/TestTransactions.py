@@ -0,0 +1,109 @@
+import unittest
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Utility.ReturnValue import ReturnValue
+from Utility.Exceptions import DatabaseException
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer, BadCustomer
+from Business.Dish import Dish
+from Business.Order import Order
+from datetime import datetime
+
+
+class TestTransactions(AbstractTest):
+
+    def test_session_commits_at_end(self):
+        """Test: writes made through a session are invisible to other connections until the block ends"""
+        with Connector.DBConnector.session() as session:
+            self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(1, 'Alice', 25, "0123456789"), session=session))
+            self.assertEqual(Customer(1, 'Alice', 25, "0123456789"), Solution.get_customer(1, session=session))
+            self.assertEqual(BadCustomer(), Solution.get_customer(1))
+        self.assertEqual(Customer(1, 'Alice', 25, "0123456789"), Solution.get_customer(1))
+
+    def test_session_rolls_back_on_exception(self):
+        """Test: an exception inside the block discards every write of the session"""
+        with self.assertRaises(RuntimeError):
+            with Connector.DBConnector.session() as session:
+                Solution.add_customer(Customer(1, 'Alice', 25, "0123456789"), session=session)
+                raise RuntimeError("abort")
+        self.assertEqual(BadCustomer(), Solution.get_customer(1))
+
+    def test_failing_item_keeps_the_rest(self):
+        """Test: a failing call inside a session is undone alone and reports the usual ReturnValue"""
+        with Connector.DBConnector.session() as session:
+            self.assertEqual(ReturnValue.OK, Solution.add_dish(Dish(1, "Pizza", 50.0, True), session=session))
+            self.assertEqual(ReturnValue.OK, Solution.add_order(Order(1, datetime(2024, 1, 1), 10.0, "Address1"), session=session))
+            self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(1, 1, 2, session=session))
+            self.assertEqual(ReturnValue.ALREADY_EXISTS, Solution.order_contains_dish(1, 1, 3, session=session))
+            self.assertEqual(ReturnValue.BAD_PARAMS, Solution.add_dish(Dish(2, "Bad", 10.0, True), session=session))
+            self.assertEqual(ReturnValue.NOT_EXISTS, Solution.customer_placed_order(7, 1, session=session))
+            self.assertEqual(110.0, Solution.get_order_total_price(1, session=session))
+        self.assertEqual(110.0, Solution.get_order_total_price(1))
+        self.assertEqual(Dish(1, "Pizza", 50.0, True), Solution.get_dish(1))
+
+    def test_savepoint_reraises_mapped_exception(self):
+        """Test: savepoint() rolls back its block and re-raises the translated violation"""
+        conn = Connector.DBConnector()
+        try:
+            with conn.transaction():
+                conn.execute("INSERT INTO Customers VALUES (1, 'Alice', 25, '0123456789')")
+                with self.assertRaises(DatabaseException.UNIQUE_VIOLATION):
+                    with conn.savepoint():
+                        conn.execute("INSERT INTO Customers VALUES (1, 'Alice', 25, '0123456789')")
+                conn.execute("INSERT INTO Customers VALUES (2, 'Bob', 30, '1234567890')")
+        finally:
+            conn.close()
+        self.assertEqual(Customer(2, 'Bob', 30, "1234567890"), Solution.get_customer(2))
+
+    def test_nested_transaction_is_a_savepoint(self):
+        """Test: an inner transaction() failure does not undo the outer one"""
+        conn = Connector.DBConnector()
+        try:
+            with conn.transaction():
+                conn.execute("INSERT INTO Customers VALUES (1, 'Alice', 25, '0123456789')")
+                try:
+                    with conn.transaction():
+                        conn.execute("INSERT INTO Customers VALUES (2, 'Bob', 30, '1234567890')")
+                        raise RuntimeError("inner")
+                except RuntimeError:
+                    pass
+        finally:
+            conn.close()
+        self.assertEqual(Customer(1, 'Alice', 25, "0123456789"), Solution.get_customer(1))
+        self.assertEqual(BadCustomer(), Solution.get_customer(2))
+
+    def test_failing_read_keeps_the_session(self):
+        """Test: a read that fails inside a session is undone alone, later writes still commit"""
+        with Connector.DBConnector.session() as session:
+            self.assertEqual(ReturnValue.OK, Solution.add_dish(Dish(1, "Pizza", 50.0, True), session=session))
+            self.assertIsNone(Solution.get_dish_price_at(1, 'not a timestamp', session=session))
+            self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(1, 'Alice', 25, "0123456789"), session=session))
+            self.assertEqual(50.0, Solution.get_dish_price_at(1, datetime(2100, 1, 1), session=session))
+        self.assertEqual(Customer(1, 'Alice', 25, "0123456789"), Solution.get_customer(1))
+        self.assertEqual(Dish(1, "Pizza", 50.0, True), Solution.get_dish(1))
+
+    def test_aborted_transaction_is_not_committed(self):
+        """Test: a statement failing outside a savepoint makes the block roll back and raise, without callbacks"""
+        committed = []
+        conn = Connector.DBConnector()
+        try:
+            with self.assertRaises(DatabaseException.UNKNOWN_ERROR):
+                with conn.transaction():
+                    conn.execute("INSERT INTO Customers VALUES (1, 'Alice', 25, '0123456789')")
+                    conn.after_commit(lambda: committed.append(True))
+                    try:
+                        conn.execute("SELECT 1 / 0")
+                    except Exception:
+                        pass
+            self.assertFalse(conn.in_transaction())
+            conn.execute("INSERT INTO Customers VALUES (2, 'Bob', 30, '1234567890')")
+        finally:
+            conn.close()
+        self.assertEqual([], committed)
+        self.assertEqual(BadCustomer(), Solution.get_customer(1))
+        self.assertEqual(Customer(2, 'Bob', 30, "1234567890"), Solution.get_customer(2))
+
+
+# *** DO NOT RUN EACH TEST MANUALLY ***
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,174 @@
+import csv
+import io
+import json
+import sys
+import time
+from collections.abc import Mapping
+from functools import partial
+from typing import Optional
+from psycopg2 import sql
+import Utility.DBConnector as Connector
+from Utility.EntityCache import EntityCache
+
+# tables of the restaurant schema with their columns, in an order that respects the foreign keys
+TABLES = {
+    'Customers': ('cust_id', 'full_name', 'age', 'phone'),
+    'Orders': ('order_id', 'date', 'delivery_fee', 'delivery_address'),
+    'Dishes': ('dish_id', 'name', 'price', 'is_active'),
+    'OrderCustomer': ('order_id', 'cust_id'),
+    'OrderDish': ('order_id', 'dish_id', 'current_price', 'amount'),
+    'Ratings': ('cust_id', 'dish_id', 'rating'),
+}
+
+
+# how one table was loaded
+class LoadStats:
+    def __init__(self, table: str, rows: int, seconds: float) -> None:
+        self.table = table
+        self.rows = rows
+        self.seconds = seconds
+
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+    def __str__(self) -> str:
+        return f'{self.table}: {self.rows} rows in {self.seconds:.3f}s ({self.rows_per_second():.0f} rows/s)'
+
+
+# loads the tables with COPY FROM STDIN, sources maps a table name to one of
+#   - the path of a .csv file with a header line naming the columns
+#   - the path of a .jsonl file with one object per line, keyed by column name
+#   - an iterable of tuples (in the TABLES column order) or of mappings keyed by column name, such as
+#     dicts or the rows of a ResultSet or of DBConnector.stream()
+# the tables are loaded in foreign key order inside a single transaction (or the caller's session).
+# the EntityCache entries of the loaded tables are dropped once it commits.
+# with defer_constraints the foreign keys and secondary indexes of the loaded tables are dropped
+# before the load and created again afterwards, and with analyze the tables are analyzed at the end.
+# returns the LoadStats of every loaded table
+def load(sources: dict, defer_constraints: bool = False, analyze: bool = True,
+         session: Optional[Connector.DBConnector] = None) -> dict:
+    for table in sources:
+        if table not in TABLES:
+            raise ValueError("Unknown table " + str(table))
+    tables = [table for table in TABLES if table in sources]
+
+    stats = {}
+    conn = session if session is not None else Connector.DBConnector()
+    try:
+        with conn.transaction():
+            deferred = _drop_constraints(conn, tables) if defer_constraints else []
+            for table in tables:
+                start = time.perf_counter()
+                rows = _copy(conn, table, sources[table])
+                stats[table] = LoadStats(table, rows, time.perf_counter() - start)
+            for statement in deferred:
+                conn.execute(statement)
+            if analyze:
+                for table in tables:
+                    conn.execute(sql.SQL("ANALYZE {table}").format(table=sql.Identifier(table.lower())))
+        cache = EntityCache.current()
+        if cache is not None:
+            for table in tables:
+                conn.after_commit(partial(cache.clear, table))
+    finally:
+        if session is None:
+            conn.close()
+    return stats
+
+
+def _copy(conn: Connector.DBConnector, table: str, source) -> int:
+    if isinstance(source, str) and source.lower().endswith('.csv'):
+        with open(source, newline='') as file:
+            columns = next(csv.reader([file.readline()]))
+            return conn.copy_from_stdin(_copy_query(table, columns), file)
+    if isinstance(source, str) and source.lower().endswith('.jsonl'):
+        with open(source) as file:
+            rows = (json.loads(line) for line in file if line.strip())
+            return conn.copy_from_stdin(_copy_query(table, TABLES[table]), _CsvStream(rows, TABLES[table]))
+    if isinstance(source, str):
+        raise ValueError("Expected a .csv or .jsonl file, got " + source)
+    return conn.copy_from_stdin(_copy_query(table, TABLES[table]), _CsvStream(source, TABLES[table]))
+
+
+def _copy_query(table: str, columns) -> sql.Composed:
+    return sql.SQL("COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)").format(
+        table=sql.Identifier(table.lower()),
+        columns=sql.SQL(', ').join(sql.Identifier(column.strip().lower()) for column in columns))
+
+
+# drops the foreign keys and the indexes that do not back a constraint,
+# returns the statements that create them again
+def _drop_constraints(conn: Connector.DBConnector, tables: list) -> list:
+    names = sql.Literal([table.lower() for table in tables])
+    _, foreign_keys = conn.execute(sql.SQL(
+        "SELECT C.conrelid::regclass::text AS tbl, C.conname AS name, pg_get_constraintdef(C.oid) AS definition"
+        " FROM pg_constraint C WHERE C.contype = 'f' AND C.conrelid::regclass::text = ANY({names})").format(
+        names=names))
+    _, indexes = conn.execute(sql.SQL(
+        "SELECT I.indexrelid::regclass::text AS name, pg_get_indexdef(I.indexrelid) AS definition"
+        " FROM pg_index I WHERE I.indrelid::regclass::text = ANY({names})"
+        " AND NOT EXISTS (SELECT 1 FROM pg_constraint C WHERE C.conindid = I.indexrelid)").format(names=names))
+
+    recreate = []
+    for row in indexes:
+        conn.execute(sql.SQL("DROP INDEX {name}").format(name=sql.Identifier(row['name'])))
+        recreate.append(row['definition'])
+    for row in foreign_keys:
+        conn.execute(sql.SQL("ALTER TABLE {table} DROP CONSTRAINT {name}").format(
+            table=sql.Identifier(row['tbl']), name=sql.Identifier(row['name'])))
+        recreate.append(sql.SQL("ALTER TABLE {table} ADD CONSTRAINT {name} ").format(
+            table=sql.Identifier(row['tbl']), name=sql.Identifier(row['name'])) + sql.SQL(row['definition']))
+    return recreate
+
+
+# written in place of None: QUOTE_NONNUMERIC leaves it unquoted as it is a number, and COPY reads an
+# unquoted empty field as NULL while a quoted one is the empty string
+class _Null:
+    def __index__(self) -> int:
+        return 0
+
+    def __str__(self) -> str:
+        return ''
+
+
+_NULL = _Null()
+
+
+# file-like object that renders rows as CSV while COPY reads it, so nothing is materialised up front
+class _CsvStream:
+    def __init__(self, rows, columns) -> None:
+        self.__rows = iter(rows)
+        self.__columns = columns
+        self.__buffer = io.StringIO()
+        self.__writer = csv.writer(self.__buffer, quoting=csv.QUOTE_NONNUMERIC)
+        self.__pending = ''
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self.__pending) < size:
+            if not self.__fill():
+                break
+        if size < 0:
+            size = len(self.__pending)
+        chunk, self.__pending = self.__pending[:size], self.__pending[size:]
+        return chunk
+
+    # renders the next batch of rows, returns False when there are no rows left
+    def __fill(self, batch: int = 1000) -> bool:
+        self.__buffer.seek(0)
+        self.__buffer.truncate()
+        for _, row in zip(range(batch), self.__rows):
+            if isinstance(row, Mapping):
+                row = [row.get(column) for column in self.__columns]
+            self.__writer.writerow([_NULL if value is None else value for value in row])
+        rendered = self.__buffer.getvalue()
+        self.__pending += rendered
+        return rendered != ''
+
+
+# python -m Utility.BulkLoader Customers=customers.csv OrderDish=items.jsonl ... [--defer-constraints]
+if __name__ == '__main__':
+    arguments = [argument for argument in sys.argv[1:] if not argument.startswith('--')]
+    results = load(dict(argument.split('=', 1) for argument in arguments),
+                   defer_constraints='--defer-constraints' in sys.argv)
+    for table_stats in results.values():
+        print(table_stats)
@@ -0,0 +1,90 @@
+import json
+import select
+import threading
+import psycopg2
+
+# the channel the notify_changes() triggers of create_tables send to
+CHANNEL = 'table_changes'
+
+
+# background thread that LISTENs on CHANNEL with a connection of its own and calls every registered
+# invalidator(table, keys) for each committed change: table is the table name as in create_tables, keys
+# the primary keys of the changed rows (a value, or a tuple for composite keys), None when the statement
+# changed too many rows to list them. after the connection was lost the notifications sent meanwhile are
+# gone, so every invalidator is called with (None, None), meaning anything may have changed.
+# invalidators run on the listener thread, exceptions they raise are ignored
+class ChangeListener:
+    def __init__(self, params: dict, poll_interval: float = 1.0, reconnect_delay: float = 1.0) -> None:
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self.notifications = 0
+        self.reconnects = 0
+        self.__params = dict(params)
+        self.__invalidators = ()
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__listening = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name='change-listener', daemon=True)
+        self.__thread.start()
+
+    def add(self, invalidator) -> None:
+        with self.__lock:
+            self.__invalidators = self.__invalidators + (invalidator,)
+
+    # returns whether no invalidator is left
+    def remove(self, invalidator) -> bool:
+        with self.__lock:
+            self.__invalidators = tuple(i for i in self.__invalidators if i is not invalidator)
+            return not self.__invalidators
+
+    # wait until LISTEN is in place, changes committed before that are not reported
+    def wait_listening(self, timeout: float = None) -> bool:
+        return self.__listening.wait(timeout)
+
+    # stop the thread and close its connection
+    def close(self) -> None:
+        self.__stop.set()
+        self.__thread.join()
+
+    def __run(self) -> None:
+        connected_before = False
+        while not self.__stop.is_set():
+            connection = None
+            try:
+                connection = psycopg2.connect(**self.__params)
+                connection.autocommit = True
+                connection.cursor().execute("LISTEN " + CHANNEL)
+                if connected_before:
+                    self.reconnects += 1
+                    self.__dispatch(None, None)
+                connected_before = True
+                self.__listening.set()
+                while not self.__stop.is_set():
+                    if select.select([connection], [], [], self.poll_interval)[0]:
+                        connection.poll()
+                        while connection.notifies:
+                            self.__handle(connection.notifies.pop(0).payload)
+            except Exception:
+                self.__listening.clear()
+                self.__stop.wait(self.reconnect_delay)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+    def __handle(self, payload: str) -> None:
+        self.notifications += 1
+        change = json.loads(payload)
+        keys = change.get('keys')
+        if keys is not None:
+            keys = [tuple(key) if isinstance(key, list) else key for key in keys]
+        self.__dispatch(change.get('table'), keys)
+
+    def __dispatch(self, table, keys) -> None:
+        for invalidator in self.__invalidators:
+            try:
+                invalidator(table, keys)
+            except Exception:
+                pass
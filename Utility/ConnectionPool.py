@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+import psycopg2
+from psycopg2 import extensions
+from Utility.Exceptions import DatabaseException
+
+
+# thread-safe pool of open psycopg2 connections, shared by all DBConnector instances
+class ConnectionPool:
+    # constructor
+    # min_size connections are kept open even when idle, at most max_size are open at once.
+    # idle connections older than idle_timeout seconds are closed (down to min_size),
+    # a connection idle for more than ping_after seconds is pinged before it is handed out,
+    # a checkout waits at most checkout_timeout seconds for a free connection,
+    # and every connection keeps up to statement_cache_size prepared statements
+    def __init__(self, params: dict, min_size: int = 1, max_size: int = 10, idle_timeout: float = 300.0,
+                 ping_after: float = 1.0, checkout_timeout: float = 30.0, statement_cache_size: int = 64) -> None:
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("expected 0 <= min_size <= max_size and max_size >= 1")
+        if statement_cache_size < 1:
+            raise ValueError("expected statement_cache_size >= 1")
+        self.params = dict(params)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self.checkout_timeout = checkout_timeout
+        self.statement_cache_size = statement_cache_size
+        self.__idle = []  # most recently returned connection last
+        self.__in_use = 0
+        self.__created = 0
+        self.__closed = False
+        self.__condition = threading.Condition()
+        for _ in range(min_size):
+            self.__idle.append(self.__connect())
+
+    # borrow a connection, it must be given back with putconn
+    def getconn(self):
+        while True:
+            connection = self.__reserve()
+            if connection is None:
+                # a free slot was reserved for a brand new connection
+                try:
+                    return self.__connect()
+                except Exception:
+                    self.__release_slot()
+                    raise
+            if self.__is_healthy(connection):
+                return connection
+            self.__discard(connection)
+
+    # give a borrowed connection back, broken connections are closed instead of being reused
+    def putconn(self, connection, discard: bool = False) -> None:
+        if not discard and not connection.closed:
+            try:
+                if connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except Exception:
+                discard = True
+        if discard or connection.closed:
+            self.__discard(connection)
+            return
+        with self.__condition:
+            self.__in_use -= 1
+            if self.__closed:
+                ConnectionPool.__close_quietly(connection)
+            else:
+                connection.returned_at = time.monotonic()
+                self.__idle.append(connection)
+            self.__condition.notify()
+
+    # close every idle connection, borrowed connections are closed when they are given back
+    def close(self) -> None:
+        with self.__condition:
+            self.__closed = True
+            idle, self.__idle = self.__idle, []
+            self.__condition.notify_all()
+        for connection in idle:
+            ConnectionPool.__close_quietly(connection)
+
+    # counters, mostly for tests and benchmarks
+    def stats(self) -> dict:
+        with self.__condition:
+            return {'idle': len(self.__idle), 'in_use': self.__in_use, 'created': self.__created}
+
+    def __reserve(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        with self.__condition:
+            while True:
+                if self.__closed:
+                    raise DatabaseException.ConnectionInvalid("Connection pool is closed")
+                self.__expire_idle()
+                if self.__idle:
+                    connection = self.__idle.pop()
+                    self.__in_use += 1
+                    return connection
+                if self.__in_use < self.max_size:
+                    self.__in_use += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DatabaseException.ConnectionInvalid("Timed out waiting for a free connection")
+                self.__condition.wait(remaining)
+
+    # called with the lock held, the oldest connections sit at the front of the idle list
+    def __expire_idle(self) -> None:
+        now = time.monotonic()
+        while len(self.__idle) > self.min_size and now - self.__idle[0].returned_at > self.idle_timeout:
+            ConnectionPool.__close_quietly(self.__idle.pop(0))
+
+    def __is_healthy(self, connection) -> bool:
+        if connection.closed:
+            return False
+        if connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        try:
+            # a connection that was used a moment ago is trusted, older ones are pinged
+            if self.ping_after is not None and time.monotonic() - connection.returned_at > self.ping_after:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                connection.rollback()
+        except Exception:
+            return False
+        return True
+
+    def __connect(self):
+        connection = psycopg2.connect(connection_factory=PooledConnection, **self.params)
+        connection.autocommit = False
+        connection.returned_at = time.monotonic()
+        connection.statements = OrderedDict()
+        connection.statement_cache_size = self.statement_cache_size
+        with self.__condition:
+            self.__created += 1
+        return connection
+
+    def __discard(self, connection) -> None:
+        ConnectionPool.__close_quietly(connection)
+        self.__release_slot()
+
+    def __release_slot(self) -> None:
+        with self.__condition:
+            self.__in_use -= 1
+            self.__condition.notify()
+
+    @staticmethod
+    def __close_quietly(connection) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+# psycopg2 connection that remembers when it was last given back to the pool
+# and which statements are prepared on it (query text -> statement name, least recently used first)
+class PooledConnection(extensions.connection):
+    returned_at = 0.0
+    statements = None
+    statement_cache_size = 0
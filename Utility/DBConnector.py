@@ -1,163 +1,624 @@
-import psycopg2
-from psycopg2 import errors, sql
-from configparser import ConfigParser
-from Utility.Exceptions import DatabaseException
-import os
-from typing import Union
-
-
-class ResultSetDict(dict):
-    def __getitem__(self, item):
-        if type(item) is not str:
-            return None
-        return super().__getitem__(item.lower())
-
-
-class ResultSet:
-    # constructor
-    def __init__(self, description=None, results=None):
-        self.rows = []
-        self.cols_header = []
-        self.cols = ResultSetDict()
-        self.__fromQuery(description, results)
-
-    def __getitem__(self, idx):
-        if type(idx) == str:
-            return [x[self.cols[idx]] for x in self.rows]
-        return self.__getRow(idx)
-
-    # so you can use print(ResultSet)
-    def __str__(self):
-        string = ""
-        for col in self.cols_header:
-            string += str(col) + "   "
-        string += '\n'
-        for row in self.rows:
-            for val in row:
-                string += str(val) + "   "
-            string += '\n'
-        return string
-
-    def __iter__(self):
-        for row in range(len(self.rows)):
-            yield self.__getRow(row)
-
-    # what is the size of the ResultSet?
-    def size(self):
-        return len(self.rows)
-
-    # is the ResultSet empty?
-    def isEmpty(self):
-        return self.size() == 0
-
-    def __getRow(self, row: int):
-        if len(self.rows) <= row:
-            print('Invalid row ' + str(row))
-            return ResultSetDict()
-        row_to_return = ResultSetDict()
-        for val, col in zip(self.rows[row], self.cols_header):
-            row_to_return[col] = val
-        return row_to_return
-
-    def __fromQuery(self, description, results: list):
-        if results is None or len(results) == 0:  # no results
-            self.cols = ResultSetDict()
-        else:
-            self.rows = results.copy()
-            self.cols_header = [d.name for d in description]
-            self.cols = ResultSetDict()
-            for col, index in zip(self.cols_header, range(len(results[0]))):
-                self.cols[col] = index
-
-
-class DBConnector:
-    # constructor
-    def __init__(self):
-        try:
-            # Obtain the configuration parameters
-            params = DBConnector.__config()
-            self.connection = psycopg2.connect(**params)
-            self.connection.autocommit = False
-            self.cursor = self.connection.cursor()
-        except Exception as e:
-            self.connection = None
-            self.cursor = None
-            raise DatabaseException.ConnectionInvalid("Could not connect to database")
-
-    # close connection
-    def close(self):
-        if self.cursor is not None:
-            self.cursor.close()
-        if self.connection is not None:
-            self.connection.close()
-
-    # commit connection's changes
-    def commit(self):
-        if self.connection is not None:
-            try:
-                self.connection.commit()
-            except Exception:
-                raise DatabaseException.ConnectionInvalid("Could not commit changes")
-
-    # rollback connection's changes
-    def rollback(self):
-        if self.connection is not None:
-            try:
-                self.connection.rollback()
-            except Exception:
-                raise DatabaseException.ConnectionInvalid("Could not rollback changes")
-
-    # executes the query, if it is SELECT you may ask to print the results with printSchema
-    # returns the number of rows effected and a ResultSet (for SELECT)
-    def execute(self, query: Union[str, sql.Composed], printSchema=False) -> (int, ResultSet):
-        if self.connection is None:
-            raise DatabaseException.ConnectionInvalid("Connection Invalid")
-
-        # try to execute the query
-        try:
-            self.cursor.execute(query)
-            row_effected = max(self.cursor.rowcount, 0)
-            self.commit()
-        except errors.lookup("23502"):
-            raise DatabaseException.NOT_NULL_VIOLATION("NOT_NULL_VIOLATION")
-        except errors.lookup("23503"):
-            raise DatabaseException.FOREIGN_KEY_VIOLATION("FOREIGN_KEY_VIOLATION")
-        except errors.lookup("23505"):
-            raise DatabaseException.UNIQUE_VIOLATION("UNIQUE_VIOLATION")
-        except errors.lookup("23514"):
-            raise DatabaseException.CHECK_VIOLATION("CHECK_VIOLATION")
-
-        # get entries in case of SELECT
-        if self.cursor.description is not None:
-            entries = ResultSet(self.cursor.description, self.cursor.fetchall())
-        else:
-            entries = ResultSet()
-
-        # print SELECT entries
-        if printSchema:
-            print(entries)
-
-        return row_effected, entries
-
-    # grant credentials
-    @staticmethod
-    def __config(filename=os.path.join(os.path.join(os.getcwd(), "Utility"), 'database.ini'),
-                 section='postgresql'):
-        # create a parser
-        parser = ConfigParser()
-        # read config file
-        parser.read(filename)
-
-        # get section
-        db = {}
-        if parser.has_section(section):
-            params = parser.items(section)
-            for param in params:
-                db[param[0]] = param[1]
-        else:
-            # file not found
-            db = DBConnector.__config(
-                filename=os.path.join(os.path.join(os.path.dirname(os.getcwd()), 'Utility'), 'database.ini'))
-            if db is None:
-                raise DatabaseException.database_ini_ERROR("Please modify database.ini file under Utility")
-        return db
+import psycopg2
+from psycopg2 import errors, sql, extras, extensions
+from configparser import ConfigParser
+from Utility.Exceptions import DatabaseException
+from Utility.ConnectionPool import ConnectionPool
+from Utility.QueryObserver import QueryEvent, QueryObserver, NULL_EVENT, find_caller
+from Utility.SlowQueryLog import SlowQueryLog
+from Utility.ChangeListener import ChangeListener
+import hashlib
+import os
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import timezone
+from operator import itemgetter
+from typing import Optional, Union
+
+
+class ResultSetDict(dict):
+    def __getitem__(self, item):
+        if type(item) is not str:
+            return None
+        return super().__getitem__(item.lower())
+
+
+# column names of a result and their positions, shared by all the rows of the result
+class ResultSetColumns:
+    __slots__ = ('names', 'positions')
+
+    def __init__(self, names) -> None:
+        self.names = tuple(names)
+        self.positions = {}
+        for index, name in enumerate(self.names):
+            self.positions.setdefault(name.lower(), index)
+
+    # position of the column, the name is case-insensitive
+    def position(self, name: str) -> int:
+        index = self.positions.get(name)
+        if index is None:
+            index = self.positions[name.lower()]
+        return index
+
+
+# read-only view of one row: the fetched tuple plus the shared columns, no per-row dict is built.
+# rows are mappings, so row['col'], dict(row), **row and iterating over the column names all work
+class ResultSetRow(Mapping):
+    __slots__ = ('__values', '__columns')
+
+    def __init__(self, values: tuple, columns: ResultSetColumns) -> None:
+        self.__values = values
+        self.__columns = columns
+
+    def __getitem__(self, item):
+        if type(item) is not str:
+            return None
+        # same lookup as ResultSetColumns.position, inlined because this is the hot path
+        positions = self.__columns.positions
+        index = positions.get(item)
+        if index is None:
+            index = positions[item.lower()]
+        return self.__values[index]
+
+    def __iter__(self):
+        return iter(self.__columns.names)
+
+    def __len__(self):
+        return len(self.__columns.names)
+
+    def __repr__(self):
+        return repr(dict(zip(self.__columns.names, self.__values)))
+
+
+# PostgreSQL type oids that to_numpy and to_dataframe convert
+_FLOAT_TYPES = (700, 701, 1700)  # real, double precision, numeric
+_INTEGER_TYPES = (20, 21, 23)  # bigint, smallint, integer
+_BOOLEAN_TYPE = 16
+_TIMESTAMP_TYPES = (1114, 1184)  # timestamp, timestamp with time zone
+_DATE_TYPE = 1082
+
+
+class ResultSet:
+    # constructor
+    def __init__(self, description=None, results=None):
+        self.rows = []
+        self.cols_header = []
+        self.cols = ResultSetDict()
+        self.__columns = ResultSetColumns(())
+        self.__types = ()
+        self.__column_values = {}
+        self.__fromQuery(description, results)
+
+    def __getitem__(self, idx):
+        if type(idx) == str:
+            if not self.rows:
+                return []
+            return list(self.__column(self.__columns.position(idx)))
+        return self.__getRow(idx)
+
+    # the column as a NumPy array: NUMERIC and other floating point columns become float64 (NULL is nan),
+    # TIMESTAMP columns datetime64[us] (with time zone: converted to UTC), DATE columns datetime64[D],
+    # integer and boolean columns int64/bool when they have no NULLs, anything else an object array
+    def to_numpy(self, col: str):
+        position = self.__columns.position(col)
+        return ResultSet.__to_array(self.__column(position), self.__types[position])
+
+    # the whole result as a pandas DataFrame, every column converted like in to_numpy
+    def to_dataframe(self):
+        import pandas
+        arrays = [ResultSet.__to_array(self.__column(position), type_code)
+                  for position, type_code in enumerate(self.__types)]
+        frame = pandas.DataFrame(dict(enumerate(arrays)), index=pandas.RangeIndex(len(self.rows)))
+        frame.columns = list(self.__columns.names)
+        return frame
+
+    # so you can use print(ResultSet)
+    def __str__(self):
+        lines = ["".join(str(col) + "   " for col in self.cols_header)]
+        for row in self.rows:
+            lines.append("".join(str(val) + "   " for val in row))
+        return "\n".join(lines) + "\n"
+
+    def __iter__(self):
+        columns = self.__columns
+        for values in self.rows:
+            yield ResultSetRow(values, columns)
+
+    # what is the size of the ResultSet?
+    def size(self):
+        return len(self.rows)
+
+    # is the ResultSet empty?
+    def isEmpty(self):
+        return self.size() == 0
+
+    def __getRow(self, row: int):
+        if len(self.rows) <= row:
+            print('Invalid row ' + str(row))
+            return ResultSetDict()
+        return ResultSetRow(self.rows[row], self.__columns)
+
+    # values of one column, computed once
+    def __column(self, position: int) -> tuple:
+        values = self.__column_values.get(position)
+        if values is None:
+            values = self.__column_values[position] = tuple(map(itemgetter(position), self.rows))
+        return values
+
+    @staticmethod
+    def __to_array(values: tuple, type_code: int):
+        import numpy
+        if type_code in _FLOAT_TYPES:
+            return numpy.fromiter((numpy.nan if v is None else float(v) for v in values), numpy.float64, len(values))
+        if type_code in _TIMESTAMP_TYPES:
+            return numpy.array([v.astimezone(timezone.utc).replace(tzinfo=None) if v is not None and v.tzinfo else v
+                                for v in values], dtype='datetime64[us]')
+        if type_code == _DATE_TYPE:
+            return numpy.array(values, dtype='datetime64[D]')
+        if type_code in _INTEGER_TYPES and None not in values:
+            return numpy.array(values, dtype=numpy.int64)
+        if type_code in _INTEGER_TYPES:
+            return numpy.fromiter((numpy.nan if v is None else v for v in values), numpy.float64, len(values))
+        if type_code == _BOOLEAN_TYPE and None not in values:
+            return numpy.array(values, dtype=bool)
+        array = numpy.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+
+    # the fetched list of tuples is kept as is, rows are not copied
+    def __fromQuery(self, description, results: list):
+        if description is not None:
+            # the columns are known even for an empty result, for to_numpy and to_dataframe
+            self.__columns = ResultSetColumns(d.name for d in description)
+            self.__types = tuple(d.type_code for d in description)
+        if results is None or len(results) == 0:  # no results
+            self.cols = ResultSetDict()
+        else:
+            self.rows = results
+            self.cols_header = list(self.__columns.names)
+            self.cols = ResultSetDict(self.__columns.positions)
+
+
+class DBConnector:
+    # connections are borrowed from a process-wide pool instead of being opened per DBConnector
+    __pool = None
+    __pool_settings = {}
+    __pool_lock = threading.Lock()
+    # QueryObserver instances notified about every statement, replaced (never mutated) on change
+    __observers = ()
+    __slow_query_log = None
+    __change_listener = None
+
+    # constructor
+    def __init__(self):
+        self.connection = None
+        self.cursor = None
+        self.__transaction_depth = 0
+        self.__savepoint_counter = 0
+        self.__stream_counter = 0
+        self.__after_commit = []
+        try:
+            self.__source = DBConnector.__get_pool()
+            self.connection = self.__source.getconn()
+            self.cursor = self.connection.cursor()
+        except Exception as e:
+            if self.connection is not None:
+                self.__source.putconn(self.connection, discard=True)
+            self.connection = None
+            self.cursor = None
+            raise DatabaseException.ConnectionInvalid("Could not connect to database")
+
+    # close connection, the underlying connection goes back to the pool
+    def close(self):
+        if self.cursor is not None:
+            try:
+                self.cursor.close()
+            except Exception:
+                pass
+            self.cursor = None
+        if self.connection is not None:
+            # an unfinished transaction is rolled back by the pool
+            self.__source.putconn(self.connection)
+            self.connection = None
+        self.__transaction_depth = 0
+        self.__after_commit = []
+
+    # change the pool settings (min_size, max_size, idle_timeout, ping_after, checkout_timeout,
+    # statement_cache_size),
+    # the current pool is closed and a new one is created on the next connection
+    @staticmethod
+    def configure_pool(**settings) -> None:
+        with DBConnector.__pool_lock:
+            DBConnector.__pool_settings = settings
+            pool, DBConnector.__pool = DBConnector.__pool, None
+        if pool is not None:
+            pool.close()
+
+    # close all pooled connections, e.g. before the process exits
+    @staticmethod
+    def close_pool() -> None:
+        with DBConnector.__pool_lock:
+            pool, DBConnector.__pool = DBConnector.__pool, None
+        if pool is not None:
+            pool.close()
+
+    # the current pool, created on first use
+    @staticmethod
+    def get_pool() -> ConnectionPool:
+        return DBConnector.__get_pool()
+
+    @staticmethod
+    def __get_pool() -> ConnectionPool:
+        pool = DBConnector.__pool
+        if pool is None:
+            with DBConnector.__pool_lock:
+                if DBConnector.__pool is None:
+                    # Obtain the configuration parameters
+                    DBConnector.__pool = ConnectionPool(DBConnector.__config(), **DBConnector.__pool_settings)
+                pool = DBConnector.__pool
+        return pool
+
+    # notify observer (a QueryObserver) before and after every statement run by any DBConnector
+    @staticmethod
+    def add_observer(observer: QueryObserver) -> None:
+        with DBConnector.__pool_lock:
+            DBConnector.__observers = DBConnector.__observers + (observer,)
+
+    @staticmethod
+    def remove_observer(observer: QueryObserver) -> None:
+        with DBConnector.__pool_lock:
+            DBConnector.__observers = tuple(o for o in DBConnector.__observers if o is not observer)
+
+    # statements slower than threshold seconds are logged to the JSONL file at path together with their
+    # EXPLAIN (ANALYZE, BUFFERS) plan (a plain EXPLAIN plan for writes), settings are passed to SlowQueryLog
+    # (max_bytes, backup_count, explain_interval, explain_timeout). threshold None turns the log off
+    @staticmethod
+    def configure_slow_query_log(threshold: Optional[float], path: str = 'slow_queries.jsonl',
+                                 **settings) -> Optional[SlowQueryLog]:
+        log = DBConnector.__slow_query_log
+        if log is not None:
+            DBConnector.__slow_query_log = None
+            DBConnector.remove_observer(log)
+            log.close()
+        if threshold is None:
+            return None
+        log = DBConnector.__slow_query_log = SlowQueryLog(DBConnector.__config(), threshold, path, **settings)
+        DBConnector.add_observer(log)
+        return log
+
+    # invalidator(table, keys) is called for every change committed to the tables by any process, from a
+    # ChangeListener thread started with the first invalidator and stopped with the last one (see ChangeListener)
+    @staticmethod
+    def add_invalidator(invalidator) -> ChangeListener:
+        with DBConnector.__pool_lock:
+            if DBConnector.__change_listener is None:
+                DBConnector.__change_listener = ChangeListener(DBConnector.__config())
+            DBConnector.__change_listener.add(invalidator)
+            return DBConnector.__change_listener
+
+    @staticmethod
+    def remove_invalidator(invalidator) -> None:
+        with DBConnector.__pool_lock:
+            listener = DBConnector.__change_listener
+            if listener is None or not listener.remove(invalidator):
+                return
+            DBConnector.__change_listener = None
+        listener.close()
+
+    # commit connection's changes
+    def commit(self):
+        if self.connection is not None:
+            try:
+                self.connection.commit()
+            except Exception:
+                raise DatabaseException.ConnectionInvalid("Could not commit changes")
+
+    # rollback connection's changes
+    def rollback(self):
+        if self.connection is not None:
+            try:
+                self.connection.rollback()
+            except Exception:
+                raise DatabaseException.ConnectionInvalid("Could not rollback changes")
+
+    # is there an open transaction() block on this connector?
+    def in_transaction(self) -> bool:
+        return self.__transaction_depth > 0
+
+    # groups several execute calls under a single commit, rolls everything back on an exception:
+    #   with conn.transaction():
+    #       conn.execute(...)
+    #       conn.execute(...)
+    # a nested transaction() becomes a savepoint. a statement that failed outside a savepoint aborts the
+    # transaction, the block then ends with a rollback and UNKNOWN_ERROR instead of a commit, and its
+    # after_commit callbacks are dropped
+    @contextmanager
+    def transaction(self):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+        if self.in_transaction():
+            with self.savepoint():
+                yield self
+            return
+        self.__transaction_depth = 1
+        try:
+            yield self
+        except BaseException:
+            self.__transaction_depth = 0
+            self.__after_commit = []
+            self.rollback()
+            raise
+        self.__transaction_depth = 0
+        callbacks, self.__after_commit = self.__after_commit, []
+        # psycopg2 would turn the commit of an aborted transaction into a silent rollback
+        if self.connection.info.transaction_status == extensions.TRANSACTION_STATUS_INERROR:
+            self.rollback()
+            raise DatabaseException.UNKNOWN_ERROR("Transaction aborted by a failed statement, rolled back")
+        self.commit()
+        for callback in callbacks:
+            callback()
+
+    # callback() runs when the transaction() block around it commits and is dropped if it rolls back,
+    # outside a transaction (where every statement commits on its own) it runs right away
+    def after_commit(self, callback) -> None:
+        if self.in_transaction():
+            self.__after_commit.append(callback)
+        else:
+            callback()
+
+    # inside a transaction, undoes only the statements of this block when it raises
+    # (the exception is re-raised), outside a transaction it does nothing
+    @contextmanager
+    def savepoint(self):
+        if not self.in_transaction():
+            yield self
+            return
+        self.__savepoint_counter += 1
+        name = "sp_" + str(self.__savepoint_counter)
+        self.cursor.execute("SAVEPOINT " + name)
+        try:
+            yield self
+        except BaseException:
+            self.cursor.execute("ROLLBACK TO SAVEPOINT " + name)
+            self.cursor.execute("RELEASE SAVEPOINT " + name)
+            raise
+        self.cursor.execute("RELEASE SAVEPOINT " + name)
+
+    # a pooled connector with an open transaction, committed when the block ends:
+    #   with DBConnector.session() as session:
+    #       Solution.add_order(order, session=session)
+    @staticmethod
+    @contextmanager
+    def session():
+        conn = DBConnector()
+        try:
+            with conn.transaction():
+                yield conn
+        finally:
+            conn.close()
+
+    # executes the query, if it is SELECT you may ask to print the results with printSchema
+    # returns the number of rows effected and a ResultSet (for SELECT)
+    # inside transaction() the changes are committed when the transaction ends
+    def execute(self, query: Union[str, sql.Composed], printSchema=False) -> (int, ResultSet):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        with self.__observed(query) as event:
+            # try to execute the query
+            with DBConnector.__violations():
+                self.cursor.execute(query)
+                row_effected = max(self.cursor.rowcount, 0)
+                if not self.in_transaction():
+                    self.commit()
+            event.executed(row_effected)
+
+            # get entries in case of SELECT
+            entries = self.__entries(event)
+
+        # print SELECT entries
+        if printSchema:
+            print(entries)
+
+        return row_effected, entries
+
+    # executes query as a server-side prepared statement. query uses $1, $2, ... placeholders that are filled
+    # from params in order. the first execution on a pooled connection PREPAREs the query, later ones only
+    # EXECUTE it, so PostgreSQL parses it once per connection and can reuse its plan. the connection keeps
+    # the statement_cache_size most recently used statements and DEALLOCATEs the rest.
+    # returns the same as execute
+    def execute_prepared(self, query: str, params=(), printSchema=False) -> (int, ResultSet):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        with self.__observed(query, params) as event:
+            with DBConnector.__violations():
+                name = self.__prepare(query)
+                arguments = " (" + ", ".join(["%s"] * len(params)) + ")" if params else ""
+                self.cursor.execute("EXECUTE " + name + arguments, tuple(params) if params else None)
+                row_effected = max(self.cursor.rowcount, 0)
+                if not self.in_transaction():
+                    self.commit()
+            event.executed(row_effected)
+
+            # get entries in case of SELECT
+            entries = self.__entries(event)
+
+        # print SELECT entries
+        if printSchema:
+            print(entries)
+
+        return row_effected, entries
+
+    # the ResultSet of the statement that just ran, empty if it returned no rows
+    def __entries(self, event) -> ResultSet:
+        if self.cursor.description is None:
+            return ResultSet()
+        rows = self.cursor.fetchall()
+        event.fetched(rows)
+        return ResultSet(self.cursor.description, rows)
+
+    # the name of query's prepared statement on this connection, prepared now if needed
+    def __prepare(self, query: str) -> str:
+        statements = self.connection.statements
+        name = statements.get(query)
+        if name is not None:
+            statements.move_to_end(query)
+            return name
+        while len(statements) >= self.connection.statement_cache_size:
+            _, evicted = statements.popitem(last=False)
+            self.cursor.execute("DEALLOCATE " + evicted)
+        name = "stmt_" + hashlib.sha1(query.encode()).hexdigest()[:16]
+        self.cursor.execute("PREPARE " + name + " AS " + query)
+        statements[query] = name
+        return name
+
+    # executes a SELECT and returns its result as a pandas DataFrame (see ResultSet.to_dataframe)
+    def execute_df(self, query: Union[str, sql.Composed]):
+        _, entries = self.execute(query)
+        return entries.to_dataframe()
+
+    # runs a SELECT on a server-side (named) cursor and yields its rows, fetching chunk_size rows at a time,
+    # so a large result is never held in memory as a whole. rows have the same case-insensitive column
+    # access as ResultSet rows. outside a transaction() the query's transaction ends together with the
+    # iteration, consume the rows (or close the generator) before running anything else on this connector
+    def stream(self, query: Union[str, sql.Composed], chunk_size=1000):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        self.__stream_counter += 1
+        cursor = self.connection.cursor(name="stream_" + str(self.__stream_counter))
+        completed = False
+        try:
+            with self.__observed(query) as event:
+                with DBConnector.__violations():
+                    cursor.execute(query)
+                event.executed(0)
+                columns = None
+                while True:
+                    with DBConnector.__violations():
+                        rows = cursor.fetchmany(chunk_size)
+                    event.fetched(rows)
+                    if not rows:
+                        break
+                    if columns is None:
+                        columns = ResultSetColumns(d.name for d in cursor.description)
+                    for row in rows:
+                        yield ResultSetRow(row, columns)
+                completed = True
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+            if not self.in_transaction():
+                if completed:
+                    self.commit()
+                else:
+                    self.rollback()
+
+    # executes a "... VALUES %s ..." query for many rows, one multi-row statement per page_size rows,
+    # template is the psycopg2 row template, e.g. "(%s, %s::integer)"
+    # returns the number of rows effected and a ResultSet of all RETURNING rows (when there is a RETURNING clause)
+    def execute_values(self, query: Union[str, sql.Composed], argslist: list, template=None,
+                       page_size=100) -> (int, ResultSet):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        row_effected, returned, description = 0, [], None
+        with self.__observed(query, argslist) as event, DBConnector.__violations():
+            for start in range(0, len(argslist), page_size):
+                page = argslist[start:start + page_size]
+                extras.execute_values(self.cursor, query, page, template=template, page_size=len(page))
+                event.executed(max(self.cursor.rowcount, 0))
+                row_effected += max(self.cursor.rowcount, 0)
+                if self.cursor.description is not None:
+                    description = self.cursor.description
+                    rows = self.cursor.fetchall()
+                    event.fetched(rows)
+                    returned.extend(rows)
+            if not self.in_transaction():
+                self.commit()
+
+        return row_effected, ResultSet(description, returned) if description is not None else ResultSet()
+
+    # runs a COPY ... FROM STDIN query reading the data from file (anything with a read method)
+    # returns the number of rows copied
+    def copy_from_stdin(self, query: Union[str, sql.Composed], file) -> int:
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+
+        with self.__observed(query) as event, DBConnector.__violations():
+            self.cursor.copy_expert(query, file)
+            row_effected = max(self.cursor.rowcount, 0)
+            if not self.in_transaction():
+                self.commit()
+            event.executed(row_effected)
+        return row_effected
+
+    # reports the statement run inside the block to the observers, the block fills in the yielded event
+    @contextmanager
+    def __observed(self, query, params=None):
+        observers = DBConnector.__observers
+        if not observers:
+            yield NULL_EVENT
+            return
+        if not isinstance(query, str):
+            query = query.as_string(self.connection)
+        event = QueryEvent(query, params, find_caller())
+        DBConnector.__notify(observers, 'before', event)
+        failure = None
+        try:
+            yield event
+        except Exception as e:
+            failure = e
+            raise
+        finally:
+            event.finish(failure)
+            DBConnector.__notify(observers, 'after' if failure is None else 'error', event)
+
+    @staticmethod
+    def __notify(observers: tuple, callback: str, event: QueryEvent) -> None:
+        for observer in observers:
+            try:
+                getattr(observer, callback)(event)
+            except Exception:
+                pass
+
+    # translates constraint violations into DatabaseException
+    @staticmethod
+    @contextmanager
+    def __violations():
+        try:
+            yield
+        except errors.lookup("23502"):
+            raise DatabaseException.NOT_NULL_VIOLATION("NOT_NULL_VIOLATION")
+        except errors.lookup("23503"):
+            raise DatabaseException.FOREIGN_KEY_VIOLATION("FOREIGN_KEY_VIOLATION")
+        except errors.lookup("23505"):
+            raise DatabaseException.UNIQUE_VIOLATION("UNIQUE_VIOLATION")
+        except errors.lookup("23514"):
+            raise DatabaseException.CHECK_VIOLATION("CHECK_VIOLATION")
+
+    # grant credentials
+    @staticmethod
+    def __config(filename=os.path.join(os.path.join(os.getcwd(), "Utility"), 'database.ini'),
+                 section='postgresql'):
+        # create a parser
+        parser = ConfigParser()
+        # read config file
+        parser.read(filename)
+
+        # get section
+        db = {}
+        if parser.has_section(section):
+            params = parser.items(section)
+            for param in params:
+                db[param[0]] = param[1]
+        else:
+            # file not found
+            db = DBConnector.__config(
+                filename=os.path.join(os.path.join(os.path.dirname(os.getcwd()), 'Utility'), 'database.ini'))
+            if db is None:
+                raise DatabaseException.database_ini_ERROR("Please modify database.ini file under Utility")
+        return db
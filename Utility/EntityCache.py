@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+import Utility.DBConnector as Connector
+
+# tables whose rows get_customer, get_dish and get_order cache, with the default number of ids kept of each
+DEFAULT_SIZES = {'Customers': 10000, 'Dishes': 10000, 'Orders': 10000}
+
+
+# counters of the entries of one table
+class CacheStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # results read before an invalidation of the table and therefore not stored
+        self.discarded = 0
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.negative_hits + self.misses
+        return (self.hits + self.negative_hits) / lookups if lookups else 0.0
+
+    def __str__(self) -> str:
+        return (f'hits={self.hits}, negative_hits={self.negative_hits}, misses={self.misses}, '
+                f'expirations={self.expirations}, evictions={self.evictions}, '
+                f'invalidations={self.invalidations}, discarded={self.discarded}, hit_rate={self.hit_rate():.2f}')
+
+
+# read-through cache of entity rows by table and id, every table is a bounded LRU of its own.
+# an entry is the row (any value) or None for an id that does not exist, which expires after negative_ttl
+# instead of ttl. invalidating a table bumps its version, a row read while that happened is not stored
+# (lookup hands out the version, store compares it), so a writer can not be overtaken by a slow reader
+class EntityCache:
+    __current = None
+    __configure_lock = threading.Lock()
+
+    def __init__(self, ttl: float = 60.0, negative_ttl: float = 5.0, sizes: Optional[dict] = None,
+                 clock=time.monotonic) -> None:
+        self.__ttl = ttl
+        self.__negative_ttl = negative_ttl
+        self.__sizes = dict(DEFAULT_SIZES, **(sizes or {}))
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__entries = {table: OrderedDict() for table in self.__sizes}
+        self.__versions = {table: 0 for table in self.__sizes}
+        self.__stats = {table: CacheStats() for table in self.__sizes}
+        self.__listening = False
+
+    # the cache get_customer, get_dish and get_order read through, None when caching is off
+    @staticmethod
+    def current() -> Optional['EntityCache']:
+        return EntityCache.__current
+
+    # turn the cache on with a new, empty EntityCache(ttl, negative_ttl, sizes) and return it,
+    # ttl None turns it off. with listen the changes committed by other processes are dropped as well
+    # (DBConnector.add_invalidator), so a long ttl does not serve their old rows
+    @staticmethod
+    def configure(ttl: Optional[float] = 60.0, negative_ttl: float = 5.0, sizes: Optional[dict] = None,
+                  listen: bool = False) -> Optional['EntityCache']:
+        with EntityCache.__configure_lock:
+            previous = EntityCache.__current
+            EntityCache.__current = EntityCache(ttl, negative_ttl, sizes) if ttl is not None else None
+            if previous is not None and previous.__listening:
+                Connector.DBConnector.remove_invalidator(previous.on_change)
+            if EntityCache.__current is not None and listen:
+                EntityCache.__current.__listening = True
+                Connector.DBConnector.add_invalidator(EntityCache.__current.on_change)
+            return EntityCache.__current
+
+    # returns (found, value, version): value is None for an id known not to exist, version goes to store
+    def lookup(self, table: str, key) -> tuple:
+        with self.__lock:
+            entries, stats = self.__entries[table], self.__stats[table]
+            entry = entries.get(key)
+            if entry is not None and entry[0] <= self.__clock():
+                del entries[key]
+                stats.expirations += 1
+                entry = None
+            if entry is None:
+                stats.misses += 1
+                return False, None, self.__versions[table]
+            entries.move_to_end(key)
+            if entry[1] is None:
+                stats.negative_hits += 1
+            else:
+                stats.hits += 1
+            return True, entry[1], self.__versions[table]
+
+    # remember value (None: the id does not exist) unless the table was invalidated after the lookup
+    def store(self, table: str, key, value, version: int) -> None:
+        with self.__lock:
+            stats = self.__stats[table]
+            if self.__versions[table] != version:
+                stats.discarded += 1
+                return
+            entries = self.__entries[table]
+            entries[key] = (self.__clock() + (self.__ttl if value is not None else self.__negative_ttl), value)
+            entries.move_to_end(key)
+            while len(entries) > self.__sizes[table]:
+                entries.popitem(last=False)
+                stats.evictions += 1
+
+    # forget the ids of table, after a write to them
+    def invalidate(self, table: str, *keys) -> None:
+        with self.__lock:
+            if table not in self.__entries:
+                return
+            self.__versions[table] += 1
+            entries = self.__entries[table]
+            for key in keys:
+                if entries.pop(key, None) is not None:
+                    self.__stats[table].invalidations += 1
+
+    # invalidator for DBConnector.add_invalidator: keys None drops the whole table, table None every table
+    def on_change(self, table: Optional[str], keys) -> None:
+        if keys is None:
+            self.clear(table)
+        else:
+            self.invalidate(table, *keys)
+
+    # forget every entry of table, or of every table
+    def clear(self, table: Optional[str] = None) -> None:
+        with self.__lock:
+            for name in ([table] if table is not None else list(self.__entries)):
+                if name not in self.__entries:
+                    continue
+                self.__versions[name] += 1
+                self.__stats[name].invalidations += len(self.__entries[name])
+                self.__entries[name].clear()
+
+    def stats(self, table: str) -> CacheStats:
+        return self.__stats[table]
+
+    def size(self, table: str) -> int:
+        return len(self.__entries[table])
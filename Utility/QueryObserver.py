@@ -0,0 +1,202 @@
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+
+# what DBConnector knows about one statement, handed to every QueryObserver callback.
+# times are in seconds: execute_time is spent in cursor.execute (the server round trip),
+# fetch_time in turning the fetched rows into a ResultSet, duration is the whole call.
+# bytes_fetched approximates the size of the returned rows as text
+class QueryEvent:
+    __slots__ = ('query', 'params', 'caller', 'started_at', 'duration', 'execute_time', 'fetch_time',
+                 'rowcount', 'rows_fetched', 'bytes_fetched', 'exception', '__start', '__mark')
+
+    def __init__(self, query: str, params, caller: str) -> None:
+        self.query = query
+        self.params = params
+        self.caller = caller
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.execute_time = 0.0
+        self.fetch_time = 0.0
+        self.rowcount = 0
+        self.rows_fetched = 0
+        self.bytes_fetched = 0
+        self.exception = None
+        self.__start = self.__mark = time.perf_counter()
+
+    # the statement ran on the server, rowcount rows were effected
+    def executed(self, rowcount: int) -> None:
+        now = time.perf_counter()
+        self.execute_time += now - self.__mark
+        self.__mark = now
+        self.rowcount += rowcount
+
+    # rows were fetched and converted
+    def fetched(self, rows) -> None:
+        now = time.perf_counter()
+        self.fetch_time += now - self.__mark
+        self.__mark = now
+        self.rows_fetched += len(rows)
+        self.bytes_fetched += sum(len(str(value)) for row in rows for value in row if value is not None)
+
+    def finish(self, exception: BaseException = None) -> None:
+        self.duration = time.perf_counter() - self.__start
+        self.exception = type(exception) if exception is not None else None
+
+
+# stands in for QueryEvent when nobody observes the queries, so the bookkeeping costs nothing
+class NullQueryEvent:
+    __slots__ = ()
+
+    def executed(self, rowcount: int) -> None:
+        pass
+
+    def fetched(self, rows) -> None:
+        pass
+
+
+NULL_EVENT = NullQueryEvent()
+
+
+# base class of the observers registered with DBConnector.add_observer, override what you need.
+# before is called when the statement is about to run, then either after or error (with event.exception set).
+# callbacks run on the thread that executes the query, exceptions they raise are ignored
+class QueryObserver:
+    def before(self, event: QueryEvent) -> None:
+        pass
+
+    def after(self, event: QueryEvent) -> None:
+        pass
+
+    def error(self, event: QueryEvent) -> None:
+        pass
+
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"\(\?\.\.\.\)(?:\s*,\s*\(\?\.\.\.\))+")
+_SPACES = re.compile(r"\s+")
+
+
+# the statement with its literals replaced by ?, so calls that differ only in their values share a template.
+# lists of values become (?...) and multi-row VALUES lists a single row
+def normalize(query: str) -> str:
+    query = _STRING.sub('?', query)
+    query = _NUMBER.sub('?', query)
+    query = _SPACES.sub(' ', query).strip()
+    query = _LIST.sub('(?...)', query)
+    return _ROWS.sub('(?...)', query)
+
+
+_UTILITY = os.path.dirname(os.path.abspath(__file__))
+_CONTEXTLIB = os.path.dirname(os.path.abspath(sys.modules['contextlib'].__file__))
+
+
+# module.function of the code that issued the query: the first frame outside Utility,
+# skipping private helpers (_bulk_insert, lambdas, ...) in favour of the public function that called them
+def find_caller() -> str:
+    frame = sys._getframe(1)
+    first = None
+    while frame is not None:
+        directory = os.path.dirname(os.path.abspath(frame.f_code.co_filename))
+        if directory != _UTILITY and directory != _CONTEXTLIB:
+            name = frame.f_globals.get('__name__', '?') + '.' + frame.f_code.co_name
+            if first is None:
+                first = name
+            if not frame.f_code.co_name.startswith(('_', '<')):
+                return name
+        frame = frame.f_back
+    return first if first is not None else '?'
+
+
+# upper bounds of the latency histogram buckets in milliseconds, the last bucket is unbounded
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+# counters and a latency histogram of one statement template
+class TemplateStats:
+    def __init__(self, template: str) -> None:
+        self.template = template
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes_fetched = 0
+        self.total_time = 0.0
+        self.execute_time = 0.0
+        self.fetch_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.callers = {}
+
+    def add(self, event: QueryEvent) -> None:
+        self.calls += 1
+        if event.exception is not None:
+            self.errors += 1
+        self.rows += max(event.rowcount, event.rows_fetched)
+        self.bytes_fetched += event.bytes_fetched
+        self.total_time += event.duration
+        self.execute_time += event.execute_time
+        self.fetch_time += event.fetch_time
+        self.max_time = max(self.max_time, event.duration)
+        self.histogram[bisect_left(LATENCY_BUCKETS_MS, event.duration * 1000)] += 1
+        self.callers[event.caller] = self.callers.get(event.caller, 0) + 1
+
+    # estimated latency (seconds) below which the given fraction of the calls finished,
+    # the upper bound of the histogram bucket it falls in
+    def percentile(self, fraction: float) -> float:
+        rank, seen = fraction * self.calls, 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= rank:
+                return (LATENCY_BUCKETS_MS[bucket] / 1000) if bucket < len(LATENCY_BUCKETS_MS) else self.max_time
+        return 0.0
+
+    def as_dict(self) -> dict:
+        return {'template': self.template, 'calls': self.calls, 'errors': self.errors, 'rows': self.rows,
+                'bytes_fetched': self.bytes_fetched, 'total_time': self.total_time,
+                'mean_time': self.total_time / self.calls if self.calls else 0.0, 'max_time': self.max_time,
+                'p50': self.percentile(0.5), 'p95': self.percentile(0.95), 'p99': self.percentile(0.99),
+                'execute_time': self.execute_time, 'fetch_time': self.fetch_time,
+                'histogram': dict(zip([str(b) for b in LATENCY_BUCKETS_MS] + ['inf'], self.histogram)),
+                'callers': dict(self.callers)}
+
+
+# in-memory aggregation of every observed statement by template:
+#   stats = QueryStats()
+#   DBConnector.add_observer(stats)
+#   ...
+#   for template in stats.dump(): print(template['template'], template['calls'], template['p95'])
+class QueryStats(QueryObserver):
+    def __init__(self) -> None:
+        self.__templates = {}
+        self.__lock = threading.Lock()
+
+    def after(self, event: QueryEvent) -> None:
+        self.__add(event)
+
+    def error(self, event: QueryEvent) -> None:
+        self.__add(event)
+
+    # the statistics of every template as dicts, the most expensive (total time) first
+    def dump(self) -> list:
+        with self.__lock:
+            templates = [stats.as_dict() for stats in self.__templates.values()]
+        return sorted(templates, key=lambda stats: stats['total_time'], reverse=True)
+
+    # forget everything collected so far
+    def reset(self) -> None:
+        with self.__lock:
+            self.__templates = {}
+
+    def __add(self, event: QueryEvent) -> None:
+        template = normalize(event.query)
+        with self.__lock:
+            stats = self.__templates.get(template)
+            if stats is None:
+                stats = self.__templates[template] = TemplateStats(template)
+            stats.add(event)
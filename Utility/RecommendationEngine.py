@@ -0,0 +1,131 @@
+from typing import List, Optional
+import numpy
+import Utility.DBConnector as Connector
+
+HIGH_RATING = 4
+
+
+# get_potential_dish_recommendations on an in-memory snapshot of Ratings, OrderDish and OrderCustomer.
+# customers and dishes are renumbered 0..n-1, the high ratings and the orders are kept as CSR adjacencies
+# (indptr / indices arrays) and the similarity components are found once with a vectorised union-find,
+# so a query touches only the dishes of one component and the orders of one customer
+class RecommendationEngine:
+    # every argument is a sequence of equal length per table: Ratings (cust_id, dish_id, rating),
+    # OrderDish (order_id, dish_id) and OrderCustomer (order_id, cust_id)
+    def __init__(self, rating_cust_ids, rating_dish_ids, ratings, order_dish_order_ids, order_dish_dish_ids,
+                 order_customer_order_ids, order_customer_cust_ids) -> None:
+        rating_cust_ids = numpy.asarray(rating_cust_ids, dtype=numpy.int64)
+        rating_dish_ids = numpy.asarray(rating_dish_ids, dtype=numpy.int64)
+        high = numpy.asarray(ratings, dtype=numpy.int64) >= HIGH_RATING
+        self.__cust_ids, high_custs = numpy.unique(rating_cust_ids[high], return_inverse=True)
+        self.__dish_ids, high_dishes = numpy.unique(rating_dish_ids[high], return_inverse=True)
+        cust_count, width = len(self.__cust_ids), max(len(self.__dish_ids), 1)
+        self.__rated_indptr, self.__rated = RecommendationEngine.__csr(high_custs, high_dishes, cust_count)
+        self.__component = RecommendationEngine.__components(high_custs, high_dishes, cust_count)
+
+        # (component, dish) -> number of customers of the component that rated the dish high
+        pairs, raters = numpy.unique(self.__component[high_custs] * width + high_dishes, return_counts=True)
+        self.__component_indptr, (self.__component_dishes, self.__component_raters) = \
+            RecommendationEngine.__csr(pairs // width, pairs % width, cust_count, raters)
+
+        # dishes ordered by the customers that have a component, only dishes rated high by someone
+        # can be recommended so the others are left out
+        order_ids = numpy.asarray(order_customer_order_ids, dtype=numpy.int64)
+        by_order = numpy.argsort(order_ids)
+        placed_by = self.__index(order_ids[by_order], numpy.asarray(order_dish_order_ids, dtype=numpy.int64))
+        placers = numpy.asarray(order_customer_cust_ids, dtype=numpy.int64)[by_order]
+        custs = numpy.full(len(placed_by), -1, dtype=numpy.int64)
+        custs[placed_by >= 0] = self.__index(self.__cust_ids, placers[placed_by[placed_by >= 0]])
+        dishes = self.__index(self.__dish_ids, numpy.asarray(order_dish_dish_ids, dtype=numpy.int64))
+        known = (custs >= 0) & (dishes >= 0)
+        ordered = numpy.unique(custs[known] * width + dishes[known])
+        self.__ordered_indptr, self.__ordered = RecommendationEngine.__csr(ordered // width, ordered % width,
+                                                                           cust_count)
+
+    # a snapshot of the current tables. in a session that already has a transaction open the tables are
+    # read with its isolation level, under the default READ COMMITTED a commit in between is seen by the
+    # later reads only
+    @staticmethod
+    def load(session: Optional[Connector.DBConnector] = None) -> 'RecommendationEngine':
+        conn = session if session is not None else Connector.DBConnector()
+        try:
+            # one REPEATABLE READ transaction, so the three tables are read from the same snapshot
+            repeatable = not conn.in_transaction()
+            with conn.transaction():
+                if repeatable:
+                    conn.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                _, ratings = conn.execute("SELECT cust_id, dish_id, rating FROM Ratings")
+                _, order_dish = conn.execute("SELECT order_id, dish_id FROM OrderDish")
+                _, order_customer = conn.execute("SELECT order_id, cust_id FROM OrderCustomer")
+        finally:
+            if session is None:
+                conn.close()
+        return RecommendationEngine(ratings.to_numpy('cust_id'), ratings.to_numpy('dish_id'),
+                                    ratings.to_numpy('rating'), order_dish.to_numpy('order_id'),
+                                    order_dish.to_numpy('dish_id'), order_customer.to_numpy('order_id'),
+                                    order_customer.to_numpy('cust_id'))
+
+    # the same dishes get_potential_dish_recommendations returns, ascending
+    def recommendations(self, cust_id: int) -> List[int]:
+        cust = self.__index(self.__cust_ids, numpy.array([cust_id], dtype=numpy.int64))[0]
+        if cust < 0:
+            return []
+        component = self.__component[cust]
+        start, end = self.__component_indptr[component], self.__component_indptr[component + 1]
+        dishes, raters = self.__component_dishes[start:end], self.__component_raters[start:end]
+        # the dishes only the customer itself rated high do not count
+        own = self.__rated[self.__rated_indptr[cust]:self.__rated_indptr[cust + 1]]
+        keep = raters > numpy.isin(dishes, own, assume_unique=True)
+        ordered = self.__ordered[self.__ordered_indptr[cust]:self.__ordered_indptr[cust + 1]]
+        keep &= ~numpy.isin(dishes, ordered, assume_unique=True)
+        return self.__dish_ids[dishes[keep]].tolist()
+
+    # the number of similarity components (customers without high ratings are in none)
+    def component_count(self) -> int:
+        return len(numpy.unique(self.__component))
+
+    # positions of ids in the sorted array of known ids, -1 for unknown ones
+    @staticmethod
+    def __index(known, ids):
+        if len(known) == 0:
+            return numpy.full(len(ids), -1, dtype=numpy.int64)
+        position = numpy.minimum(numpy.searchsorted(known, ids), len(known) - 1)
+        return numpy.where(known[position] == ids, position, -1)
+
+    # indptr and indices (sorted in every row) of the rows -> columns adjacency, with values the
+    # indices are returned together with the values in the same order
+    @staticmethod
+    def __csr(rows, columns, row_count: int, values=None):
+        order = numpy.lexsort((columns, rows))
+        indptr = numpy.zeros(row_count + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(rows, minlength=row_count), out=indptr[1:])
+        if values is None:
+            return indptr, columns[order]
+        return indptr, (columns[order], values[order])
+
+    # component label (its smallest customer) of every customer, customers that rated a dish high are
+    # connected. every round hooks the larger root of each edge under the smaller one and then
+    # compresses the paths until every customer points at its root
+    @staticmethod
+    def __components(custs, dishes, cust_count: int):
+        parent = numpy.arange(cust_count, dtype=numpy.int64)
+        if len(custs) == 0:
+            return parent
+        # a star per dish: every rater of a dish is connected to the first of them
+        order = numpy.argsort(dishes, kind='stable')
+        first = numpy.zeros(len(order), dtype=bool)
+        first[0] = True
+        first[1:] = dishes[order][1:] != dishes[order][:-1]
+        u = custs[order]
+        v = u[numpy.flatnonzero(first)[numpy.cumsum(first) - 1]]
+        while True:
+            root_u, root_v = parent[u], parent[v]
+            differ = root_u != root_v
+            if not differ.any():
+                return parent
+            numpy.minimum.at(parent, numpy.maximum(root_u, root_v)[differ], numpy.minimum(root_u, root_v)[differ])
+            while True:
+                grandparent = parent[parent]
+                if numpy.array_equal(grandparent, parent):
+                    break
+                parent = grandparent
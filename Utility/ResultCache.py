@@ -0,0 +1,199 @@
+import copy
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+from typing import Optional
+import Utility.DBConnector as Connector
+
+# the default number of results kept, over all functions
+DEFAULT_SIZE = 1000
+# results longer than this (lists) are not kept
+DEFAULT_MAX_RESULT_LENGTH = 10000
+
+
+# counters of the calls of one memoized function
+class ResultStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        # calls that found a result of older table versions
+        self.stale = 0
+        self.evictions = 0
+        # calls whose query failed (see mark_failed), their default result is not kept
+        self.failures = 0
+        # calls that went to the database without the cache: the versions could not be read,
+        # the arguments are not hashable or the result was not kept (see mark_uncached)
+        self.uncached = 0
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses + self.stale
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self) -> str:
+        return (f'hits={self.hits}, misses={self.misses}, stale={self.stale}, evictions={self.evictions}, '
+                f'failures={self.failures}, uncached={self.uncached}, hit_rate={self.hit_rate():.2f}')
+
+
+# results of the analytic API functions by function and arguments, one bounded LRU for all of them.
+# every function declares the tables its result is computed from (see memoized), an entry keeps the
+# versions TableVersions had for them and is served while they are the same. the versions are read
+# before the function runs, so a change committed meanwhile leaves the entry stale instead of valid.
+# the counters are kept by the server, so changes made by other processes are seen as well
+class ResultCache:
+    __current = None
+    __configure_lock = threading.Lock()
+    # per thread, why the result of the memoized call running on it is not kept: 'failed', 'uncached' or None
+    _calls = threading.local()
+
+    def __init__(self, size: int = DEFAULT_SIZE, max_result_length: int = DEFAULT_MAX_RESULT_LENGTH) -> None:
+        self.__size = size
+        self.__max_result_length = max_result_length
+        self.__lock = threading.Lock()
+        self.__entries = OrderedDict()
+        self.__stats = {}
+
+    # the cache the memoized functions use, None when memoization is off
+    @staticmethod
+    def current() -> Optional['ResultCache']:
+        return ResultCache.__current
+
+    # turn memoization on with a new, empty ResultCache(size, max_result_length) and return it,
+    # size None turns it off
+    @staticmethod
+    def configure(size: Optional[int] = DEFAULT_SIZE,
+                  max_result_length: int = DEFAULT_MAX_RESULT_LENGTH) -> Optional['ResultCache']:
+        with ResultCache.__configure_lock:
+            ResultCache.__current = ResultCache(size, max_result_length) if size is not None else None
+            return ResultCache.__current
+
+    # the result of call() for key, name is the function's name and tables the ones it reads
+    def call(self, name: str, tables: tuple, key: tuple, call):
+        stats = self.__function_stats(name)
+        try:
+            hash(key)
+        except TypeError:
+            with self.__lock:
+                stats.uncached += 1
+            return call()
+        versions = self.__versions(tables)
+        if versions is None:
+            with self.__lock:
+                stats.uncached += 1
+            return call()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self.__entries.move_to_end(key)
+                stats.hits += 1
+                return copy.deepcopy(entry[1])
+            if entry is None:
+                stats.misses += 1
+            else:
+                stats.stale += 1
+        outer = getattr(ResultCache._calls, 'skipped', None)
+        ResultCache._calls.skipped = None
+        try:
+            result = call()
+            skipped = ResultCache._calls.skipped
+        finally:
+            ResultCache._calls.skipped = outer
+        if skipped is not None:
+            with self.__lock:
+                if skipped == 'failed':
+                    stats.failures += 1
+                else:
+                    stats.uncached += 1
+            return result
+        self.__store(name, key, versions, result)
+        return result
+
+    # forget every result
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self, name: str) -> ResultStats:
+        return self.__function_stats(name)
+
+    # the counters of every function called so far, by function name
+    def report(self) -> dict:
+        with self.__lock:
+            return dict(self.__stats)
+
+    def size(self) -> int:
+        return len(self.__entries)
+
+    def __function_stats(self, name: str) -> ResultStats:
+        with self.__lock:
+            stats = self.__stats.get(name)
+            if stats is None:
+                stats = self.__stats[name] = ResultStats()
+            return stats
+
+    # the versions of tables, None if they could not be read
+    def __versions(self, tables: tuple) -> Optional[tuple]:
+        conn = None
+        try:
+            conn = Connector.DBConnector()
+            _, result = conn.execute_prepared("SELECT table_name, version FROM TableVersions")
+        except Exception:
+            return None
+        finally:
+            if conn is not None:
+                conn.close()
+        versions = {row['table_name']: row['version'] for row in result}
+        if any(table not in versions for table in tables):
+            return None
+        return tuple(versions[table] for table in tables)
+
+    def __store(self, name: str, key: tuple, versions: tuple, result) -> None:
+        if result is None or (isinstance(result, (list, dict)) and len(result) > self.__max_result_length):
+            with self.__lock:
+                self.__stats[name].uncached += 1
+            return
+        value = copy.deepcopy(result)
+        with self.__lock:
+            self.__entries[key] = (versions, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__size:
+                evicted, _ = self.__entries.popitem(last=False)
+                self.__stats[evicted[0]].evictions += 1
+
+
+# called by a memoized function whose query failed: the default result it returns instead is not kept
+def mark_failed() -> None:
+    ResultCache._calls.skipped = 'failed'
+
+
+# called by a memoized function whose result is right for now but is not to be served later, e.g. one read
+# while derived rows it depends on were being rebuilt
+def mark_uncached() -> None:
+    if getattr(ResultCache._calls, 'skipped', None) is None:
+        ResultCache._calls.skipped = 'uncached'
+
+
+# decorator of a Solution API function whose result depends only on its arguments and the rows of tables:
+# with ResultCache.current() configured its results are memoized by ResultCache. the function calls
+# mark_failed() when it returns a default because its query failed, and mark_uncached() when its result is not
+# to be kept for another reason. calls with a session go to the database, the session may see changes of its
+# own that are not committed
+def memoized(*tables: str):
+    def decorate(function):
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            cache = ResultCache.current()
+            if cache is None:
+                return function(*args, **kwargs)
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            if arguments.arguments.pop('session', None) is not None:
+                return function(*args, **kwargs)
+            key = (function.__name__,) + tuple(arguments.arguments.items())
+            return cache.call(function.__name__, tables, key, lambda: function(*args, **kwargs))
+
+        wrapper.tables = tables
+        return wrapper
+    return decorate
@@ -0,0 +1,135 @@
+import copy
+import functools
+import inspect
+import threading
+from typing import Optional
+
+
+# counters of the calls of one coalesced function
+class FlightStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        # calls that ran the function
+        self.executions = 0
+        # calls that waited for the execution of an identical call instead
+        self.deduplicated = 0
+
+    def deduplication_rate(self) -> float:
+        return self.deduplicated / self.calls if self.calls else 0.0
+
+    def __str__(self) -> str:
+        return (f'calls={self.calls}, executions={self.executions}, deduplicated={self.deduplicated}, '
+                f'deduplication_rate={self.deduplication_rate():.2f}')
+
+
+# an execution in progress, the calls that join it wait for done
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+# single-flight execution of identical calls: while a call for a key runs, the calls for the same key made
+# meanwhile wait for it and get (a copy of) its result or its exception instead of running again.
+# a call that joins may get a result read before a change it committed itself just before calling, which
+# is why coalescing is off until configured
+class SingleFlight:
+    __current = None
+    __configure_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__flights = {}
+        self.__stats = {}
+
+    # the SingleFlight the coalesced functions use, None when coalescing is off
+    @staticmethod
+    def current() -> Optional['SingleFlight']:
+        return SingleFlight.__current
+
+    # turn coalescing on with a new SingleFlight and return it, enabled False turns it off
+    @staticmethod
+    def configure(enabled: bool = True) -> Optional['SingleFlight']:
+        with SingleFlight.__configure_lock:
+            SingleFlight.__current = SingleFlight() if enabled else None
+            return SingleFlight.__current
+
+    # the result of call() for key, or of the identical call already running. name is the function's name
+    def call(self, name: str, key: tuple, call):
+        with self.__lock:
+            stats = self.__stats.get(name)
+            if stats is None:
+                stats = self.__stats[name] = FlightStats()
+            stats.calls += 1
+            flight = self.__flights.get(key)
+            if flight is None:
+                flight = self.__flights[key] = _Flight()
+                stats.executions += 1
+                leader = True
+            else:
+                flight.followers += 1
+                stats.deduplicated += 1
+                leader = False
+        return self.__lead(key, flight, call) if leader else SingleFlight.__follow(flight)
+
+    def stats(self, name: str) -> FlightStats:
+        with self.__lock:
+            return self.__stats.setdefault(name, FlightStats())
+
+    # the counters of every function called so far, by function name
+    def report(self) -> dict:
+        with self.__lock:
+            return dict(self.__stats)
+
+    # the number of executions running now
+    def in_flight(self) -> int:
+        with self.__lock:
+            return len(self.__flights)
+
+    def __lead(self, key: tuple, flight: _Flight, call):
+        try:
+            flight.result = call()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # no call joins once the flight is gone, so followers is final
+            with self.__lock:
+                del self.__flights[key]
+            flight.done.set()
+        # the followers copy the result, the caller may change its own
+        return copy.deepcopy(flight.result) if flight.followers else flight.result
+
+    @staticmethod
+    def __follow(flight: _Flight):
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return copy.deepcopy(flight.result)
+
+
+# decorator of a Solution API function: with SingleFlight.current() configured, concurrent calls with the
+# same arguments share one execution. calls with a session run on their own, they read in a transaction
+# of their own
+def coalesced(function):
+    signature = inspect.signature(function)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        flights = SingleFlight.current()
+        if flights is None:
+            return function(*args, **kwargs)
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        if arguments.arguments.pop('session', None) is not None:
+            return function(*args, **kwargs)
+        key = (function.__name__,) + tuple(arguments.arguments.items())
+        try:
+            hash(key)
+        except TypeError:
+            return function(*args, **kwargs)
+        return flights.call(function.__name__, key, lambda: function(*args, **kwargs))
+
+    return wrapper
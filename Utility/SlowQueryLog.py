@@ -0,0 +1,137 @@
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timezone
+import psycopg2
+from Utility.QueryObserver import QueryEvent, QueryObserver, normalize
+
+# statements that can be explained, anything else (COPY, DDL, ...) is logged without a plan
+_EXPLAINABLE = re.compile(r"^\s*\(?\s*(SELECT|WITH|INSERT|UPDATE|DELETE|VALUES|TABLE)\b", re.IGNORECASE)
+# statements that change rows or lock them, EXPLAIN ANALYZE would take their row locks and fire their
+# triggers again (even when rolled back), so they are only planned
+_WRITING = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|FOR\s+(NO\s+KEY\s+)?UPDATE|FOR\s+(KEY\s+)?SHARE)\b",
+                      re.IGNORECASE)
+
+
+# observer that appends every statement slower than threshold seconds to a rotating JSONL file
+# (max_bytes per file, backup_count old files kept). a read is re-run with
+# EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) on a separate connection inside a transaction that is rolled back,
+# a write only gets EXPLAIN (FORMAT JSON), so the plan that is logged is the one PostgreSQL picks right now;
+# the same template is explained at most once every explain_interval seconds. all this happens on a
+# background thread, the query that was slow is not delayed. the re-run gives up after explain_timeout
+# seconds or when it waits for a lock. the bound parameters are not logged (only their number), they may
+# hold personal data
+class SlowQueryLog(QueryObserver):
+    def __init__(self, params: dict, threshold: float, path: str, max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 5, explain_interval: float = 60.0, explain_timeout: float = 30.0,
+                 queue_size: int = 100) -> None:
+        self.threshold = threshold
+        self.path = path
+        self.explain_interval = explain_interval
+        self.explain_timeout = explain_timeout
+        self.__params = dict(params)
+        self.__connection = None
+        self.__explained = {}  # template -> time of its last EXPLAIN
+        self.__handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+        self.__handler.setFormatter(logging.Formatter('%(message)s'))
+        self.__logger = logging.getLogger('slow_queries.' + str(id(self)))
+        self.__logger.propagate = False
+        self.__logger.setLevel(logging.INFO)
+        self.__logger.addHandler(self.__handler)
+        self.__queue = queue.Queue(queue_size)
+        self.__worker = threading.Thread(target=self.__work, name='slow-query-log', daemon=True)
+        self.__worker.start()
+
+    def after(self, event: QueryEvent) -> None:
+        if event.duration >= self.threshold:
+            try:
+                self.__queue.put_nowait(event)
+            except queue.Full:
+                pass  # better to lose a log line than to slow the queries down
+
+    # wait until every slow statement seen so far is written
+    def flush(self) -> None:
+        self.__queue.join()
+
+    # stop the worker once the pending statements are written, close the connection and the file
+    def close(self) -> None:
+        self.__queue.put(None)
+        self.__worker.join()
+        if self.__connection is not None:
+            try:
+                self.__connection.close()
+            except Exception:
+                pass
+        self.__logger.removeHandler(self.__handler)
+        self.__handler.close()
+
+    def __work(self) -> None:
+        while True:
+            event = self.__queue.get()
+            try:
+                if event is None:
+                    return
+                self.__logger.info(json.dumps(self.__record(event), default=str))
+            except Exception:
+                pass
+            finally:
+                self.__queue.task_done()
+
+    def __record(self, event: QueryEvent) -> dict:
+        record = {'time': datetime.fromtimestamp(event.started_at, timezone.utc).isoformat(),
+                  'caller': event.caller, 'query': event.query, 'param_count': len(event.params or ()),
+                  'duration_ms': event.duration * 1000, 'execute_ms': event.execute_time * 1000,
+                  'fetch_ms': event.fetch_time * 1000, 'rowcount': event.rowcount,
+                  'rows_fetched': event.rows_fetched, 'threshold_ms': self.threshold * 1000, 'plan': None}
+        template = normalize(event.query)
+        last = self.__explained.get(template)
+        if not _EXPLAINABLE.match(event.query) or '%s' in event.query:
+            record['explain_error'] = 'statement cannot be explained'
+        elif last is not None and time.monotonic() - last < self.explain_interval:
+            record['explain_error'] = 'explained less than explain_interval seconds ago'
+        else:
+            self.__explained[template] = time.monotonic()
+            try:
+                record['plan'] = self.__explain(event)
+            except Exception as e:
+                record['explain_error'] = type(e).__name__ + ': ' + str(e).strip()
+        return record
+
+    # EXPLAIN ANALYZE a read (EXPLAIN a write) in a rolled back transaction, $n parameters are bound through
+    # a temporary prepared statement so the plan is made the same way as for the original call
+    def __explain(self, event: QueryEvent):
+        connection = self.__connect()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL statement_timeout = %s", (int(self.explain_timeout * 1000),))
+                cursor.execute("SET LOCAL lock_timeout = %s", (1000,))
+                if _WRITING.search(event.query):
+                    explain = "EXPLAIN (FORMAT JSON) "
+                else:
+                    explain = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) "
+                if event.params:
+                    cursor.execute("PREPARE slow_query AS " + event.query)
+                    try:
+                        cursor.execute(explain + "EXECUTE slow_query (" + ", ".join(["%s"] * len(event.params)) + ")",
+                                       tuple(event.params))
+                        plan = cursor.fetchone()[0]
+                    finally:
+                        # a failed EXPLAIN leaves the transaction aborted, DEALLOCATE must run after the rollback
+                        connection.rollback()
+                        cursor.execute("DEALLOCATE slow_query")
+                else:
+                    cursor.execute(explain + event.query)
+                    plan = cursor.fetchone()[0]
+        finally:
+            connection.rollback()
+        return plan if not isinstance(plan, str) else json.loads(plan)
+
+    def __connect(self):
+        if self.__connection is None or self.__connection.closed:
+            self.__connection = psycopg2.connect(**self.__params)
+            self.__connection.autocommit = False
+        return self.__connection